@@ -0,0 +1,79 @@
+"""Citation parsing throughput on synthetic reference sections, and optionally on real reference-heavy papers.
+
+    python -m benchmarks.citations --refs 300 [paper.pdf ...]
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from paperminer.citation import CitationParser
+from paperminer.converter import PaperToTextConverter
+from paperminer.document import open_document
+from paperminer.layout import LTCitationBox, LTSectionHeader
+from paperminer.output import PaperBlock
+
+WORDS = ('deep learning layout analysis of scientific documents with graph networks for robust '
+         'extraction and parsing at scale using transformers').split()
+STYLES = ('[{n}] {initial}. {name}, {initial2}. {name2}, and {initial}. {name3}. {title}. In Proc. {venue}, {year}.',
+          '[{n}] {initial}. {name} and {initial2}. {name2}, “{title},” in Proc. {venue}, {year}, pp. 1–10.',
+          '[{n}] {name} {initial}, {name2} {initial2}. {title}. {venue}. {year};12:1-9. doi:10.1000/{n}')
+
+
+def synthetic_blocks(refs: int, seed: int = 0) -> List[PaperBlock]:
+    rnd = random.Random(seed)
+    blocks = []
+    header = PaperBlock.__new__(PaperBlock)
+    (header.pageid, header.klass, header.bbox, header.text) = (1, LTSectionHeader, (72, 700, 150, 712), 'References\n')
+    blocks.append(header)
+    lines: List[str] = []
+    for n in range(1, refs + 1):
+        text = rnd.choice(STYLES).format(
+            n=n, initial=rnd.choice('ABCDEJK'), initial2=rnd.choice('LMNPRST'),
+            name=rnd.choice(('Doe', 'Roe', 'Smith')), name2=rnd.choice(('Jones', 'Lee', 'Wu')),
+            name3=rnd.choice(('Garcia', 'Kim', 'Patel')),
+            title=' '.join(rnd.choice(WORDS) for _ in range(8)).capitalize(),
+            venue=rnd.choice(('ICML', 'NeurIPS', 'ACL', 'ICDAR')), year=rnd.randint(1990, 2020))
+        # wrap like a narrow column
+        words = text.split()
+        while words:
+            lines.append(' '.join(words[:9]))
+            words = words[9:]
+        if len(lines) > 60 or n == refs:
+            block = PaperBlock.__new__(PaperBlock)
+            (block.pageid, block.klass, block.bbox, block.text) = (1 + n // 40, LTCitationBox, (72, 100, 300, 700),
+                                                                   '\n'.join(lines) + '\n')
+            blocks.append(block)
+            lines = []
+    return blocks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--refs', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('papers', nargs='*')
+    args = parser.parse_args()
+
+    blocks = synthetic_blocks(args.refs)
+    start = time.perf_counter()
+    count = 0
+    for _ in range(args.repeat):
+        citations = CitationParser()
+        for block in blocks:
+            count += sum(1 for _ in citations.feed(block))
+        count += sum(1 for _ in citations.close())
+    elapsed = time.perf_counter() - start
+    print(f'synthetic: {count} citations in {elapsed:.3f}s, {count / elapsed:.0f} citations/s')
+
+    for path in args.papers:
+        with open_document(path) as document:
+            start = time.perf_counter()
+            converter = PaperToTextConverter(document)
+            count = sum(1 for _ in converter.iter_citations())
+            elapsed = time.perf_counter() - start
+        print(f'{path}: {count} citations, {elapsed:.3f}s including layout')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Throughput, peak memory and golden-output checks for each stage of extraction on synthetic papers.
+
+    python -m benchmarks.suite                  # all documents in benchmarks.synthetic.SPECS
+    python -m benchmarks.suite two-column --no-memory
+    python -m benchmarks.suite --update-golden  # after a change that is meant to alter output
+
+Pass one is ExtendedPaperAnalyzer over every page, pass two is PaperToTextConverter.get_result with the
+statistics of pass one. group_objects and group_textlines are timed inside both passes. Peak memory is the
+tracemalloc peak above what was allocated when the stage started, taken in a separate run so that tracing
+does not skew the timings.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pdfminer.layout import LTChar
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer import PaperResourceManager
+from paperminer.converter import ExtendedPaperAnalyzer, PaperToTextConverter
+from paperminer.layout import LTLayoutContainerExtended
+from paperminer.output import CallbackSink, PaperPage
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+STAGES = ('pass one', 'pass two', 'group_objects', 'group_textlines')
+
+
+class StageStats:
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.pages = 0
+        self.chars = 0
+        self.peak_bytes: Optional[int] = None
+        return
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'seconds': self.seconds,
+            'pages_per_sec': self.pages / self.seconds if self.seconds else None,
+            'chars_per_sec': self.chars / self.seconds if self.seconds else None,
+            'peak_bytes': self.peak_bytes,
+        }
+
+
+class GroupingProbe:
+    """Wraps group_objects and group_textlines to time them, or to measure their peak memory."""
+
+    def __init__(self, stats: Dict[str, StageStats], memory: bool = False) -> None:
+        self.stats = stats
+        self.memory = memory
+        self.originals: Dict[str, Callable] = {}
+        return
+
+    def wrap(self, name: str) -> Callable:
+        original = self.originals[name]
+        stats = self.stats[name]
+        memory = self.memory
+
+        def probe(container: LTLayoutContainerExtended, laparams: Any, objs: List[Any]) -> Iterator:
+            if memory:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            result = list(original(container, laparams, objs))
+            stats.seconds += time.perf_counter() - start
+            if memory:
+                stats.peak_bytes = max(stats.peak_bytes or 0, tracemalloc.get_traced_memory()[1] - base)
+            stats.pages += 1
+            if name == 'group_objects':
+                stats.chars += len(objs)
+            else:
+                stats.chars += sum(1 for line in objs for obj in line if isinstance(obj, LTChar))
+            return iter(result)
+
+        return probe
+
+    def __enter__(self) -> 'GroupingProbe':
+        for name in ('group_objects', 'group_textlines'):
+            self.originals[name] = getattr(LTLayoutContainerExtended, name)
+            setattr(LTLayoutContainerExtended, name, self.wrap(name))
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        for name, original in self.originals.items():
+            setattr(LTLayoutContainerExtended, name, original)
+        return
+
+
+def run_passes(data: bytes, stats: Dict[str, StageStats], memory: bool = False) -> List[PaperPage]:
+    pages: List[PaperPage] = []
+    document = PDFDocument(PDFParser(io.BytesIO(data)))
+    if memory:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    rsrcmgr = PaperResourceManager()
+    interpreter = PDFPageInterpreter(rsrcmgr, ExtendedPaperAnalyzer(rsrcmgr))
+    npages = 0
+    for page in PDFPage.create_pages(document):
+        interpreter.process_page(page)
+        npages += 1
+    stats['pass one'].seconds += time.perf_counter() - start
+    stats['pass one'].pages += npages
+    stats['pass one'].chars += sum(rsrcmgr.font_map.values())
+    if memory:
+        stats['pass one'].peak_bytes = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    PaperToTextConverter(document, rsrcmgr=rsrcmgr).get_result(CallbackSink(pages.append))
+    stats['pass two'].seconds += time.perf_counter() - start
+    stats['pass two'].pages += npages
+    stats['pass two'].chars += sum(rsrcmgr.font_map.values())
+    if memory:
+        stats['pass two'].peak_bytes = tracemalloc.get_traced_memory()[1] - base
+    return pages
+
+
+def measure(data: bytes, memory: bool = True) -> Tuple[Dict[str, StageStats], List[PaperPage]]:
+    stats = {stage: StageStats() for stage in STAGES}
+    with GroupingProbe(stats):
+        pages = run_passes(data, stats)
+    if memory:
+        peaks = {stage: StageStats() for stage in STAGES}
+        tracemalloc.start()
+        try:
+            run_passes(data, peaks, memory=True)
+            with GroupingProbe(peaks, memory=True):
+                run_passes(data, {stage: StageStats() for stage in STAGES})
+        finally:
+            tracemalloc.stop()
+        for stage in STAGES:
+            stats[stage].peak_bytes = peaks[stage].peak_bytes
+    return stats, pages
+
+
+def page_digest(page: PaperPage) -> Dict[str, Any]:
+    blocks = [[block.kind, [round(v, 3) for v in block.bbox], block.text] for block in page]
+    kinds: Dict[str, int] = {}
+    for block in page:
+        kinds[block.kind] = kinds.get(block.kind, 0) + 1
+    digest = hashlib.sha256(json.dumps(blocks).encode('utf-8')).hexdigest()
+    return {'page': page.pageid, 'kinds': dict(sorted(kinds.items())), 'digest': digest}
+
+
+def golden_path(name: str) -> str:
+    return os.path.join(GOLDEN_DIR, name + '.json')
+
+
+def write_golden(name: str, pages: List[PaperPage]) -> None:
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(golden_path(name), 'w') as fp:
+        json.dump([page_digest(page) for page in pages], fp, indent=1)
+        fp.write('\n')
+    return
+
+
+def check_golden(name: str, pages: List[PaperPage]) -> List[str]:
+    """Differences between pages and the golden output recorded for the document called name."""
+    with open(golden_path(name)) as fp:
+        golden = json.load(fp)
+    actual = [page_digest(page) for page in pages]
+    problems = []
+    if len(actual) != len(golden):
+        problems.append(f'{name}: {len(actual)} pages, golden output has {len(golden)}')
+    for expected, got in zip(golden, actual):
+        if expected != got:
+            problems.append(f'{name}: page {got["page"]} differs, blocks {got["kinds"]} (golden {expected["kinds"]})')
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark paperminer on synthetic papers')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help='documents to run (default: all of %s)' % ', '.join(SPECS))
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced run for peak memory')
+    parser.add_argument('--update-golden', action='store_true', help='record current output as golden')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in SPECS:
+            parser.error(f'unknown document {name!r}')
+
+    results: Dict[str, Dict[str, Any]] = {}
+    problems: List[str] = []
+    for name in args.names or list(SPECS):
+        data = build_pdf(**SPECS[name])
+        stats, pages = measure(data, memory=not args.no_memory)
+        if args.update_golden:
+            write_golden(name, pages)
+        else:
+            problems.extend(check_golden(name, pages))
+        results[name] = {stage: stats[stage].to_dict() for stage in STAGES}
+        if not args.json:
+            print(f'{name} ({len(pages)} pages)')
+            for stage in STAGES:
+                row = results[name][stage]
+                peak = '%9.1f MB' % (row['peak_bytes'] / (1 << 20)) if row['peak_bytes'] is not None else ''
+                print(f'  {stage:<16} {row["seconds"]:8.3f}s {row["pages_per_sec"] or 0:9.1f} pages/s '
+                      f'{row["chars_per_sec"] or 0:11.0f} chars/s {peak}')
+    if args.json:
+        json.dump(results, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+    for problem in problems:
+        print('golden output mismatch: ' + problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
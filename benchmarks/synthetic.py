@@ -0,0 +1,162 @@
+"""Generate synthetic research-paper PDFs locally, so benchmarks and golden checks need no corpus."""
+import random
+from typing import Dict, List, Any, Optional
+
+WORDS = ('data model paper result method analysis system network learning graph process value '
+         'performance layout section figure table measure sample corpus signal pattern').split()
+
+# the documents benchmarked and checked against benchmarks/golden
+SPECS: Dict[str, Dict[str, Any]] = {
+    'single-column': dict(pages=4, refs=20),
+    'two-column': dict(pages=6, columns=2, refs=60),
+    'long-references': dict(pages=4, columns=2, refs=400),
+    'many-pages': dict(pages=120, columns=2, refs=80),
+}
+
+
+def escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(pages: int = 4, columns: int = 1, refs: int = 20, paths: int = 0, seed: int = 0,
+              tounicode: bool = False, forms: bool = False, fanout: int = 0) -> bytes:
+    """A paper with title, authors, abstract, numbered sections with figure captions, footers and a references
+    section starting in the last column of the last page and continuing on extra pages until refs are listed.
+
+    With tounicode, every font carries a ToUnicode CMap stream, as the fonts embedded by real papers do. With
+    forms, the paths of each page are drawn by a form XObject, the way plots are usually embedded. With fanout,
+    the pages hang off a tree of /Pages nodes with at most fanout kids each, as in long documents."""
+    rnd = random.Random(seed)
+
+    def sentence(n: int) -> str:
+        return ' '.join(rnd.choice(WORDS) for _ in range(n))
+
+    cols = [(72, 540)] if columns == 1 else [(72, 300), (312, 540)]
+    width_words = 12 if columns == 1 else 6
+    contents: List[str] = []
+    figures: List[str] = []
+    ref_no = 1
+    section = 1
+    p = 0
+    while p < pages or ref_no <= refs:
+        ops: List[str] = []
+
+        def text(font: str, size: float, x: float, y: float, s: str) -> None:
+            ops.append('BT /%s %g Tf %g %g Td (%s) Tj ET' % (font, size, x, y, escape(s)))
+            return
+
+        y = 720
+        if p == 0:
+            text('F2', 18, 150, y, 'A Study of Synthetic Paper Layouts')
+            y -= 30
+            text('F1', 11, 200, y, 'Jane Doe, John Smith, Alex Roe')
+            y -= 14
+            text('F1', 11, 220, y, 'University of Examples')
+            y -= 30
+        for ci, (cx0, cx1) in enumerate(cols):
+            cy = y
+            if p == 0 and ci == 0:
+                text('F2', 12, cx0, cy, 'Abstract')
+                cy -= 16
+                for _ in range(5):
+                    text('F3', 10, cx0, cy, sentence(width_words))
+                    cy -= 12
+                cy -= 10
+            if p >= pages - 1 and (p > pages - 1 or ci == len(cols) - 1):
+                if p == pages - 1:
+                    text('F2', 12, cx0, cy, 'References')
+                    cy -= 16
+                while cy > 100 and ref_no <= refs:
+                    text('F3', 8, cx0, cy, '[%d] %s. %s. In Proc. %s, %d.' % (
+                        ref_no, 'Doe J', sentence(4).capitalize(), rnd.choice(['ICML', 'NeurIPS', 'ACL']),
+                        2000 + ref_no % 20))
+                    cy -= 10
+                    ref_no += 1
+                continue
+            title = {1: 'Introduction', 2: 'Background'}.get(section, 'Section %d' % section)
+            text('F2', 12, cx0, cy, '%d %s' % (section, title))
+            cy -= 16
+            section += 1
+            while cy > 140:
+                for _ in range(rnd.randint(3, 7)):
+                    if cy <= 140:
+                        break
+                    text('F3', 10, cx0, cy, sentence(width_words))
+                    cy -= 12
+                cy -= 8
+                if rnd.random() < 0.2 and cy > 160:
+                    text('F3', 9, cx0, cy, 'Figure %d: %s' % (rnd.randint(1, 9), sentence(4)))
+                    cy -= 14
+        path_ops = []
+        for k in range(paths):
+            x = 80 + (k * 7) % 400
+            yy = 150 + (k * 13) % 50
+            path_ops.append('%g %g m %g %g l S' % (x, yy, x + 5, yy + 3))
+            path_ops.append('%g %g m %g %g %g %g %g %g c S' % (x, yy, x + 1, yy + 2, x + 3, yy + 4, x + 4, yy + 1))
+        if forms:
+            figures.append('\n'.join(path_ops))
+            ops.append('q /Fig Do Q')
+        else:
+            ops.extend(path_ops)
+        text('F3', 8, 72, 90, 'This work was supported by the foundation for examples grant.')
+        text('F3', 8, 300, 50, str(p + 1))
+        contents.append('\n'.join(ops))
+        p += 1
+    return write_pdf(contents, tounicode, figures if forms else None, fanout)
+
+
+def tounicode_cmap() -> str:
+    chars = '\n'.join('<%02X> <%04X>' % (code, code) for code in range(32, 127))
+    return ('/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n/CMapName /Synthetic-UCS def\n'
+            '1 begincodespacerange\n<00> <FF>\nendcodespacerange\n'
+            '95 beginbfchar\n%s\nendbfchar\nendcmap\nend\nend' % chars)
+
+
+def write_pdf(contents: List[str], tounicode: bool = False, figures: Optional[List[str]] = None,
+              fanout: int = 0) -> bytes:
+    objs: List[str] = ['', '']
+    fonts = []
+    for name in ('Helvetica', 'Helvetica-Bold', 'Times-Roman'):
+        extra = ''
+        if tounicode:
+            cmap = tounicode_cmap()
+            objs.append('<< /Length %d >>\nstream\n%s\nendstream' % (len(cmap), cmap))
+            extra = ' /ToUnicode %d 0 R' % len(objs)
+        objs.append('<< /Type /Font /Subtype /Type1 /BaseFont /%s%s >>' % (name, extra))
+        fonts.append(len(objs))
+    kids = []
+    for p, content in enumerate(contents):
+        xobjects = ''
+        if figures is not None:
+            objs.append('<< /Type /XObject /Subtype /Form /BBox [0 0 612 792] /Length %d >>\nstream\n%s\nendstream' %
+                        (len(figures[p]), figures[p]))
+            xobjects = ' /XObject << /Fig %d 0 R >>' % len(objs)
+        objs.append('<< /Length %d >>\nstream\n%s\nendstream' % (len(content.encode('latin-1')), content))
+        objs.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+                    '/Resources << /Font << /F1 %d 0 R /F2 %d 0 R /F3 %d 0 R >>' % (len(objs), *fonts) +
+                    xobjects + ' >> >>')
+        kids.append(len(objs))
+    # (objid, page count) of the kids of the root; /Parent of every page is left pointing at the root
+    nodes = [(kid, 1) for kid in kids]
+    while fanout and len(nodes) > fanout:
+        level = []
+        for i in range(0, len(nodes), fanout):
+            group = nodes[i:i + fanout]
+            count = sum(n for _, n in group)
+            kid_refs = ' '.join('%d 0 R' % kid for kid, _ in group)
+            objs.append('<< /Type /Pages /Kids [%s] /Count %d >>' % (kid_refs, count))
+            level.append((len(objs), count))
+        nodes = level
+    objs[0] = '<< /Type /Catalog /Pages 2 0 R >>'
+    objs[1] = '<< /Type /Pages /Kids [%s] /Count %d >>' % (' '.join('%d 0 R' % kid for kid, _ in nodes), len(kids))
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for i, obj in enumerate(objs):
+        offsets.append(len(out))
+        out += ('%d 0 obj\n%s\nendobj\n' % (i + 1, obj)).encode('latin-1')
+    xref = len(out)
+    out += ('xref\n0 %d\n0000000000 65535 f \n' % (len(objs) + 1)).encode('latin-1')
+    for offset in offsets:
+        out += ('%010d 00000 n \n' % offset).encode('latin-1')
+    out += ('trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objs) + 1, xref)).encode('latin-1')
+    return out
@@ -0,0 +1 @@
+# keeps the repository root on sys.path, so tests can import paperminer and benchmarks without installing them
@@ -1,3 +1,4 @@
+import heapq
 import re
 from typing import List, Optional, Dict, Tuple, Any, cast
 
@@ -5,10 +6,22 @@ from pdfminer.layout import LTTextBox, LTAnno
 from pdfminer.pdffont import PDFFont
 from pdfminer.pdfinterp import PDFResourceManager
 
+from paperminer.fonts import FontCache
+
+__version__ = '0.1.2'
+
 
 class PaperResourceManager(PDFResourceManager):
+    # fields that line classification depends on; setting any of them to a new value starts a new generation
+    classification_fields = {'top_margin_ref', 'after_title', 'after_abstract', 'after_ref',
+                             'section_header_font', 'section_header_font_size', 'body_font', 'body_font_size',
+                             'tiny_font', 'tiny_font_size'}
+    # shared by every document parsed in this process when set, e.g. in the workers of a batch
+    font_cache: Optional[FontCache] = None
+
     def __init__(self) -> None:
         super().__init__()
+        self.generation = 0
         self.section_header_ref: List[LTTextBox] = []
         self.text_ref: List[LTTextBox] = []
         self.figure_ref: List[LTTextBox] = []
@@ -24,45 +37,88 @@ class PaperResourceManager(PDFResourceManager):
         self.section_header_font: Optional[PDFFont] = None
         self.section_header_font_size: float = 0
         self.font_map: Dict[Tuple[PDFFont, float], int] = {}
+        # the order keys were added to font_map in, which breaks ties between equally common fonts
+        self.font_order: Dict[Tuple[PDFFont, float], int] = {}
+        # the two most common keys of font_map, most common first
+        self.top_fonts: List[Tuple[PDFFont, float]] = []
+        # how often each (font, fontsize) is used by the lines of section_header_ref
+        self.section_header_fonts: Dict[Tuple[PDFFont, float], int] = {}
         self.body_font: Optional[PDFFont] = None
         self.body_font_size: float = 0
         self.tiny_font: Optional[PDFFont] = None
         self.tiny_font_size: float = 0
+        self.font_objids: Dict[PDFFont, Optional[int]] = {}
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in self.classification_fields and getattr(self, name, None) != value:
+            super().__setattr__('generation', self.generation + 1)
+        super().__setattr__(name, value)
+
+    def get_font(self, objid: Optional[int], spec: Dict[str, Any]) -> PDFFont:
+        font: Optional[PDFFont] = None
+        if self.font_cache is not None and objid and self.caching and objid not in self._cached_fonts:
+            font = self.font_cache.get_font(self, spec)
+            if font is not None:
+                self._cached_fonts[objid] = font
+        if font is None:
+            font = super().get_font(objid, spec)
+        # remember which object each font came from, so statistics can refer to it outside this process
+        self.font_objids[font] = objid
+        return font
 
     def post_process(self) -> None:
         # figure out section header fonts
-        font_list = [(item.font, item.fontsize) for item in self.section_header_ref]
-        self.section_header_font, self.section_header_font_size = get_most_popular(font_list)
+        if not self.section_header_ref:
+            raise ValueError('no section header (introduction, background, abstract or references) was found to '
+                             'tell the section header font by; the first pass needs pages that have one')
+        last_header = self.section_header_ref[-1]
+        self.section_header_font, self.section_header_font_size = get_most_frequent(
+            self.section_header_fonts, (last_header.font, last_header.fontsize))
 
-        max_key = None
-        for k in self.font_map.keys():
-            if not max_key or self.font_map[k] > self.font_map[max_key]:
-                max_key = k
+        (max_key, next_max_key) = (self.top_fonts + [None, None])[:2]
         self.body_font, self.body_font_size = cast(Tuple[PDFFont, float], max_key)
-
-        next_max_key = None
-        for k in self.font_map.keys():
-            if k != max_key and (not next_max_key or self.font_map[k] > self.font_map[next_max_key]):
-                next_max_key = k
         self.tiny_font, self.tiny_font_size = cast(Tuple[PDFFont, float], next_max_key)
 
+    def add_section_header(self, line: LTTextBox) -> None:
+        self.section_header_ref.append(line)
+        key = (line.font, line.fontsize)
+        self.section_header_fonts[key] = self.section_header_fonts.get(key, 0) + 1
+
+    def add_font_counts(self, counts: Dict[Tuple[PDFFont, float], int]) -> None:
+        """Count chars per (font, fontsize), adding keys new to font_map in the order of counts.
+
+        Counts only ever grow, so the two most common keys are among the previous two and the keys counted here.
+        """
+        font_map = self.font_map
+        for key, count in counts.items():
+            if key in font_map:
+                font_map[key] += count
+            else:
+                self.font_order[key] = len(font_map)
+                font_map[key] = count
+        candidates = set(self.top_fonts)
+        candidates.update(counts)
+        self.top_fonts = heapq.nsmallest(2, candidates, key=lambda key: (-font_map[key], self.font_order[key]))
+
     def tally(self, font: PDFFont, fontsize: float) -> None:
-        item = (font, fontsize)
-        if item not in self.font_map:
-            self.font_map[item] = 0
-        self.font_map[item] += 1
+        self.add_font_counts({(font, fontsize): 1})
 
 
 def get_most_popular(item_list: List[Any]) -> Any:
     freq: Dict[Any, int] = {}
     item: Any = None
-    max_key: Any = None
     for item in item_list:
         if item not in freq:
             freq[item] = 0
         freq[item] += 1
-    if item:
-        max_key = item
+    return get_most_frequent(freq, item)
+
+
+# ties are won by the last item counted, and otherwise by the first one counted
+def get_most_frequent(freq: Dict[Any, int], last_item: Any) -> Any:
+    max_key: Any = None
+    if last_item:
+        max_key = last_item
         for k in freq.keys():
             if freq[k] > freq[max_key]:
                 max_key = k
@@ -76,6 +132,16 @@ abstract_header_pattern = re.compile('[\\d.]* ?abstract( .+)?', re.IGNORECASE)
 background_header_pattern = re.compile('[\\d.]* ?background( .+)?', re.IGNORECASE)
 figure_pattern = re.compile('figure( \\w\\d*)?: ?.*', re.IGNORECASE)
 table_pattern = re.compile('table( \\w\\d*)?: ?.*', re.IGNORECASE)
+# all of the header, figure and table patterns above in one, with the group named after the one that matched
+line_kind_pattern = re.compile('[\\d.]* ?(?:(?P<introduction>introduction)|(?P<reference>reference)|'
+                               '(?P<abstract>abstract)|(?P<background>background))(?: .+)?|'
+                               '(?P<figure>figure)(?: \\w\\d*)?: ?.*|'
+                               '(?P<table>table)(?: \\w\\d*)?: ?.*', re.IGNORECASE)
+
+
+def match_line_kind(text: str) -> Optional[str]:
+    match = line_kind_pattern.match(text)
+    return match.lastgroup if match else None
 
 
 def compare_if_citation(d: float, obj1: LTTextBox, obj2: LTTextBox, x0_eval: bool) -> bool:
@@ -0,0 +1,5 @@
+import sys
+
+from paperminer.cli import main
+
+sys.exit(main())
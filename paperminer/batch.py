@@ -0,0 +1,254 @@
+import functools
+import logging
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Deque, Set, Tuple, Any, cast
+
+from PyPDF2 import PdfReader
+
+from paperminer import PaperResourceManager
+from paperminer.cache import PaperCache
+from paperminer.converter import PaperToTextConverter
+from paperminer.document import open_document
+from paperminer.fonts import FontCache
+from paperminer.output import MemorySink, PaperPage
+from paperminer.templates import TemplateStore
+
+log = logging.getLogger(__name__)
+
+
+# raised from a signal handler anywhere in pdfminer or paperminer, so an except Exception there must not stop it
+class ExtractionTimeout(BaseException):
+    pass
+
+
+class BatchResult:
+    def __init__(self, path: str, text: Optional[str] = None, error: Optional[str] = None,
+                 elapsed: float = 0, pages: Optional[List[PaperPage]] = None) -> None:
+        self.path = path
+        self.text = text
+        self.pages = pages
+        self.error = error
+        self.elapsed = elapsed
+        return
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return ('<%s %r ok=%r elapsed=%.3f>' %
+                (self.__class__.__name__, self.path, self.ok, self.elapsed))
+
+
+def find_papers(paths: Iterable[str]) -> List[str]:
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.pdf'):
+                        found.append(os.path.join(root, name))
+        else:
+            found.append(path)
+    return found
+
+
+def pages_text(pages: List[PaperPage]) -> str:
+    sink = MemorySink()
+    for page in pages:
+        sink.write_page(page)
+    return sink.getvalue()
+
+
+# pagenos: only extract these pages, numbered from 0 (see paperminer.document)
+# templates: skip most of the first pass of documents set in a known layout template (see paperminer.templates)
+def extract_pages(path: str, single_pass: bool = False, cache: Optional[PaperCache] = None,
+                  max_pages: Optional[int] = None, pagenos: Optional[List[int]] = None,
+                  templates: Optional[TemplateStore] = None) -> List[PaperPage]:
+    if cache is not None:
+        return cache.extract_pages(path, single_pass=single_pass, max_pages=max_pages, pagenos=pagenos,
+                                   templates=templates)
+    with open_document(path) as document:
+        converter = PaperToTextConverter(document, single_pass=single_pass, max_pages=max_pages, text_only=True,
+                                         pagenos=pagenos, templates=templates)
+        return list(converter.iter_pages())
+
+
+def extract_text(path: str, single_pass: bool = False, cache: Optional[PaperCache] = None,
+                 max_pages: Optional[int] = None, pagenos: Optional[List[int]] = None,
+                 templates: Optional[TemplateStore] = None) -> str:
+    if cache is not None:
+        return pages_text(cache.extract_pages(path, single_pass=single_pass, max_pages=max_pages, pagenos=pagenos,
+                                              templates=templates))
+    sink = MemorySink()
+    with open_document(path) as document:
+        converter = PaperToTextConverter(document, single_pass=single_pass, max_pages=max_pages, text_only=True,
+                                         pagenos=pagenos, templates=templates)
+        converter.get_result(sink)
+    return sink.getvalue()
+
+
+def count_pages(path: str) -> Optional[int]:
+    """Number of pages in the PDF at path, read from its page tree without interpreting any page."""
+    try:
+        reader = PdfReader(path, strict=False)
+        try:
+            return int(cast(Any, reader.trailer['/Root'])['/Pages']['/Count'])
+        except (KeyError, TypeError, ValueError):
+            return len(reader.pages)
+    except Exception as e:
+        log.debug('could not count pages of %s: %s', path, e)
+        return None
+
+
+def _scan_paper(path: str) -> Tuple[Optional[int], int]:
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return (count_pages(path), size)
+
+
+def schedule(paths: List[str], workers: int = 1, max_pages: Optional[int] = None) -> List[str]:
+    """paths ordered longest first, so that the longest documents do not start last and hold up the batch.
+
+    Length is the page count (at most max_pages), or for documents whose page tree cannot be read, their
+    size divided by the median bytes per page of the others.
+    """
+    if workers > 1 and len(paths) > workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scans = list(executor.map(_scan_paper, paths, chunksize=max(1, len(paths) // (workers * 4))))
+    else:
+        scans = [_scan_paper(path) for path in paths]
+    page_sizes = sorted(size / pages for (pages, size) in scans if pages)
+    page_size = page_sizes[len(page_sizes) // 2] if page_sizes else 1 << 16
+
+    def length(scan: Tuple[Optional[int], int]) -> float:
+        (pages, size) = scan
+        estimate = float(pages) if pages is not None else size / page_size
+        return min(estimate, max_pages) if max_pages is not None else estimate
+
+    order = sorted(range(len(paths)), key=lambda i: (length(scans[i]), scans[i][1]), reverse=True)
+    return [paths[i] for i in order]
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise ExtractionTimeout()
+
+
+def _init_worker(font_cache_size: int) -> None:
+    # fonts parsed for one document are reused by the later documents of the same worker
+    PaperResourceManager.font_cache = FontCache(font_cache_size) if font_cache_size > 0 else None
+    return
+
+
+# runs inside a pool worker; every document gets its own converter and so its own PaperResourceManager
+def _extract_worker(path: str, timeout: Optional[float], single_pass: bool, cache: Optional[PaperCache],
+                    keep_pages: bool, max_pages: Optional[int], pagenos: Optional[List[int]],
+                    templates: Optional[TemplateStore]) -> BatchResult:
+    start = time.time()
+    alarm = bool(timeout) and hasattr(signal, 'setitimer')
+    if alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, cast(float, timeout))
+    try:
+        try:
+            if keep_pages:
+                pages = extract_pages(path, single_pass=single_pass, cache=cache, max_pages=max_pages,
+                                      pagenos=pagenos, templates=templates)
+                return BatchResult(path, text=pages_text(pages), pages=pages, elapsed=time.time() - start)
+            text = extract_text(path, single_pass=single_pass, cache=cache, max_pages=max_pages, pagenos=pagenos,
+                                templates=templates)
+            return BatchResult(path, text=text, elapsed=time.time() - start)
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except ExtractionTimeout:
+        return BatchResult(path, error=f'timed out after {timeout}s', elapsed=time.time() - start)
+    except Exception as e:
+        return BatchResult(path, error=f'{e.__class__.__name__}: {e}', elapsed=time.time() - start)
+
+
+def _run_pool(queue: Deque[str],
+              workers: int,
+              work: Callable[[str], BatchResult],
+              font_cache_size: int,
+              broken: List[str]) -> Iterator[BatchResult]:
+    # at most one document per worker is in flight, so if a worker dies only those are suspects
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(font_cache_size,)) as executor:
+        running: Dict[Future, str] = {}
+        while queue or running:
+            while queue and len(running) < workers:
+                path = queue.popleft()
+                running[executor.submit(work, path)] = path
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = running.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    broken.append(path)
+                except Exception as e:
+                    yield BatchResult(path, error=f'{e.__class__.__name__}: {e}')
+            if broken:
+                broken.extend(running.values())
+                return
+    return
+
+
+def extract_batch(paths: Iterable[str],
+                  workers: Optional[int] = None,
+                  timeout: Optional[float] = None,
+                  single_pass: bool = False,
+                  cache: Optional[PaperCache] = None,
+                  font_cache_size: int = 256,
+                  keep_pages: bool = False,
+                  max_pages: Optional[int] = None,
+                  longest_first: bool = True,
+                  pagenos: Optional[List[int]] = None,
+                  templates: Optional[TemplateStore] = None) -> Iterator[BatchResult]:
+    """Extract text from every paper in paths (files or directories of PDFs) across a process pool.
+
+    Results are yielded in completion order. A document that raises or runs past timeout seconds is
+    reported as a failed BatchResult. When a worker process dies, the documents in flight are retried in a
+    new pool along with the rest; one that is in flight when a worker dies a second time is retried on its
+    own, and reported as failed if it kills that worker too. With a cache, documents seen before are not
+    parsed again. Each worker keeps up to font_cache_size parsed fonts for the documents after the one that embedded
+    them; 0 turns this off. With keep_pages, results also carry the classified pages, e.g. for
+    paperminer.records.
+
+    Unless longest_first is False, documents are started longest first (see schedule()), which keeps a few
+    long theses from running alone at the end. With max_pages, only the first max_pages pages of each
+    document are extracted, and with pagenos, only those pages of each document. With templates, documents set
+    in a layout template seen often enough before skip most of their first pass.
+    """
+    papers = find_papers(paths)
+    workers = workers or os.cpu_count() or 1
+    limit = max_pages if pagenos is None else min(len(pagenos), max_pages or len(pagenos))
+    queue = deque(schedule(papers, workers, limit) if longest_first else papers)
+    work = functools.partial(_extract_worker, timeout=timeout, single_pass=single_pass, cache=cache,
+                             keep_pages=keep_pages, max_pages=max_pages, pagenos=pagenos, templates=templates)
+    # documents that were in flight when a worker died
+    suspects: Set[str] = set()
+    while queue:
+        broken: List[str] = []
+        yield from _run_pool(queue, workers, work, font_cache_size, broken)
+        for path in reversed(broken):
+            if path not in suspects:
+                log.warning('worker died while processing %s, retrying', path)
+                suspects.add(path)
+                queue.appendleft(path)
+                continue
+            log.warning('worker died again while processing %s, retrying in isolation', path)
+            retry: List[str] = []
+            yield from _run_pool(deque([path]), 1, work, font_cache_size, retry)
+            if retry:
+                yield BatchResult(path, error='worker process died')
+    return
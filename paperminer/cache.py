@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Any, List, Optional, Tuple
+
+from pdfminer.pdfdocument import PDFDocument
+
+from paperminer import PaperResourceManager, __version__
+from paperminer.converter import PaperToTextConverter
+from paperminer.document import open_document
+from paperminer.output import PaperPage
+from paperminer.parallel import ResourceSummary, merge_summaries
+from paperminer.store import EntryStore
+from paperminer.templates import TemplateStore
+
+log = logging.getLogger(__name__)
+
+
+class PaperCache(EntryStore):
+    """On-disk cache of first-pass statistics and classified pages, keyed by file content and paperminer version.
+
+    Reading an entry refreshes its mtime, and the least recently used entries are evicted once the cache grows
+    past max_bytes (see EntryStore).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30) -> None:
+        super().__init__(directory, max_bytes=max_bytes)
+        return
+
+    @staticmethod
+    def key(path: str) -> str:
+        digest = hashlib.sha256(__version__.encode('utf-8'))
+        with open(path, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}-{kind}.pickle')
+
+    def get(self, key: str, kind: str) -> Optional[Any]:
+        path = self.entry_path(key, kind)
+        try:
+            with open(path, 'rb') as fp:
+                value = pickle.load(fp)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning('dropping unreadable cache entry %s: %s', path, e)
+            self.remove(path)
+            return None
+        return value
+
+    def put(self, key: str, kind: str, value: Any, evict: bool = True) -> None:
+        self.write(self.entry_path(key, kind), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), evict=evict)
+        return
+
+    def extract_pages(self, path: str, single_pass: bool = False, classified: bool = True,
+                      max_pages: Optional[int] = None, pagenos: Optional[List[int]] = None,
+                      templates: Optional[TemplateStore] = None) -> List[PaperPage]:
+        """Classified pages of the PDF at path, reusing whatever this cache has for it.
+
+        With classified, a cached result is returned without opening the PDF at all; otherwise cached
+        statistics still let the converter skip its first pass. Results for the first max_pages pages, or
+        for pagenos, are cached apart from those for the whole document. Statistics are not cached for
+        pagenos, as the pages around them are classified along with the first pass (see PaperToTextConverter),
+        nor when a layout template from templates stood in for the first pass.
+        """
+        key = self.key(path)
+        suffix = '' if max_pages is None else f'-{max_pages}'
+        if pagenos is not None:
+            suffix += '-p' + hashlib.sha1(','.join(map(str, sorted(set(pagenos)))).encode()).hexdigest()[:16]
+        if classified:
+            pages = self.get(key, 'pages' + suffix)
+            if pages is not None:
+                return pages
+        with open_document(path) as document:
+            summary = self.get(key, 'stats' + suffix) if pagenos is None else None
+            if summary is not None:
+                converter = PaperToTextConverter(document, rsrcmgr=merge_summaries(document, [summary]),
+                                                 max_pages=max_pages, text_only=True)
+                pages = list(converter.iter_pages())
+            else:
+                (pages, rsrcmgr) = self.convert(document, single_pass=single_pass, max_pages=max_pages,
+                                                pagenos=pagenos, templates=templates)
+                if rsrcmgr is not None:
+                    try:
+                        self.put(key, 'stats' + suffix, ResourceSummary(rsrcmgr))
+                    except ValueError as e:
+                        log.info('not caching statistics of %s: %s', path, e)
+        if classified:
+            self.put(key, 'pages' + suffix, pages)
+        return pages
+
+    def convert(self, document: PDFDocument, single_pass: bool = False, max_pages: Optional[int] = None,
+                pagenos: Optional[List[int]] = None, templates: Optional[TemplateStore] = None) \
+            -> Tuple[List[PaperPage], Optional[PaperResourceManager]]:
+        """Classified pages of a document this cache has no statistics of, and the statistics to cache for it
+        unless they are not those of a full first pass."""
+        converter = PaperToTextConverter(document, single_pass=single_pass, max_pages=max_pages, text_only=True,
+                                         pagenos=pagenos, templates=templates)
+        pages = list(converter.iter_pages())
+        if pagenos is not None or converter.templated:
+            return (pages, None)
+        return (pages, converter.rsrcmgr)
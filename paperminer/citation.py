@@ -0,0 +1,191 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Type
+
+from paperminer.layout import LTCitation, LTCitationBox, LTSectionHeader, LTPageMargin, LTFooter, LTTitle, LTAuthor
+from paperminer.output import PaperBlock, PaperPage
+
+label_pattern = re.compile('\\s*(?:\\[(\\d+)\\]|(\\d{1,3})\\.(?=\\s+\\S))\\s*')
+# an unlabelled citation starts with a surname followed by a comma, e.g. "Doe, J. and ..."
+author_start_pattern = re.compile("[A-Z][\\w'’-]+,\\s")
+link_pattern = re.compile('(?:https?://|doi:\\s*|\\b10\\.\\d{4,9}/)\\S+', re.IGNORECASE)
+year_pattern = re.compile('\\b(?:1[89]|20)\\d\\d(?=[a-z]?\\b)')
+quoted_title_pattern = re.compile('[“"](.+?)[”"]')
+# the end of a run of authors, or of a title; initials are told apart by what follows them
+sentence_end_pattern = re.compile('[.:](?:\\s+|$)')
+initial_end_pattern = re.compile('(?:^|[\\s.-])[A-Z]$')
+name_pattern = re.compile("[A-Z](?:\\.|[\\w'’-]*(?:[,.]|\\s+(?:and|&)\\s))")
+title_end_pattern = re.compile('(?<=[\\w)\\]]{2})[.?!](?=\\s|$)')
+author_split_pattern = re.compile('\\s*(?:,\\s*(?:and|&)\\s+|\\s+(?:and|&)\\s+|;\\s*|,\\s*)')
+initials_pattern = re.compile('(?:[A-Z]\\.?[\\s-]*)+$')
+et_al_pattern = re.compile('et\\.? al\\.?$')
+venue_space_pattern = re.compile('\\(\\)|\\s+(?=[,;.:])')
+venue_punctuation_pattern = re.compile('([,;.:])[,;.:]+')
+venue_prefix_pattern = re.compile('\\s*[Ii]n:?\\s+')
+leading_year_pattern = re.compile('\\(\\d{4}[a-z]?\\)[.:]?\\s*')
+
+
+def join_lines(lines: List[str]) -> str:
+    text = ''
+    for line in lines:
+        line = line.strip()
+        if text.endswith('-') and line[:1].islower():
+            text = text[:-1] + line
+        elif text:
+            text += ' ' + line
+        else:
+            text = line
+    return text
+
+
+def split_authors(text: str) -> List[str]:
+    authors: List[str] = []
+    text = text.strip(' ,:')
+    if text.endswith('.') and not initial_end_pattern.search(text, 0, len(text) - 1):
+        text = text[:-1]
+    for name in author_split_pattern.split(text):
+        if not name or et_al_pattern.match(name):
+            continue
+        if authors and initials_pattern.match(name):
+            authors[-1] += ', ' + name
+        else:
+            authors.append(name)
+    return authors
+
+
+def authors_end(text: str) -> int:
+    for match in sentence_end_pattern.finditer(text):
+        if initial_end_pattern.search(text, 0, match.start()) and name_pattern.match(text, match.end()):
+            continue
+        return match.start()
+    return 0
+
+
+def parse_citation(citation: LTCitation) -> None:
+    """Fill in the fields of citation from its text, e.g. '[3] J. Doe and K. Roe. A title. In Proc. X, 2019.'"""
+    text = citation.text
+    match = label_pattern.match(text)
+    if match:
+        citation.ref = int(match.group(1) or match.group(2))
+        text = text[match.end():]
+    match = link_pattern.search(text)
+    if match:
+        citation.link = match.group(0).rstrip('.,;)')
+        text = text[:match.start()] + text[match.end():]
+    years = year_pattern.findall(text)
+    if years:
+        citation.date = years[-1]
+    match = quoted_title_pattern.search(text)
+    if match:
+        (authors, title, venue) = (text[:match.start()], match.group(1).rstrip(' ,.'), text[match.end():])
+    else:
+        end = authors_end(text)
+        (authors, rest) = (text[:end], text[end:].lstrip('.: '))
+        rest = leading_year_pattern.sub('', rest, count=1)
+        match = title_end_pattern.search(rest)
+        if match:
+            title = rest[:match.end() if match.group(0) != '.' else match.start()]
+            venue = rest[match.end():]
+        else:
+            (title, venue) = (rest, '')
+    citation.author = split_authors(authors)
+    citation.title = title.strip() or None
+    venue = venue_space_pattern.sub('', year_pattern.sub('', venue))
+    venue = venue_punctuation_pattern.sub('\\1', venue)
+    venue = venue_prefix_pattern.sub('', venue).strip(' ,.;:')
+    citation.venue = venue or None
+    return
+
+
+class CitationParser:
+    """Splits the blocks of a references section into citations, in reading order.
+
+    The section starts at the references header, the same one that sets after_ref while classifying, or at
+    the first LTCitationBox, and ends at the next section header. A citation is emitted as soon as the next
+    one starts, so citations stream out while pages are still being converted.
+    """
+
+    skipped: Tuple[Type, ...] = (LTPageMargin, LTFooter, LTTitle, LTAuthor)
+
+    def __init__(self) -> None:
+        self.in_references = False
+        # whether citations are introduced by [n] or n. labels, decided by the first citation
+        self.labelled: Optional[bool] = None
+        self.lines: List[str] = []
+        self.last_block: Optional[PaperBlock] = None
+        self.klass: Type = LTCitationBox
+        self.pageid = 0
+        self.bbox: Tuple[float, float, float, float] = (0, 0, 0, 0)
+        self.count = 0
+        return
+
+    def feed(self, block: PaperBlock) -> Iterator[LTCitation]:
+        if issubclass(block.klass, LTSectionHeader):
+            if self.in_references:
+                yield from self.close()
+            self.in_references = 'references' in block.text.lower()
+            return
+        if not self.in_references:
+            if not issubclass(block.klass, LTCitationBox):
+                return
+            self.in_references = True
+        if issubclass(block.klass, self.skipped):
+            return
+        lines = [line for line in block.text.splitlines() if line.strip()]
+        if not lines:
+            return
+        labelled = label_pattern.match(lines[0]) is not None
+        # body text laid out next to the references header is not part of it
+        if (not issubclass(block.klass, LTCitationBox) and not labelled and
+                (not self.lines or block.klass is not self.klass)):
+            return
+        # a citation carries on at the top of the next column or page, so text below it is a footnote or footer
+        if (self.last_block is not None and not labelled and block.pageid == self.last_block.pageid and
+                block.bbox[3] < self.last_block.bbox[1]):
+            return
+        self.last_block = block
+        for line in lines:
+            if self.starts_citation(line):
+                yield from self.close()
+            if not self.lines:
+                (self.klass, self.pageid, self.bbox) = (block.klass, block.pageid, block.bbox)
+            elif block.bbox != self.bbox:
+                self.bbox = (min(self.bbox[0], block.bbox[0]), min(self.bbox[1], block.bbox[1]),
+                             max(self.bbox[2], block.bbox[2]), max(self.bbox[3], block.bbox[3]))
+            self.lines.append(line)
+        return
+
+    def starts_citation(self, line: str) -> bool:
+        labelled = label_pattern.match(line) is not None
+        if self.labelled:
+            return labelled
+        starts = (bool(self.lines) and self.lines[-1].rstrip().endswith('.') and
+                  author_start_pattern.match(line) is not None)
+        if self.labelled is None:
+            if labelled:
+                # whatever came before the first label is not a citation
+                self.labelled = True
+                self.lines = []
+                return False
+            if starts:
+                self.labelled = False
+        return starts
+
+    def close(self) -> Iterator[LTCitation]:
+        if not self.lines:
+            return
+        citation = LTCitation(join_lines(self.lines), self.pageid)
+        citation.set_bbox(self.bbox)
+        parse_citation(citation)
+        self.count += 1
+        if not citation.ref:
+            citation.ref = self.count
+        self.lines = []
+        yield citation
+
+
+def iter_citations(pages: Iterable[PaperPage]) -> Iterator[LTCitation]:
+    parser = CitationParser()
+    for page in pages:
+        for block in page:
+            yield from parser.feed(block)
+    yield from parser.close()
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+from paperminer.batch import extract_batch, find_papers
+from paperminer.cache import PaperCache
+from paperminer.document import parse_pages
+from paperminer.incremental import IncrementalCache
+from paperminer.index import IndexReader, IndexWriter
+from paperminer.metadata import extract_metadata
+from paperminer.records import ColumnarWriter, JSONLWriter, RecordWriter
+from paperminer.service import ExtractionService, serve_stdio
+from paperminer.templates import TemplateStore
+
+log = logging.getLogger(__name__)
+
+
+def output_names(papers: List[str]) -> Dict[str, str]:
+    """Name of the .txt file of each of papers in the output directory: that of the paper, or where papers in
+    different directories share it, its path from the directory they all lie in. Raises ValueError if two papers
+    would still be written to the same file."""
+    stems: Dict[str, List[str]] = {}
+    for path in dict.fromkeys(papers):
+        stems.setdefault(os.path.splitext(os.path.basename(path))[0], []).append(path)
+    names: Dict[str, str] = {}
+    for stem, paths in stems.items():
+        if len(paths) == 1:
+            names[paths[0]] = stem + '.txt'
+            continue
+        parent = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+        for path in paths:
+            names[path] = os.path.splitext(os.path.relpath(os.path.abspath(path), parent))[0] + '.txt'
+    written: Dict[str, str] = {}
+    for path, name in names.items():
+        if name in written:
+            raise ValueError(f'{written[name]} and {path} would both be written to {name}')
+        written[name] = path
+    return names
+
+
+def extract(args: argparse.Namespace) -> int:
+    names: Dict[str, str] = {}
+    if args.output_dir:
+        try:
+            names = output_names(find_papers(args.paths))
+        except ValueError as e:
+            log.error('%s', e)
+            return 1
+        os.makedirs(args.output_dir, exist_ok=True)
+    failed = 0
+    cache: Optional[PaperCache] = None
+    if args.cache_dir:
+        cache = (IncrementalCache if args.incremental else PaperCache)(args.cache_dir, args.cache_size << 20)
+    templates = TemplateStore(args.template_dir) if args.template_dir else None
+    writers: List[RecordWriter] = []
+    if args.jsonl:
+        writers.append(JSONLWriter(args.jsonl))
+    if args.columnar:
+        writers.append(ColumnarWriter(args.columnar))
+    if args.index:
+        writers.append(IndexWriter(args.index))
+    try:
+        for result in extract_batch(args.paths, workers=args.workers, timeout=args.timeout,
+                                    single_pass=args.single_pass, cache=cache, font_cache_size=args.font_cache,
+                                    keep_pages=bool(writers), max_pages=args.max_pages,
+                                    longest_first=not args.in_order, pagenos=args.pages, templates=templates):
+            if not result.ok:
+                failed += 1
+                log.error('%s: %s', result.path, result.error)
+                continue
+            log.info('%s: done in %.2fs', result.path, result.elapsed)
+            for writer in writers:
+                for page in result.pages or []:
+                    writer.write_page(result.path, page)
+            if args.output_dir:
+                output_path = os.path.join(args.output_dir, names[result.path])
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open(output_path, 'w', encoding='utf-8') as fp:
+                    fp.write(result.text or '')
+            elif not writers:
+                sys.stdout.write(result.text or '')
+    finally:
+        for writer in writers:
+            writer.close()
+    return 1 if failed else 0
+
+
+def metadata(args: argparse.Namespace) -> int:
+    failed = 0
+    for path in find_papers(args.paths):
+        try:
+            record = extract_metadata(path, max_pages=args.max_pages).to_dict()
+        except Exception as e:
+            failed += 1
+            log.error('%s: %s: %s', path, e.__class__.__name__, e)
+            continue
+        record['path'] = path
+        sys.stdout.write(json.dumps(record) + '\n')
+    return 1 if failed else 0
+
+
+def search(args: argparse.Namespace) -> int:
+    with IndexReader(args.index) as reader:
+        if args.section is not None:
+            for (doc, section) in reader.section_search(args.section, args.query, kinds=args.kind or ['LTSectionBody']):
+                sys.stdout.write(json.dumps({'doc': doc, 'section': section}) + '\n')
+        else:
+            for (doc, page, section, block) in reader.search(args.query, kinds=args.kind):
+                sys.stdout.write(json.dumps({'doc': doc, 'page': page, 'section': section, 'block': block}) + '\n')
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    async def run() -> None:
+        service = ExtractionService(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout,
+                                    single_pass=args.single_pass, font_cache_size=args.font_cache,
+                                    max_memory=args.max_memory << 20 if args.max_memory else None)
+        async with service:
+            await serve_stdio(service)
+        return
+
+    asyncio.run(run())
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='paperminer', description='extract text from research papers')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extract_parser = subparsers.add_parser('extract', help='extract text from PDFs or directories of PDFs')
+    extract_parser.add_argument('paths', nargs='+')
+    extract_parser.add_argument('-j', '--workers', type=int, default=None,
+                                help='number of worker processes (default: number of CPUs)')
+    extract_parser.add_argument('-t', '--timeout', type=float, default=None,
+                                help='per-document timeout in seconds')
+    extract_parser.add_argument('-o', '--output-dir', default=None,
+                                help='write one .txt per document here instead of to stdout, named after the '
+                                     'document, or after its relative path where documents share a name')
+    extract_parser.add_argument('--single-pass', action='store_true',
+                                help='reuse first-pass layout instead of interpreting every page twice')
+    extract_parser.add_argument('--cache-dir', default=None,
+                                help='reuse statistics and results of documents already extracted into this cache')
+    extract_parser.add_argument('--cache-size', type=int, default=1024,
+                                help='cache size limit in MB (default: %(default)s)')
+    extract_parser.add_argument('--incremental', action='store_true',
+                                help='also cache every page by its content, so that revised documents are only laid '
+                                     'out again where they changed (needs --cache-dir)')
+    extract_parser.add_argument('--template-dir', default=None,
+                                help='remember the fonts of layout templates here, and skip most of the first pass '
+                                     'of documents set in one seen before')
+    extract_parser.add_argument('--font-cache', type=int, default=256,
+                                help='parsed fonts each worker keeps for later documents, 0 to disable '
+                                     '(default: %(default)s)')
+    extract_parser.add_argument('--max-pages', type=int, default=None,
+                                help='only extract the first pages of each document')
+    extract_parser.add_argument('--pages', type=parse_pages, default=None,
+                                help='only extract these pages, e.g. 1,5-9; body and header fonts are then found '
+                                     'from them and the first page alone')
+    extract_parser.add_argument('--in-order', action='store_true',
+                                help='start documents in the order given instead of longest first')
+    extract_parser.add_argument('--jsonl', default=None,
+                                help='write one JSON record per classified block to this file; text is then only '
+                                     'written with -o')
+    extract_parser.add_argument('--columnar', default=None,
+                                help='write the same records to this file in the memory-mappable format of '
+                                     'paperminer.records')
+    extract_parser.add_argument('--index', default=None,
+                                help='add the classified blocks to the inverted index in this directory (see '
+                                     'paperminer search)')
+    extract_parser.set_defaults(func=extract)
+
+    search_parser = subparsers.add_parser('search', help='print the blocks of an index made with extract --index '
+                                                         'that use every word of a query, as JSON lines')
+    search_parser.add_argument('index')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--kind', action='append', default=None,
+                               help='only search blocks of this kind, e.g. LTCitationBox; may be repeated')
+    search_parser.add_argument('--section', default=None,
+                               help='print the sections whose header uses every word of this instead, and whose '
+                                    'body blocks (or blocks of --kind) use every word of the query')
+    search_parser.set_defaults(func=search)
+
+    metadata_parser = subparsers.add_parser('metadata', help='print title, authors and abstract as JSON lines')
+    metadata_parser.add_argument('paths', nargs='+')
+    metadata_parser.add_argument('--max-pages', type=int, default=3,
+                                 help='give up on finding the abstract after this many pages (default: %(default)s)')
+    metadata_parser.set_defaults(func=metadata)
+
+    serve_parser = subparsers.add_parser('serve', help='extract the PDFs named by JSON requests on stdin, answering '
+                                                       'on stdout (see paperminer.service.serve_stdio)')
+    serve_parser.add_argument('-j', '--workers', type=int, default=None,
+                              help='number of worker processes (default: number of CPUs)')
+    serve_parser.add_argument('-t', '--timeout', type=float, default=None,
+                              help='per-document timeout in seconds')
+    serve_parser.add_argument('--queue-size', type=int, default=64,
+                              help='documents waiting for a worker before requests stop being read '
+                                   '(default: %(default)s)')
+    serve_parser.add_argument('--max-memory', type=int, default=None,
+                              help='address space limit of each worker in MB')
+    serve_parser.add_argument('--single-pass', action='store_true',
+                              help='reuse first-pass layout instead of interpreting every page twice')
+    serve_parser.add_argument('--font-cache', type=int, default=256,
+                              help='parsed fonts each worker keeps for later documents, 0 to disable '
+                                   '(default: %(default)s)')
+    serve_parser.set_defaults(func=serve)
+
+    args = parser.parse_args(argv)
+    if args.command == 'extract' and args.incremental and not args.cache_dir:
+        extract_parser.error('--incremental requires --cache-dir')
+    logging.basicConfig(level=logging.WARNING)
+    if args.verbose:
+        logging.getLogger('paperminer').setLevel(logging.INFO)
+    return int(args.func(args))
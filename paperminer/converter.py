@@ -1,170 +1,520 @@
-import logging
-import sys
-from typing import Optional, Tuple, Any
-
-import six
-from pdfminer import utils
-from pdfminer.converter import PDFLayoutAnalyzer
-from pdfminer.layout import LAParams, LTAnno, LTContainer, LTPage, LTItem, LTLine
-from pdfminer.pdfcolor import PDFColorSpace
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdffont import PDFUnicodeNotDefined, PDFFont
-from pdfminer.pdfinterp import PDFPageInterpreter, PDFGraphicState
-from pdfminer.pdfpage import PDFPage
-from pdfminer.utils import apply_matrix_pt
-
-from paperminer import PaperResourceManager, intro_header_pattern, ref_header_pattern, abstract_header_pattern, \
-    background_header_pattern, figure_pattern, table_pattern
-from paperminer.layout import LTPageExtended, LTCharExtended, LTTextLineHorizontalExtended, LTPageMargin, LTFooter, \
-    LTCitationBox, LTAuthor, LTTitle
-
-log = logging.getLogger(__name__)
-
-
-class BasePaperAnalyzer(PDFLayoutAnalyzer):
-
-    def __init__(self, rsrcmgr: PaperResourceManager, pageno: int = 1, laparams: Optional[LAParams] = None) -> None:
-        super().__init__(rsrcmgr, pageno, laparams)
-        self.cur_item: Any = None
-        return
-
-    def begin_page(self, page: PDFPage, ctm: Tuple[int, int, int, int, int, int]) -> None:
-        (x0, y0, x1, y1) = page.mediabox
-        (x0, y0) = apply_matrix_pt(ctm, (x0, y0))
-        (x1, y1) = apply_matrix_pt(ctm, (x1, y1))
-        mediabox = (0, 0, abs(x0 - x1), abs(y0 - y1))
-        self.cur_item = LTPageExtended(self.pageno, mediabox)
-        return
-
-    def end_page(self, page: PDFPage) -> None:
-        assert not self._stack, str(len(self._stack))
-        assert isinstance(self.cur_item, LTPageExtended), str(type(self.cur_item))
-        if self.laparams is not None:
-            self.cur_item.analyze(self.laparams)
-        self.pageno += 1
-        self.receive_layout(self.cur_item)
-        return
-
-    def render_char(self,
-                    matrix: Tuple[int, int, int, int, int, int],
-                    font: PDFFont,
-                    fontsize: float,
-                    scaling: float,
-                    rise: float,
-                    cid: bytearray,
-                    ncs: PDFColorSpace,
-                    graphicstate: PDFGraphicState) -> None:
-        try:
-            text = font.to_unichr(cid)
-            assert isinstance(text, six.text_type), str(type(text))
-        except PDFUnicodeNotDefined:
-            text = self.handle_undefined_char(font, cid)
-        textwidth = font.char_width(cid)
-        textdisp = font.char_disp(cid)
-        item = LTCharExtended(matrix, font, fontsize, scaling, rise, text, textwidth, textdisp, ncs, graphicstate)
-        self.cur_item.add(item)
-        return item.adv
-
-    def receive_layout(self, ltpage: LTPage) -> None:
-        return
-
-
-class ExtendedPaperAnalyzer(BasePaperAnalyzer):
-    def __init__(self, rsrcmgr: PaperResourceManager, pageno: int = 1) -> None:
-        laparams = LAParams()
-        for param in ("all_texts", "detect_vertical", "word_margin", "char_margin", "line_margin", "boxes_flow"):
-            paramv = locals().get(param, None)
-            if paramv is not None:
-                setattr(laparams, param, paramv)
-        BasePaperAnalyzer.__init__(self, rsrcmgr, pageno=pageno, laparams=laparams)
-        return
-
-    # a typical page is 612 x 792 in pts or 8.5 x 11 in inches
-    # some common margin conversions: 1in = 72 pts, 0.5in = 36 pts
-    # LaTeX margins are probably going to be between 36-72pts
-    # anything drawn in the first 0.25 - 0.5 of the page is possibly a title + authors
-    # So that is 0 - [198-396] pts
-    def receive_layout(self, ltpage: LTPageExtended) -> None:
-        def render(item: LTItem, parent: Optional[LTItem], level: int, rsrcmgr: PaperResourceManager) -> None:
-            if isinstance(item, LTCharExtended):
-                rsrcmgr.tally(item.font, item.fontsize)
-            elif isinstance(item, LTTextLineHorizontalExtended):
-                if not rsrcmgr.top_margin_ref:
-                    rsrcmgr.top_margin_ref = item
-                if item.left_margin < rsrcmgr.left_margin:
-                    rsrcmgr.left_margin = item.left_margin
-                if item.right_margin > rsrcmgr.right_margin:
-                    rsrcmgr.right_margin = item.right_margin
-                if intro_header_pattern.match(item.get_text()):
-                    rsrcmgr.section_header_ref.append(item)
-                if background_header_pattern.match(item.get_text()):
-                    rsrcmgr.section_header_ref.append(item)
-                if not rsrcmgr.abstract_ref and abstract_header_pattern.match(item.get_text()) and \
-                        'extended' not in item.get_text().lower():
-                    rsrcmgr.abstract_ref = item
-                    rsrcmgr.section_header_ref.append(item)
-                if ref_header_pattern.match(item.get_text()):
-                    rsrcmgr.ref_ref = item
-                    rsrcmgr.section_header_ref.append(item)
-                if figure_pattern.match(item.get_text()):
-                    rsrcmgr.figure_ref.append(item)
-                if table_pattern.match(item.get_text()):
-                    rsrcmgr.table_ref.append(item)
-            if isinstance(item, LTContainer):
-                for child in item:
-                    render(child, item, level + 1, rsrcmgr)
-
-        render(ltpage, None, 0, self.rsrcmgr)
-        return
-
-
-class PaperToTextConverter(ExtendedPaperAnalyzer):
-    def __init__(self, document: PDFDocument) -> None:
-        super().__init__(PaperResourceManager())
-        self.document = document
-        analyzer = ExtendedPaperAnalyzer(self.rsrcmgr)
-        interpreter = PDFPageInterpreter(self.rsrcmgr, analyzer)
-        for page in PDFPage.create_pages(document):
-            interpreter.process_page(page)
-        self.rsrcmgr.post_process()
-        return
-
-    def begin_page(self, page: int, ctm: Tuple[int, int, int, int, int, int]) -> None:
-        super().begin_page(page, ctm)
-        self.cur_item.rsrcmgr = self.rsrcmgr
-        return
-
-    @staticmethod
-    def write_text(text: str) -> None:
-        text = utils.compatible_encode_method(text, 'utf-8', 'ignore')
-        sys.stdout.write(text)
-        return
-
-    def receive_layout(self, ltpage: LTPage) -> None:
-        def render(item: LTItem, parent: Optional[LTItem], level: int) -> None:
-            if (isinstance(item, LTPageMargin) or
-                    isinstance(item, LTFooter) or
-                    isinstance(item, LTCitationBox) or
-                    isinstance(item, LTLine) or
-                    isinstance(item, LTCitationBox) or
-                    isinstance(item, LTTitle) or
-                    isinstance(item, LTAuthor)):
-                return
-            if not isinstance(item, LTCharExtended) and not isinstance(item, LTAnno):
-                if parent.__class__.__name__ == 'LTTextBoxHorizontal' or isinstance(parent, LTPageExtended):
-                    if not isinstance(item, LTTextLineHorizontalExtended):
-                        print(f'{"".join([" "] * level)} -> {item.__class__.__name__}')
-            if isinstance(item, LTTextLineHorizontalExtended):
-                self.write_text(item.get_text())
-            elif isinstance(item, LTContainer):
-                for child in item:
-                    render(child, item, level + 1)
-
-        render(ltpage, None, 0)
-        return
-
-    def get_result(self) -> None:
-        interpreter = PDFPageInterpreter(self.rsrcmgr, self)
-        for page in PDFPage.create_pages(self.document):
-            interpreter.process_page(page)
-        return
+import itertools
+import logging
+import re
+from typing import Optional, Tuple, Any, Dict, Iterable, List, Iterator, cast
+
+import six
+from pdfminer.converter import PDFLayoutAnalyzer
+from pdfminer.layout import LAParams, LTContainer, LTPage, LTTextBox
+from pdfminer.pdfcolor import PDFColorSpace
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFUnicodeNotDefined, PDFFont
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFGraphicState, LITERAL_FORM
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import PDFStream, list_value, stream_value
+from pdfminer.psparser import literal_name
+from pdfminer.utils import apply_matrix_pt, MATRIX_IDENTITY
+
+from paperminer import PaperResourceManager, match_line_kind
+from paperminer.citation import iter_citations
+from paperminer.document import sample_pages, select_pages
+from paperminer.layout import LTPageExtended, LTCharExtended, LTTextLineHorizontalExtended, LTPageRecord, LTCitation
+from paperminer.output import PaperBlock, PaperPage, PaperSink, TextSink
+from paperminer.stats import ExtractionStats, PageStats, timed
+from paperminer.templates import TemplateCheck, TemplateStore
+
+log = logging.getLogger(__name__)
+
+
+# a BT (begin text) or Do (draw a nested XObject) keyword; also matches inside names and strings, which
+# only means a form is interpreted when it need not have been
+text_operator_pattern = re.compile(b'(?:BT|Do)(?![^\\s\\[\\]()<>{}/%])')
+
+
+class TextOnlyInterpreter(PDFPageInterpreter):
+    """Interprets pages without constructing or painting paths, for analyzers that only lay out text.
+
+    Form XObjects that cannot draw any text, typically plots made of thousands of path segments, are not
+    interpreted at all and only leave their (empty) figure behind.
+    """
+
+    def do_Do(self, xobjid_arg: Any) -> None:
+        xobjid = literal_name(xobjid_arg)
+        xobj = stream_value(self.xobjmap.get(xobjid))
+        if (isinstance(xobj, PDFStream) and xobj.get('Subtype') is LITERAL_FORM and 'BBox' in xobj and
+                text_operator_pattern.search(xobj.get_data()) is None):
+            self.device.begin_figure(xobjid, list_value(xobj['BBox']), list_value(xobj.get('Matrix', MATRIX_IDENTITY)))
+            self.device.end_figure(xobjid)
+            return
+        super().do_Do(xobjid_arg)
+        return
+
+    def do_m(self, x: Any, y: Any) -> None:
+        return
+
+    def do_l(self, x: Any, y: Any) -> None:
+        return
+
+    def do_c(self, x1: Any, y1: Any, x2: Any, y2: Any, x3: Any, y3: Any) -> None:
+        return
+
+    def do_v(self, x2: Any, y2: Any, x3: Any, y3: Any) -> None:
+        return
+
+    def do_y(self, x1: Any, y1: Any, x3: Any, y3: Any) -> None:
+        return
+
+    def do_h(self) -> None:
+        return
+
+    def do_re(self, x: Any, y: Any, w: Any, h: Any) -> None:
+        return
+
+    def do_S(self) -> None:
+        return
+
+    def do_f(self) -> None:
+        return
+
+    def do_f_a(self) -> None:
+        return
+
+    def do_B(self) -> None:
+        return
+
+    def do_B_a(self) -> None:
+        return
+
+
+class BasePaperAnalyzer(PDFLayoutAnalyzer):
+    pass_name = 'layout'
+
+    # text_only: leave out vector paths and images, which never end up in a text box; figures are
+    # still laid out for the text drawn inside them, and images keep an empty figure with their bbox
+    def __init__(self,
+                 rsrcmgr: PaperResourceManager,
+                 pageno: int = 1,
+                 laparams: Optional[LAParams] = None,
+                 stats: Optional[ExtractionStats] = None,
+                 text_only: bool = False) -> None:
+        super().__init__(rsrcmgr, pageno, laparams)
+        self.cur_item: Any = None
+        self.stats = stats
+        self.text_only = text_only
+        self.page_stats: Optional[PageStats] = None
+        # chars of the current page per (font, fontsize), in the order they were first drawn, when counted
+        self.font_counts: Optional[Dict[Tuple[PDFFont, float], int]] = None
+        if stats is not None:
+            # only instrumented analyzers pay for timing every char
+            self.render_char = self.render_char_timed  # type: ignore
+        return
+
+    def begin_page(self, page: PDFPage, ctm: Tuple[int, int, int, int, int, int]) -> None:
+        (x0, y0, x1, y1) = page.mediabox
+        (x0, y0) = apply_matrix_pt(ctm, (x0, y0))
+        (x1, y1) = apply_matrix_pt(ctm, (x1, y1))
+        mediabox = (0, 0, abs(x0 - x1), abs(y0 - y1))
+        self.cur_item = LTPageExtended(self.pageno, mediabox)
+        if self.stats is not None:
+            self.page_stats = self.stats.begin_page(self.pass_name, self.pageno)
+            self.cur_item.stats = self.page_stats
+            self.page_stats.start('interpret')
+        return
+
+    def end_page(self, page: PDFPage) -> None:
+        assert not self._stack, str(len(self._stack))
+        assert isinstance(self.cur_item, LTPageExtended), str(type(self.cur_item))
+        page_stats = self.page_stats
+        if page_stats is not None:
+            page_stats.stop()
+        if self.laparams is not None:
+            self.cur_item.analyze(self.laparams)
+        self.pageno += 1
+        with timed(page_stats, 'receive_layout'):
+            self.receive_layout(self.cur_item)
+        self.end_page_stats()
+        return
+
+    def paint_path(self, gstate: PDFGraphicState, stroke: bool, fill: bool, evenodd: bool, path: List[Any]) -> None:
+        if not self.text_only:
+            super().paint_path(gstate, stroke, fill, evenodd, path)
+        return
+
+    def render_image(self, name: str, stream: PDFStream) -> None:
+        if not self.text_only:
+            super().render_image(name, stream)
+        return
+
+    def create_interpreter(self) -> PDFPageInterpreter:
+        return (TextOnlyInterpreter if self.text_only else PDFPageInterpreter)(self.rsrcmgr, self)
+
+    def end_page_stats(self) -> None:
+        if self.stats is not None and self.page_stats is not None:
+            self.stats.end_page(self.page_stats)
+            self.page_stats = None
+        return
+
+    def render_char(self,
+                    matrix: Tuple[int, int, int, int, int, int],
+                    font: PDFFont,
+                    fontsize: float,
+                    scaling: float,
+                    rise: float,
+                    cid: bytearray,
+                    ncs: PDFColorSpace,
+                    graphicstate: PDFGraphicState) -> float:
+        try:
+            text = font.to_unichr(cid)
+            assert isinstance(text, six.text_type), str(type(text))
+        except PDFUnicodeNotDefined:
+            text = self.handle_undefined_char(font, cid)
+        textwidth = font.char_width(cid)
+        textdisp = font.char_disp(cid)
+        item = LTCharExtended(matrix, font, fontsize, scaling, rise, text, textwidth, textdisp, ncs, graphicstate)
+        self.cur_item.add(item)
+        font_counts = self.font_counts
+        if font_counts is not None:
+            key = (font, fontsize)
+            font_counts[key] = font_counts.get(key, 0) + 1
+        return item.adv
+
+    def render_char_timed(self,
+                          matrix: Tuple[int, int, int, int, int, int],
+                          font: PDFFont,
+                          fontsize: float,
+                          scaling: float,
+                          rise: float,
+                          cid: bytearray,
+                          ncs: PDFColorSpace,
+                          graphicstate: PDFGraphicState) -> float:
+        page_stats = cast(PageStats, self.page_stats)
+        page_stats.start('render_char')
+        adv = type(self).render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate)
+        page_stats.stop()
+        return adv
+
+    def receive_layout(self, ltpage: LTPage) -> None:
+        return
+
+
+class ExtendedPaperAnalyzer(BasePaperAnalyzer):
+    pass_name = 'pass one'
+    # count the chars of every page per font into the resource manager as they are drawn
+    counts_fonts = True
+
+    def __init__(self,
+                 rsrcmgr: PaperResourceManager,
+                 pageno: int = 1,
+                 keep_records: bool = False,
+                 stats: Optional[ExtractionStats] = None,
+                 text_only: bool = False) -> None:
+        laparams = LAParams()
+        for param in ("all_texts", "detect_vertical", "word_margin", "char_margin", "line_margin", "boxes_flow"):
+            paramv = locals().get(param, None)
+            if paramv is not None:
+                setattr(laparams, param, paramv)
+        BasePaperAnalyzer.__init__(self, rsrcmgr, pageno=pageno, laparams=laparams, stats=stats, text_only=text_only)
+        self.records: Optional[List[LTPageRecord]] = [] if keep_records else None
+        return
+
+    # a typical page is 612 x 792 in pts or 8.5 x 11 in inches
+    # some common margin conversions: 1in = 72 pts, 0.5in = 36 pts
+    # LaTeX margins are probably going to be between 36-72pts
+    # anything drawn in the first 0.25 - 0.5 of the page is possibly a title + authors
+    # So that is 0 - [198-396] pts
+    def begin_page(self, page: PDFPage, ctm: Tuple[int, int, int, int, int, int]) -> None:
+        super().begin_page(page, ctm)
+        if self.counts_fonts:
+            self.font_counts = {}
+        return
+
+    def receive_layout(self, ltpage: LTPageExtended) -> None:
+        rsrcmgr = self.rsrcmgr
+        if self.font_counts is not None:
+            rsrcmgr.add_font_counts(self.font_order(ltpage, self.font_counts))
+            self.font_counts = None
+        # text lines are only ever found in text boxes, or on their own if they are empty
+        for item in ltpage:
+            if isinstance(item, LTTextBox):
+                for line in item:
+                    if isinstance(line, LTTextLineHorizontalExtended):
+                        self.receive_line(line)
+            elif isinstance(item, LTTextLineHorizontalExtended):
+                self.receive_line(item)
+        if self.records is not None:
+            record = cast(LTPageRecord, ltpage.record)
+            record.pageid = ltpage.pageid
+            self.records.append(record)
+        return
+
+    def font_order(self, ltpage: LTPageExtended, font_counts: Dict[Tuple[PDFFont, float], int]) \
+            -> Dict[Tuple[PDFFont, float], int]:
+        """font_counts with the fonts new to this document in the order their chars are laid out on the page,
+        which is the order ties between equally common fonts have always been broken in."""
+        font_map = self.rsrcmgr.font_map
+        new = {key for key in font_counts if key not in font_map}
+        if len(new) < 2:
+            return font_counts
+        ordered: Dict[Tuple[PDFFont, float], int] = {}
+        for key in iter_char_fonts(ltpage):
+            if key in new and key not in ordered:
+                ordered[key] = font_counts[key]
+                if len(ordered) == len(new):
+                    break
+        for key, count in font_counts.items():
+            if key not in ordered:
+                ordered[key] = count
+        return ordered
+
+    def receive_line(self, item: LTTextLineHorizontalExtended) -> None:
+        rsrcmgr = self.rsrcmgr
+        if not rsrcmgr.top_margin_ref:
+            rsrcmgr.top_margin_ref = item
+        if item.left_margin < rsrcmgr.left_margin:
+            rsrcmgr.left_margin = item.left_margin
+        if item.right_margin > rsrcmgr.right_margin:
+            rsrcmgr.right_margin = item.right_margin
+        text = item.get_text()
+        kind = match_line_kind(text)
+        if kind == 'introduction' or kind == 'background':
+            rsrcmgr.add_section_header(item)
+        elif kind == 'abstract':
+            if not rsrcmgr.abstract_ref and 'extended' not in text.lower():
+                rsrcmgr.abstract_ref = item
+                rsrcmgr.add_section_header(item)
+        elif kind == 'reference':
+            rsrcmgr.ref_ref = item
+            rsrcmgr.add_section_header(item)
+        elif kind == 'figure':
+            rsrcmgr.figure_ref.append(item)
+        elif kind == 'table':
+            rsrcmgr.table_ref.append(item)
+        return
+
+
+def iter_char_fonts(item: LTContainer) -> Iterator[Tuple[PDFFont, float]]:
+    for child in item:
+        if isinstance(child, LTCharExtended):
+            yield (child.font, child.fontsize)
+        elif isinstance(child, LTContainer):
+            yield from iter_char_fonts(child)
+    return
+
+
+class PaperToTextConverter(ExtendedPaperAnalyzer):
+    pass_name = 'pass two'
+    counts_fonts = False
+    # pages held back while a template is checked against them (see iter_pages)
+    template_check_pages = 16
+
+    # single_pass: keep the textlines grouped in the first pass and only redo
+    # group_textlines against the finalized statistics in get_result(),
+    # instead of interpreting every page a second time
+    # rsrcmgr: statistics already collected for this document (see paperminer.parallel),
+    # in which case the first pass is skipped
+    # stats: collect per-page stage timings and counters of both passes into it
+    # max_pages: only lay out the first max_pages pages, in both passes
+    # text_only: skip paths and images in both passes (see BasePaperAnalyzer); the blocks are the same
+    # pagenos: only lay out these pages, numbered from 0 and picked out of the page tree (see paperminer.document)
+    # stats_pages: the pages the first pass collects statistics from, by default those sample_pages picks for
+    # pagenos, or every page; those of them that are not output are still classified, in page order, for what
+    # they change about the pages after them, so with every page the output is that of a whole document run;
+    # pagenos that are not among them are laid out in the second pass, with single_pass too; without a section
+    # header among them the statistics cannot be finished, and ValueError is raised
+    # templates: when a whole document is converted, look its first page up there (see paperminer.templates),
+    # and on a hit classify with the template after a first pass over that page alone; otherwise the statistics
+    # of the full first pass are recorded there
+    def __init__(self,
+                 document: PDFDocument,
+                 single_pass: bool = False,
+                 rsrcmgr: Optional[PaperResourceManager] = None,
+                 stats: Optional[ExtractionStats] = None,
+                 max_pages: Optional[int] = None,
+                 text_only: bool = False,
+                 pagenos: Optional[Iterable[int]] = None,
+                 stats_pages: Optional[Iterable[int]] = None,
+                 templates: Optional[TemplateStore] = None) -> None:
+        if single_pass and rsrcmgr is not None:
+            raise ValueError('single_pass needs the first pass to run in this converter')
+        super().__init__(rsrcmgr or PaperResourceManager(), stats=stats, text_only=text_only)
+        self.document = document
+        self.max_pages = max_pages
+        self.pagenos = None if pagenos is None else sorted(set(pagenos))
+        self.page: Optional[PaperPage] = None
+        if stats_pages is None and self.pagenos is not None:
+            stats_pages = sample_pages(self.pagenos)
+        self.stats_pages = None if stats_pages is None else sorted(set(stats_pages))
+        self.templates = templates if max_pages is None and self.stats_pages is None else None
+        # fingerprint of the first page, and whether a template of it stood in for the rest of the first pass
+        self.fingerprint: Optional[str] = None
+        self.templated = False
+        # first-pass records of pages that are classified but not output
+        self.skipped: List[LTPageRecord] = []
+        if rsrcmgr is None:
+            skips = self.pagenos is not None and self.stats_pages != self.pagenos
+            analyzer = ExtendedPaperAnalyzer(self.rsrcmgr, keep_records=single_pass or skips, stats=stats,
+                                             text_only=text_only)
+            self.first_pass(analyzer)
+            self.records = analyzer.records
+            if self.templated:
+                # only the first page was laid out, so every page is interpreted again
+                self.records = None
+            if skips and self.records is not None:
+                selected = set(cast(List[int], self.pagenos))
+                self.skipped = [record for record in self.records if record.pageid - 1 not in selected]
+                self.records = [record for record in self.records if record.pageid - 1 in selected]
+            if not single_pass:
+                self.records = None
+        # checks the template against the fonts of every page the second pass lays out
+        self.check: Optional[TemplateCheck] = None
+        if self.templated:
+            self.check = TemplateCheck(self.rsrcmgr)
+            self.counts_fonts = True
+        else:
+            self.end_first_pass()
+        return
+
+    def end_first_pass(self) -> None:
+        self.rsrcmgr.post_process()
+        if self.templates is not None and self.fingerprint is not None:
+            self.templates.learn(self.fingerprint, self.rsrcmgr)
+        return
+
+    def redo_first_pass(self) -> None:
+        """Run the full first pass a template stood in for, from scratch."""
+        self.rsrcmgr = PaperResourceManager()
+        (self.templated, self.check, self.counts_fonts) = (False, None, False)
+        self.first_pass(ExtendedPaperAnalyzer(self.rsrcmgr, stats=self.stats, text_only=self.text_only))
+        self.end_first_pass()
+        return
+
+    def first_pass(self, analyzer: ExtendedPaperAnalyzer) -> None:
+        interpreter = analyzer.create_interpreter()
+        for (pageno, page) in self.create_pages(self.stats_pages):
+            analyzer.pageno = pageno + 1
+            interpreter.process_page(page)
+            if self.templates is not None and self.fingerprint is None:
+                self.fingerprint = self.templates.fingerprint(page.mediabox, self.rsrcmgr.font_map)
+                template = self.templates.lookup(self.fingerprint)
+                if template is not None and template.apply(self.rsrcmgr):
+                    self.templated = True
+                    return
+        return
+
+    def create_pages(self, pagenos: Optional[List[int]] = None) -> Iterator[Tuple[int, PDFPage]]:
+        """(page number from 0, page) of the pages in pagenos, or of every page, up to max_pages of them."""
+        if pagenos is None:
+            pages: Iterator[Tuple[int, PDFPage]] = enumerate(PDFPage.create_pages(self.document))
+        else:
+            pages = select_pages(self.document, pagenos)
+        return pages if self.max_pages is None else itertools.islice(pages, self.max_pages)
+
+    def begin_page(self, page: int, ctm: Tuple[int, int, int, int, int, int]) -> None:
+        super().begin_page(page, ctm)
+        self.cur_item.rsrcmgr = self.rsrcmgr
+        return
+
+    def receive_layout(self, ltpage: LTPageExtended) -> None:
+        if self.check is not None:
+            self.check.add_page(ltpage, self.font_counts or {})
+            self.font_counts = None
+        blocks = []
+        for item in ltpage:
+            # lines are only left outside of boxes when they have no width or height, e.g. text set in a
+            # zero font size; they have always been written out too
+            if isinstance(item, (LTTextBox, LTTextLineHorizontalExtended)):
+                blocks.append(PaperBlock(ltpage.pageid, item))
+            else:
+                log.debug('page %d: skipping %s', ltpage.pageid, item.__class__.__name__)
+        self.page = PaperPage(ltpage.pageid, ltpage.bbox, blocks)
+        return
+
+    def replay_page(self, record: LTPageRecord) -> None:
+        self.pageno = record.pageid
+        self.cur_item = LTPageExtended(self.pageno, record.bbox, rsrcmgr=self.rsrcmgr)
+        if self.stats is not None:
+            self.page_stats = self.stats.begin_page(self.pass_name, self.pageno)
+            self.cur_item.stats = self.page_stats
+        self.cur_item.analyze_record(self.laparams, record)
+        self.pageno += 1
+        with timed(self.page_stats, 'receive_layout'):
+            self.receive_layout(self.cur_item)
+        self.end_page_stats()
+        return
+
+    def iter_pages(self) -> Iterator[PaperPage]:
+        """Lay out and classify the document one page at a time.
+
+        With a template, the first template_check_pages pages are held back until the template is checked against
+        them; if they disagree with it they are dropped, and the document is classified again after a full first
+        pass. The pages after those are passed on as they are laid out, and a template that the whole document
+        turns out to disagree with is dropped from the store, so that the next document runs a full first pass.
+        """
+        check = self.check
+        if check is not None:
+            interpreted = self.interpret_pages()
+            pages = list(itertools.islice(interpreted, self.template_check_pages))
+            if check.agrees():
+                yield from pages
+                del pages
+                yield from interpreted
+                if not check.agrees():
+                    log.warning('template %s does not fit the later pages of the document, dropping it',
+                                self.fingerprint)
+                    templates = cast(TemplateStore, self.templates)
+                    templates.remove(templates.entry_path(cast(str, self.fingerprint)))
+                self.check = None
+                return
+            log.info('template %s does not fit the document, running the full first pass', self.fingerprint)
+            self.redo_first_pass()
+        if self.records is not None and self.pagenos is None:
+            for record in self.records:
+                self.replay_page(record)
+                yield self.pop_page()
+            return
+        yield from self.interpret_pages()
+        return
+
+    def interpret_pages(self) -> Iterator[PaperPage]:
+        """Lay out the pages of pagenos, replaying those the first pass kept the records of; pagenos that are not
+        among stats_pages have none."""
+        recorded = {record.pageid: record for record in self.records or ()}
+        interpreter = self.create_interpreter()
+        for (pageno, page) in self.create_pages(self.pagenos):
+            self.skip_to(pageno + 1)
+            record = recorded.get(pageno + 1)
+            if record is not None:
+                self.replay_page(record)
+            else:
+                self.pageno = pageno + 1
+                interpreter.process_page(page)
+            yield self.pop_page()
+        return
+
+    def skip_to(self, pageid: int) -> None:
+        """Classify the skipped pages before pageid, for the state they leave behind, and drop them."""
+        while self.skipped and self.skipped[0].pageid < pageid:
+            self.replay_page(self.skipped.pop(0))
+            self.pop_page()
+        return
+
+    def iter_blocks(self) -> Iterator[PaperBlock]:
+        for page in self.iter_pages():
+            yield from page
+
+    def iter_citations(self) -> Iterator[LTCitation]:
+        """Parse the references section into citations as its pages are converted."""
+        return iter_citations(self.iter_pages())
+
+    def pop_page(self) -> PaperPage:
+        page = cast(PaperPage, self.page)
+        self.page = None
+        return page
+
+    def get_result(self, sink: Optional[PaperSink] = None) -> None:
+        if sink is None:
+            sink = TextSink()
+        for page in self.iter_pages():
+            sink.write_page(page)
+        sink.close()
+        return
@@ -0,0 +1,113 @@
+"""Opening PDFs through mmap, and picking pages out of their page tree without visiting the others.
+
+    with open_document('thesis.pdf') as document:
+        converter = PaperToTextConverter(document, pagenos=parse_pages('5-9'))
+
+Page numbers count from 0, as in pdfminer's PDFPage.get_pages; parse_pages reads the 1-based ranges people
+write. Only the page tree nodes on the way to the selected pages are parsed, and only the contents of the
+selected pages are ever read, which the operating system pages in from the mapped file as they are.
+"""
+import bisect
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pdfminer import settings
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage, LITERAL_PAGE, LITERAL_PAGES
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import dict_value, int_value, list_value, resolve1
+
+
+@contextmanager
+def open_document(path: str, password: str = '') -> Iterator[PDFDocument]:
+    """The PDF at path, parsed from a read-only memory map of it; the document can only be used inside the with."""
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            # an empty file cannot be mapped, so let the parser complain about it
+            yield PDFDocument(PDFParser(fp), password=password)
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield PDFDocument(PDFParser(data), password=password)
+    return
+
+
+def parse_pages(spec: str) -> List[int]:
+    """0-based page numbers of a comma-separated list of 1-based pages and ranges, e.g. '1,5-9'."""
+    pagenos: Set[int] = set()
+    for part in spec.split(','):
+        (first, _, last) = part.strip().partition('-')
+        start = int(first)
+        stop = int(last) if last else start
+        if start < 1 or stop < start:
+            raise ValueError(f'bad page range {part.strip()!r}')
+        pagenos.update(range(start - 1, stop))
+    return sorted(pagenos)
+
+
+def select_pages(document: PDFDocument, pagenos: Iterable[int]) -> Iterator[Tuple[int, PDFPage]]:
+    """(page number, page) of each of pagenos in order, descending only into the page tree nodes whose /Count
+    says they hold one of them; pages that do not exist are left out."""
+    wanted = sorted(set(pagenos))
+    if not wanted:
+        return
+    if 'Pages' not in document.catalog:
+        # without a page tree pdfminer finds the pages among all objects, so there is nothing to skip
+        for pageno, page in enumerate(PDFPage.create_pages(document)):
+            if pageno > wanted[-1]:
+                break
+            if pageno == wanted[bisect.bisect_left(wanted, pageno)]:
+                yield (pageno, page)
+        return
+
+    # yields (page number, objid, attrs) of the wanted pages below obj and returns how many pages it holds
+    def search(obj: Any, parent: Dict[str, Any], first: int) -> Generator[Tuple[int, Any, Dict[str, Any]], None, int]:
+        if isinstance(obj, int):
+            objid = obj
+            tree = dict_value(document.getobj(objid)).copy()
+        else:
+            objid = obj.objid
+            tree = dict_value(obj).copy()
+        for (k, v) in parent.items():
+            if k in PDFPage.INHERITABLE_ATTRS and k not in tree:
+                tree[k] = v
+        tree_type = tree.get('Type')
+        if tree_type is None and not settings.STRICT:
+            tree_type = tree.get('type')
+        if tree_type is LITERAL_PAGES and 'Kids' in tree:
+            count: Optional[int] = None
+            if 'Count' in tree:
+                count = int_value(resolve1(tree['Count']))
+                i = bisect.bisect_left(wanted, first)
+                if i == len(wanted) or wanted[i] >= first + count:
+                    return count
+            npages = 0
+            for kid in list_value(tree['Kids']):
+                if first + npages > wanted[-1]:
+                    break
+                npages += yield from search(kid, tree, first + npages)
+            return count if count is not None else npages
+        elif tree_type is LITERAL_PAGE:
+            i = bisect.bisect_left(wanted, first)
+            if i < len(wanted) and wanted[i] == first:
+                yield (first, objid, tree)
+            return 1
+        return 0
+
+    for (pageno, objid, tree) in search(document.catalog['Pages'], document.catalog, 0):
+        yield (pageno, PDFPage(document, objid, tree))
+    return
+
+
+def sample_pages(pagenos: Iterable[int], npages: int = 0, samples: int = 0) -> List[int]:
+    """Pages for the first pass to collect statistics from when only pagenos are extracted: the first page,
+    whose top line every other page is measured against, pagenos, and samples more pages spread evenly over
+    the npages of the document.
+
+    Fonts are then counted on those pages alone, so body text is told apart from the rest as in the whole
+    document as long as they are typical of it. To classify pagenos exactly as a run over the whole document
+    does, collect statistics from every page instead.
+    """
+    spread = {npages * i // samples for i in range(samples)} if samples else set()
+    return sorted(set(pagenos) | spread | {0})
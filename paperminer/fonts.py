@@ -0,0 +1,108 @@
+import copy
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from pdfminer.pdffont import PDFFont
+from pdfminer.pdfinterp import PDFResourceManager
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSLiteral, PSKeyword
+
+
+class UncachableFont(Exception):
+    pass
+
+
+class FontCache:
+    """Bounded cache of parsed fonts shared by the resource managers of many documents.
+
+    Fonts are keyed on their whole font dictionary, with descriptors and other referenced objects resolved
+    and embedded streams (font files, ToUnicode CMaps) replaced by a hash of their contents, so the same font
+    embedded by different papers is parsed once. Each document still gets its own font object, a shallow
+    copy sharing the parsed width and unicode tables, so fonts stay distinct keys of that document's
+    statistics even when two of its fonts happen to be identical.
+    """
+
+    max_depth = 16
+
+    def __init__(self, max_fonts: int = 256) -> None:
+        self.max_fonts = max_fonts
+        self.fonts: 'OrderedDict[Hashable, PDFFont]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        return
+
+    def get_font(self, rsrcmgr: PDFResourceManager, spec: Dict[str, Any]) -> Optional[PDFFont]:
+        """A font for spec, or None if it cannot be shared between documents."""
+        try:
+            key = self.key(spec)
+        except UncachableFont:
+            return None
+        font = self.fonts.get(key)
+        if font is not None:
+            self.fonts.move_to_end(key)
+            self.hits += 1
+            return copy.copy(font)
+        self.misses += 1
+        font = PDFResourceManager.get_font(rsrcmgr, None, spec)
+        self.fonts[key] = self.detach(font)
+        while len(self.fonts) > self.max_fonts:
+            self.fonts.popitem(last=False)
+        return font
+
+    @classmethod
+    def key(cls, spec: Dict[str, Any]) -> Hashable:
+        subtype = spec.get('Subtype')
+        if isinstance(subtype, PSLiteral) and subtype.name == 'Type3':
+            # glyphs are content streams drawing with the document's own resources
+            raise UncachableFont()
+        return cls.canonical(spec, 0)
+
+    @classmethod
+    def canonical(cls, value: Any, depth: int) -> Hashable:
+        if depth > cls.max_depth:
+            raise UncachableFont()
+        if isinstance(value, PDFObjRef):
+            try:
+                value = value.resolve()
+            except Exception:
+                raise UncachableFont()
+        if isinstance(value, dict):
+            return ('dict',) + tuple(sorted((str(k), cls.canonical(v, depth + 1)) for (k, v) in value.items()))
+        if isinstance(value, (list, tuple)):
+            return ('list',) + tuple(cls.canonical(v, depth + 1) for v in value)
+        if isinstance(value, PDFStream):
+            try:
+                data = value.get_data()
+            except Exception:
+                raise UncachableFont()
+            return ('stream', cls.canonical(value.attrs, depth + 1), hashlib.sha1(data).hexdigest())
+        if isinstance(value, PSLiteral):
+            return ('literal', value.name)
+        if isinstance(value, PSKeyword):
+            return ('keyword', value.name)
+        if value is None or isinstance(value, (bool, int, float, str, bytes)):
+            return value
+        raise UncachableFont()
+
+    @classmethod
+    def detach(cls, font: PDFFont) -> PDFFont:
+        # copy of font without the references into its document, which would keep the document alive
+        font = copy.copy(font)
+        font.descriptor = cls.detach_value(font.descriptor)
+        if hasattr(font, 'fontfile'):
+            del font.fontfile
+        if hasattr(font, 'cidsysteminfo'):
+            font.cidsysteminfo = cls.detach_value(font.cidsysteminfo)
+        return font
+
+    @classmethod
+    def detach_value(cls, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: cls.detach_value(v) for (k, v) in value.items() if not isinstance(v, (PDFObjRef, PDFStream))}
+        if isinstance(value, list):
+            return [cls.detach_value(v) for v in value if not isinstance(v, (PDFObjRef, PDFStream))]
+        return value
+
+    def stats(self) -> Tuple[int, int, int]:
+        return (len(self.fonts), self.hits, self.misses)
@@ -0,0 +1,304 @@
+"""Incremental re-extraction: a cache of every page by its content, so that a revised paper is laid out again only
+where it changed.
+
+    cache = IncrementalCache('cache/')
+    pages = cache.extract_pages('paper-v2.pdf')
+
+A page is keyed by a hash of its content streams, resources, boxes and rotation, with the objects they refer to
+hashed by content rather than by object number, so pages keep their keys when a revision renumbers objects or
+moves them around. For each page the cache keeps the first-pass statistics it contributes, with fonts referred
+to by their names in the page resources, and the blocks it was classified into together with what they were
+classified with. A revision then only lays out its new and changed pages in the first pass; the statistics of
+the document are merged from those of every page as in paperminer.parallel, and a page is classified again only
+if it changed or if the body or section header fonts, the top line of the document or the sections before it
+now classify it differently. The pages are exactly those of a run over the whole document.
+"""
+import copy
+import hashlib
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, cast
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import PDFObjRef, PDFStream, dict_value, resolve1
+from pdfminer.psparser import PSLiteral
+
+from paperminer import PaperResourceManager, __version__
+from paperminer.cache import PaperCache
+from paperminer.converter import ExtendedPaperAnalyzer, PaperToTextConverter
+from paperminer.layout import LTPageRecord
+from paperminer.output import PaperPage
+from paperminer.parallel import LineSummary, ResourceSummary, merge_summaries
+from paperminer.templates import TemplateStore
+
+log = logging.getLogger(__name__)
+
+# names of a font in nested resources: the form XObjects leading to it, then its name in their /Font
+FontPath = Tuple[str, ...]
+
+# stream attributes that only say how the data is stored
+storage_attrs = {'Length', 'Filter', 'DecodeParms', 'F', 'FFilter', 'FDecodeParms', 'DL'}
+
+
+class PageHasher:
+    """Content hashes of the pages of one document, hashing every object they refer to once."""
+
+    def __init__(self, document: PDFDocument) -> None:
+        self.document = document
+        self.digests: Dict[int, bytes] = {}
+        self.pending: Set[int] = set()
+        return
+
+    def page_key(self, page: PDFPage) -> Optional[str]:
+        """Key of page, or None if it refers to objects that cannot be hashed."""
+        digest = hashlib.sha256(__version__.encode('utf-8'))
+        try:
+            for name in ('Contents', 'Resources', 'MediaBox', 'CropBox', 'Rotate'):
+                self.feed(digest, name)
+                self.feed(digest, page.attrs.get(name))
+        except Exception as e:
+            log.info('page %r cannot be hashed: %s', page.pageid, e)
+            return None
+        return digest.hexdigest()
+
+    def object_digest(self, objid: int) -> bytes:
+        if objid not in self.digests:
+            if objid in self.pending:
+                raise ValueError(f'object {objid} refers to itself')
+            self.pending.add(objid)
+            digest = hashlib.sha256()
+            self.feed(digest, self.document.getobj(objid))
+            self.digests[objid] = digest.digest()
+            self.pending.discard(objid)
+        return self.digests[objid]
+
+    def feed(self, digest: Any, obj: Any) -> None:
+        if isinstance(obj, PDFObjRef):
+            digest.update(b'R' + self.object_digest(obj.objid))
+        elif isinstance(obj, PDFStream):
+            digest.update(b'S')
+            self.feed(digest, {k: v for (k, v) in obj.attrs.items() if k not in storage_attrs})
+            digest.update(hashlib.sha256(obj.get_data()).digest())
+        elif isinstance(obj, dict):
+            digest.update(b'D%d' % len(obj))
+            for key in sorted(obj):
+                self.feed(digest, key)
+                self.feed(digest, obj[key])
+        elif isinstance(obj, list):
+            digest.update(b'L%d' % len(obj))
+            for item in obj:
+                self.feed(digest, item)
+        elif isinstance(obj, PSLiteral):
+            self.feed(digest, obj.name)
+            digest.update(b'N')
+        elif isinstance(obj, str):
+            self.feed(digest, obj.encode('utf-8'))
+            digest.update(b'U')
+        elif isinstance(obj, bytes):
+            digest.update(b'B%d:' % len(obj) + obj)
+        elif obj is None or isinstance(obj, (bool, int, float)):
+            digest.update(b'V' + repr(obj).encode('ascii') + b';')
+        else:
+            raise ValueError(f'cannot hash {obj!r}')
+        return
+
+
+def iter_font_refs(resources: Any, path: FontPath = (), seen: Optional[Set[int]] = None) \
+        -> Iterator[Tuple[FontPath, int]]:
+    """(path, object id) of the indirect fonts of resources and of the form XObjects in them."""
+    resources = dict_value(resources)
+    seen = seen if seen is not None else set()
+    for (name, spec) in dict_value(resources.get('Font')).items():
+        if isinstance(spec, PDFObjRef):
+            yield (path + (name,), spec.objid)
+    for (name, xobj) in dict_value(resources.get('XObject')).items():
+        if not isinstance(xobj, PDFObjRef) or xobj.objid in seen:
+            continue
+        seen.add(xobj.objid)
+        stream = resolve1(xobj)
+        if isinstance(stream, PDFStream) and 'Resources' in stream.attrs:
+            yield from iter_font_refs(stream.attrs['Resources'], path + (name,), seen)
+    return
+
+
+def translate_fonts(summary: ResourceSummary, font_ids: Dict[int, int]) -> ResourceSummary:
+    """summary with every font id replaced through font_ids."""
+
+    def line(summary: Optional[LineSummary]) -> Optional[LineSummary]:
+        if summary is None:
+            return None
+        return LineSummary(summary.text, summary.bbox, font_ids[summary.font_id], summary.fontsize)
+
+    translated = copy.copy(summary)
+    translated.font_map = {(font_ids[font_id], fontsize): count
+                           for (font_id, fontsize), count in summary.font_map.items()}
+    translated.top_margin_ref = line(summary.top_margin_ref)
+    translated.abstract_ref = line(summary.abstract_ref)
+    translated.ref_ref = line(summary.ref_ref)
+    translated.section_header_ref = [line(ref) for ref in summary.section_header_ref]
+    translated.figure_ref = [line(ref) for ref in summary.figure_ref]
+    translated.table_ref = [line(ref) for ref in summary.table_ref]
+    return translated
+
+
+def summary_font_ids(summary: ResourceSummary) -> List[int]:
+    font_ids = {font_id for (font_id, _) in summary.font_map}
+    for line in [summary.top_margin_ref, summary.abstract_ref, summary.ref_ref] + summary.section_header_ref + \
+            summary.figure_ref + summary.table_ref:
+        if line is not None:
+            font_ids.add(line.font_id)
+    return sorted(font_ids)
+
+
+def renumber(page: PaperPage, pageid: int) -> PaperPage:
+    if page.pageid == pageid:
+        return page
+    blocks = [copy.copy(block) for block in page]
+    for block in blocks:
+        block.pageid = pageid
+    return PaperPage(pageid, page.bbox, blocks)
+
+
+class PageEntry:
+    """What the cache keeps of a page, with fonts as indices into font_paths."""
+
+    def __init__(self, font_paths: List[FontPath], summary: ResourceSummary) -> None:
+        self.font_paths = font_paths
+        # the first-pass statistics of the page alone
+        self.summary = summary
+        # what the second pass classified the page with, the page it got and the after_* flags it left behind
+        self.inputs: Optional[Tuple[Any, ...]] = None
+        self.page: Optional[PaperPage] = None
+        self.state: Optional[Tuple[bool, bool, bool]] = None
+        return
+
+
+class PageState:
+    """A page of the document being extracted, between the passes."""
+
+    def __init__(self, pageno: int, page: PDFPage, key: Optional[str], font_ids: List[int],
+                 summary: ResourceSummary, entry: Optional[PageEntry], record: Optional[LTPageRecord]) -> None:
+        self.pageno = pageno
+        self.page = page
+        self.key = key
+        # the fonts of the page's statistics, in the order of entry.font_paths if there is an entry
+        self.font_ids = font_ids
+        self.summary = summary
+        self.entry = entry
+        # the first-pass layout of the page if it was laid out in this run
+        self.record = record
+        return
+
+
+class IncrementalCache(PaperCache):
+    """PaperCache that also caches every page of the documents it converts by the page's content (see above).
+
+    Only whole documents are converted page by page; max_pages, pagenos and templates take the PaperCache way.
+    reused_summaries and reused_pages count the pages that skipped their first and second pass respectively.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30) -> None:
+        super().__init__(directory, max_bytes)
+        self.reused_summaries = 0
+        self.reused_pages = 0
+        return
+
+    def convert(self, document: PDFDocument, single_pass: bool = False, max_pages: Optional[int] = None,
+                pagenos: Optional[List[int]] = None, templates: Optional[TemplateStore] = None) \
+            -> Tuple[List[PaperPage], Optional[PaperResourceManager]]:
+        if max_pages is not None or pagenos is not None:
+            return super().convert(document, single_pass=single_pass, max_pages=max_pages, pagenos=pagenos,
+                                   templates=templates)
+        rsrcmgr = PaperResourceManager()
+        try:
+            states = self.first_pass(document, rsrcmgr)
+        except ValueError as e:
+            log.info('converting the whole document: %s', e)
+            return super().convert(document, single_pass=single_pass, templates=templates)
+        return (self.second_pass(document, rsrcmgr, states), rsrcmgr)
+
+    def first_pass(self, document: PDFDocument, rsrcmgr: PaperResourceManager) -> List[PageState]:
+        """Statistics of every page, cached or from laying it out, merged into rsrcmgr."""
+        hasher = PageHasher(document)
+        states = []
+        for (pageno, page) in enumerate(PDFPage.create_pages(document)):
+            paths: Dict[FontPath, int] = {}
+            for (path, objid) in iter_font_refs(page.resources):
+                paths.setdefault(path, objid)
+            key = hasher.page_key(page)
+            entry = self.get(key, 'page') if key is not None else None
+            if entry is not None:
+                # the fonts of the entry must still be as many different objects
+                font_ids = cast(List[int], [paths.get(path) for path in entry.font_paths])
+                if None in font_ids or len(set(font_ids)) < len(font_ids):
+                    entry = None
+            if entry is not None:
+                self.reused_summaries += 1
+                summary = translate_fonts(entry.summary, dict(enumerate(font_ids)))
+                states.append(PageState(pageno, page, key, font_ids, summary, entry, None))
+                continue
+            (summary, record) = self.analyze_page(rsrcmgr, pageno, page)
+            font_ids = summary_font_ids(summary)
+            first_paths: Dict[int, FontPath] = {}
+            for (path, objid) in paths.items():
+                first_paths.setdefault(objid, path)
+            if key is not None and all(objid in first_paths for objid in font_ids):
+                entry = PageEntry([first_paths[objid] for objid in font_ids],
+                                  translate_fonts(summary, {objid: i for (i, objid) in enumerate(font_ids)}))
+            states.append(PageState(pageno, page, key, font_ids, summary, entry, record))
+        merge_summaries(document, [state.summary for state in states], rsrcmgr)
+        return states
+
+    @staticmethod
+    def analyze_page(rsrcmgr: PaperResourceManager, pageno: int, page: PDFPage) \
+            -> Tuple[ResourceSummary, LTPageRecord]:
+        # statistics of the page alone, with the fonts shared with rsrcmgr so that they are parsed once
+        page_rsrcmgr = PaperResourceManager()
+        page_rsrcmgr._cached_fonts = rsrcmgr._cached_fonts
+        page_rsrcmgr.font_objids = rsrcmgr.font_objids
+        analyzer = ExtendedPaperAnalyzer(page_rsrcmgr, pageno=pageno + 1, keep_records=True, text_only=True)
+        analyzer.create_interpreter().process_page(page)
+        return (ResourceSummary(page_rsrcmgr), cast(List[LTPageRecord], analyzer.records)[0])
+
+    def second_pass(self, document: PDFDocument, rsrcmgr: PaperResourceManager, states: List[PageState]) \
+            -> List[PaperPage]:
+        converter = PaperToTextConverter(document, rsrcmgr=rsrcmgr, text_only=True)
+        interpreter = converter.create_interpreter()
+        pages = []
+        for state in states:
+            inputs = classification_inputs(rsrcmgr, state.font_ids)
+            entry = state.entry
+            if entry is not None and entry.inputs == inputs and entry.page is not None and entry.state is not None:
+                self.reused_pages += 1
+                pages.append(renumber(entry.page, state.pageno + 1))
+                (rsrcmgr.after_title, rsrcmgr.after_abstract, rsrcmgr.after_ref) = entry.state
+                continue
+            if state.record is not None:
+                converter.replay_page(state.record)
+            else:
+                converter.pageno = state.pageno + 1
+                interpreter.process_page(state.page)
+            page = converter.pop_page()
+            pages.append(page)
+            if entry is not None and state.key is not None:
+                entry.inputs = inputs
+                entry.page = page
+                entry.state = (rsrcmgr.after_title, rsrcmgr.after_abstract, rsrcmgr.after_ref)
+                self.put(state.key, 'page', entry, evict=False)
+        # once per document rather than after every page entry
+        self.maybe_evict()
+        return pages
+
+
+def classification_inputs(rsrcmgr: PaperResourceManager, font_ids: List[int]) -> Tuple[Any, ...]:
+    """Everything besides its own content that the second pass classifies a page with, whose fonts are font_ids:
+    the after_* flags, the top line of the document, the font sizes, and which of its fonts are the body and
+    section header fonts."""
+    top = rsrcmgr.top_margin_ref
+    body = rsrcmgr.font_objids.get(rsrcmgr.body_font) if rsrcmgr.body_font is not None else None
+    header = rsrcmgr.font_objids.get(rsrcmgr.section_header_font) \
+        if rsrcmgr.section_header_font is not None else None
+    return (rsrcmgr.after_title, rsrcmgr.after_abstract, rsrcmgr.after_ref,
+            None if top is None else (top.get_text().strip(), top.bbox),
+            rsrcmgr.section_header_font_size, rsrcmgr.body_font_size, rsrcmgr.tiny_font_size,
+            tuple((font_id == body, font_id == header) for font_id in font_ids))
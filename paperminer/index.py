@@ -0,0 +1,376 @@
+"""Inverted index of classified blocks over a corpus: which blocks of which documents use a word, by block kind.
+
+    with IndexWriter('index/') as writer:          # or paperminer extract papers/ --index index/
+        for page in converter.iter_pages():
+            writer.write_page('paper.pdf', page)
+    with IndexReader('index/') as reader:
+        reader.search('icml', kinds=['LTCitationBox'])          # citations to ICML
+        reader.section_search('background', 'transformer')      # Background sections mentioning transformers
+
+Words are the lowercased \\w+ runs of a block's text. A block is posted under (kind, word) for each of its words
+as (document, page, section, block): block counts the blocks of its document from 0, and section counts its
+top-level section headers, so that a section header and the blocks after it share a section number (blocks before
+the first header are in section 0). A header numbered below the top level, e.g. "2.1 Setup" or "A.2 Proofs", does
+not start a section of its own: it and its blocks stay in the section of its parent, so a search of a section
+covers its subsections too. Headers without a number always start a section, as do numbered ones before any
+other header. The pages of a document are expected to be written together and in order.
+
+The writer collects postings in memory and writes them out as a segment, sorted by key, once segment_size of
+them have piled up. Segments are never changed: once merge_factor segments of a level exist they are merged into
+one of the next level and removed, so there are only a few segments per level however much is indexed. A
+document that is indexed twice is found once, as its postings are the same. Segment files are written to a
+temporary file and renamed into place, and memory-mapped by IndexReader. Writers to the same directory, in one
+process or several, take an exclusive lock on its .merge.lock file while they merge (where the fcntl module is
+available), so that no two of them merge the same segments:
+
+    MAGIC
+    keys, '<kind>\\0<word>' as UTF-8 in sorted order
+    key offsets and posting offsets (uint64, one more than there are keys)
+    doc, page, section and block of the postings (uint32), one column each, with the postings of a key in one run
+    footer: JSON with the offsets of the above, the names of the documents doc indexes, and the kinds of the keys
+    footer length (uint64), MAGIC
+"""
+import array
+import contextlib
+import heapq
+import itertools
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from paperminer.output import PaperBlock
+from paperminer.records import RecordWriter
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+
+MAGIC = b'PMINDEX1'
+POSTING_COLUMNS = ('doc', 'page', 'section', 'block')
+word_pattern = re.compile('\\w+')
+# longer runs are not words (e.g. hashes, or text extracted without spaces)
+max_word_length = 64
+# a section header numbered below the top level, e.g. "2.1 Setup" or "A.2 Proofs"
+subsection_header_pattern = re.compile('\\s*(?:\\d+|[A-Z])(?:\\.\\d+)+\\.?\\s')
+# tells apart the segments one process writes within the same nanosecond, e.g. from several threads
+segment_numbers = itertools.count()
+
+Posting = Tuple[str, int, int, int]
+
+
+def words(text: str) -> Set[str]:
+    return {word for word in word_pattern.findall(text.lower()) if len(word) <= max_word_length}
+
+
+def list_segments(directory: str) -> List[str]:
+    """Paths of the segments in directory, by level and then oldest first."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith('.seg') and not name.startswith('.'))
+
+
+def segment_level(path: str) -> int:
+    return int(os.path.basename(path)[:2])
+
+
+@contextlib.contextmanager
+def merge_lock(directory: str) -> Iterator[None]:
+    """Held while the segments in directory are merged."""
+    with open(os.path.join(directory, '.merge.lock'), 'a') as fp:
+        if fcntl is not None:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        yield
+    return
+
+
+def read_column(buffer: memoryview, offset: int, typecode: str, length: int) -> memoryview:
+    column = buffer[offset:offset + length * array.array(typecode).itemsize]
+    if sys.byteorder != 'little':
+        swapped = array.array(typecode, column.tobytes())
+        swapped.byteswap()
+        column = memoryview(swapped)
+    return column.cast(typecode)  # type: ignore
+
+
+def write_segment(path: str, level: int, docs: List[str], keys: List[str], posting_offsets: 'array.array[int]',
+                  columns: Dict[str, 'array.array[int]']) -> None:
+    encoded = [key.encode('utf-8') for key in keys]
+    key_offsets = array.array('Q', [0])
+    for key in encoded:
+        key_offsets.append(key_offsets[-1] + len(key))
+    fd, tmp_path = tempfile.mkstemp(prefix='.', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            position = 0
+
+            def write(data: bytes) -> int:
+                nonlocal position
+                offset = position
+                padding = -len(data) % 8
+                fp.write(data + b'\0' * padding)
+                position += len(data) + padding
+                return offset
+
+            def write_column(column: 'array.array[int]') -> int:
+                if sys.byteorder != 'little':
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                return write(column.tobytes())
+
+            write(MAGIC)
+            offsets = {'keys': write(b''.join(encoded)), 'key_offsets': write_column(key_offsets),
+                       'posting_offsets': write_column(posting_offsets)}
+            for name in POSTING_COLUMNS:
+                offsets[name] = write_column(columns[name])
+            footer = {'level': level, 'keys': len(keys), 'postings': len(columns['doc']), 'offsets': offsets,
+                      'docs': docs, 'kinds': sorted({key.partition('\0')[0] for key in keys})}
+            data = json.dumps(footer).encode('utf-8')
+            fp.write(data + len(data).to_bytes(8, 'little') + MAGIC)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return
+
+
+class Segment:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.fp = open(path, 'rb')
+        self.mmap = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+        if self.buffer[:len(MAGIC)] != MAGIC or self.buffer[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a paperminer index segment')
+        end = len(self.buffer) - len(MAGIC) - 8
+        size = int.from_bytes(self.buffer[end:end + 8], 'little')
+        footer = json.loads(str(self.buffer[end - size:end], 'utf-8'))
+        self.level: int = footer['level']
+        self.docs: List[str] = footer['docs']
+        self.kinds: List[str] = footer['kinds']
+        self.nkeys: int = footer['keys']
+        offsets = footer['offsets']
+        self.key_offsets = read_column(self.buffer, offsets['key_offsets'], 'Q', self.nkeys + 1)
+        self.posting_offsets = read_column(self.buffer, offsets['posting_offsets'], 'Q', self.nkeys + 1)
+        self.keys = self.buffer[offsets['keys']:offsets['keys'] + self.key_offsets[self.nkeys]]
+        self.columns = {name: read_column(self.buffer, offsets[name], 'I', footer['postings'])
+                        for name in POSTING_COLUMNS}
+        return
+
+    def key(self, i: int) -> str:
+        return str(self.keys[self.key_offsets[i]:self.key_offsets[i + 1]], 'utf-8')
+
+    def find(self, key: str) -> Optional[int]:
+        (lo, hi) = (0, self.nkeys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.nkeys and self.key(lo) == key else None
+
+    def iter_keys(self, n: int) -> Iterator[Tuple[str, int, int]]:
+        """(key, n, key index) of every key in order, n telling this segment apart in a merge."""
+        for i in range(self.nkeys):
+            yield (self.key(i), n, i)
+        return
+
+    def postings(self, kind: str, word: str) -> Iterator[Posting]:
+        i = self.find(kind + '\0' + word)
+        if i is None:
+            return
+        (start, stop) = (self.posting_offsets[i], self.posting_offsets[i + 1])
+        (doc, page, section, block) = (self.columns[name][start:stop] for name in POSTING_COLUMNS)
+        for j in range(stop - start):
+            yield (self.docs[doc[j]], page[j], section[j], block[j])
+        return
+
+    def close(self) -> None:
+        for name in ('keys', 'key_offsets', 'posting_offsets'):
+            if hasattr(self, name):
+                getattr(self, name).release()
+        for column in getattr(self, 'columns', {}).values():
+            column.release()
+        self.buffer.release()
+        self.mmap.close()
+        self.fp.close()
+        return
+
+
+def merge_segments(paths: List[str], path: str, level: int) -> None:
+    """Merge the segments at paths into one at path, and remove them."""
+    segments = [Segment(segment_path) for segment_path in paths]
+    try:
+        docs: Dict[str, int] = {}
+        doc_maps = [[docs.setdefault(name, len(docs)) for name in segment.docs] for segment in segments]
+        keys: List[str] = []
+        posting_offsets = array.array('Q', [0])
+        columns = {name: array.array('I') for name in POSTING_COLUMNS}
+        merged = heapq.merge(*[segment.iter_keys(n) for n, segment in enumerate(segments)])
+        for key, runs in itertools.groupby(merged, key=lambda item: item[0]):
+            keys.append(key)
+            for (_, n, i) in runs:
+                segment = segments[n]
+                (start, stop) = (segment.posting_offsets[i], segment.posting_offsets[i + 1])
+                doc_map = doc_maps[n]
+                columns['doc'].extend(doc_map[doc] for doc in segment.columns['doc'][start:stop])
+                for name in POSTING_COLUMNS[1:]:
+                    columns[name].frombytes(segment.columns[name][start:stop].tobytes())
+            posting_offsets.append(len(columns['doc']))
+        write_segment(path, level, list(docs), keys, posting_offsets, columns)
+    finally:
+        for segment in segments:
+            segment.close()
+    for segment_path in paths:
+        os.remove(segment_path)
+    return
+
+
+class IndexWriter(RecordWriter):
+    """Adds the blocks written to it to the index in directory (see above)."""
+
+    def __init__(self, directory: str, segment_size: int = 1 << 20, merge_factor: int = 8) -> None:
+        self.directory = directory
+        self.segment_size = segment_size
+        self.merge_factor = merge_factor
+        os.makedirs(directory, exist_ok=True)
+        # postings by key, as runs of doc, page, section and block
+        self.postings: Dict[str, 'array.array[int]'] = {}
+        self.size = 0
+        self.docs: Dict[str, int] = {}
+        self.doc: Optional[str] = None
+        self.section = 0
+        self.block = 0
+        return
+
+    def write_block(self, doc: str, block: PaperBlock) -> None:
+        if doc != self.doc:
+            (self.doc, self.section, self.block) = (doc, 0, 0)
+        if block.kind == 'LTSectionHeader' and not (self.section and subsection_header_pattern.match(block.text)):
+            self.section += 1
+        posting = (self.docs.setdefault(doc, len(self.docs)), block.pageid, self.section, self.block)
+        self.block += 1
+        prefix = block.kind + '\0'
+        postings = self.postings
+        block_words = words(block.text)
+        for word in block_words:
+            key = prefix + word
+            if key not in postings:
+                postings[key] = array.array('I')
+            postings[key].extend(posting)
+        self.size += len(block_words)
+        if self.size >= self.segment_size:
+            self.flush()
+        return
+
+    def segment_path(self, level: int) -> str:
+        name = '%02d-%016x-%d-%d.seg' % (level, time.time_ns(), os.getpid(), next(segment_numbers))
+        return os.path.join(self.directory, name)
+
+    def flush(self) -> None:
+        """Write the postings collected so far out as a segment, and merge segments if there are enough."""
+        if not self.postings:
+            return
+        keys = sorted(self.postings)
+        posting_offsets = array.array('Q', [0])
+        columns = {name: array.array('I') for name in POSTING_COLUMNS}
+        for key in keys:
+            postings = self.postings[key]
+            for i, name in enumerate(POSTING_COLUMNS):
+                columns[name].extend(postings[i::len(POSTING_COLUMNS)])
+            posting_offsets.append(len(columns['doc']))
+        write_segment(self.segment_path(0), 0, list(self.docs), keys, posting_offsets, columns)
+        self.postings = {}
+        self.size = 0
+        self.docs = {}
+        self.merge()
+        return
+
+    def merge(self) -> None:
+        with merge_lock(self.directory):
+            while True:
+                levels: Dict[int, List[str]] = {}
+                for path in list_segments(self.directory):
+                    levels.setdefault(segment_level(path), []).append(path)
+                full = [level for level, paths in sorted(levels.items()) if len(paths) >= self.merge_factor]
+                if not full:
+                    return
+                merge_segments(levels[full[0]][:self.merge_factor], self.segment_path(full[0] + 1), full[0] + 1)
+
+    def close(self) -> None:
+        self.flush()
+        return
+
+
+class IndexReader:
+    """Queries the segments of the index in directory as they were when it was opened."""
+
+    def __init__(self, directory: str) -> None:
+        self.segments: List[Segment] = []
+        while True:
+            try:
+                for path in list_segments(directory):
+                    self.segments.append(Segment(path))
+                return
+            except FileNotFoundError:
+                # a writer merged segments away after they were listed; the one they were merged into is there now
+                self.close()
+            except BaseException:
+                self.close()
+                raise
+
+    def postings(self, word: str, kinds: Optional[Iterable[str]] = None) -> Set[Posting]:
+        """(document, page, section, block) of the blocks of kinds, or of any kind, that use word."""
+        found: Set[Posting] = set()
+        for segment in self.segments:
+            for kind in (segment.kinds if kinds is None else kinds):
+                found.update(segment.postings(kind, word))
+        return found
+
+    def search(self, query: str, kinds: Optional[Iterable[str]] = None) -> List[Posting]:
+        """(document, page, section, block) of the blocks of kinds, or of any kind, that use every word of query."""
+        kinds = None if kinds is None else list(kinds)
+        hits: Optional[Set[Posting]] = None
+        for word in sorted(words(query)):
+            found = self.postings(word, kinds)
+            hits = found if hits is None else hits & found
+            if not hits:
+                break
+        return sorted(hits or ())
+
+    def section_search(self, header: str, query: str, kinds: Iterable[str] = ('LTSectionBody',)) \
+            -> List[Tuple[str, int]]:
+        """(document, section) of the sections whose header uses every word of header and whose blocks of kinds
+        use every word of query between them."""
+        kinds = list(kinds)
+        sections: Optional[Set[Tuple[str, int]]] = None
+        wanted = [(word, ['LTSectionHeader']) for word in sorted(words(header))] + \
+            [(word, kinds) for word in sorted(words(query))]
+        for (word, word_kinds) in wanted:
+            found = {(doc, section) for (doc, _, section, _) in self.postings(word, word_kinds)}
+            sections = found if sections is None else sections & found
+            if not sections:
+                break
+        return sorted(sections or ())
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        return
+
+    def __enter__(self) -> 'IndexReader':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+        return
@@ -1,327 +1,698 @@
-from typing import Tuple, Optional, Union, List, Type, Generator, Dict, Set, cast
-
-from pdfminer.layout import LTTextLineHorizontal, LTTextLineVertical, LTTextContainer, LTChar, LTLayoutContainer, \
-    LTTextBoxVertical, LTTextBoxHorizontal, LAParams, LTItem, LTText, LTTextBox
-from pdfminer.pdfcolor import PDFColorSpace
-from pdfminer.pdffont import PDFFont
-from pdfminer.pdfinterp import PDFResourceManager, PDFGraphicState
-from pdfminer.utils import bbox2str, Plane, uniq
-
-from paperminer import PaperResourceManager, get_most_popular
-
-
-class LTLayoutContainerExtended(LTLayoutContainer):
-    def __init__(self, bbox: Tuple[int, int, int, int], rsrcmgr: Optional[PaperResourceManager] = None) -> None:
-        super().__init__(bbox)
-        self.rsrcmgr = rsrcmgr
-        return
-
-    # group_objects: group text object to textlines.
-    def group_objects(self, laparams: LAParams, objs: List[Union[LTItem, LTText]]) -> Generator:
-        obj0 = None
-        line = None
-        for obj1 in objs:
-            if obj0 is not None:
-                # halign: obj0 and obj1 is horizontally aligned.
-                #
-                #   +------+ - - -
-                #   | obj0 | - - +------+   -
-                #   |      |     | obj1 |   | (line_overlap)
-                #   +------+ - - |      |   -
-                #          - - - +------+
-                #
-                #          |<--->|
-                #        (char_margin)
-                halign = (obj0.is_compatible(obj1) and
-                          obj0.is_voverlap(obj1) and
-                          (min(obj0.height, obj1.height) * laparams.line_overlap <
-                           obj0.voverlap(obj1)) and
-                          (obj0.hdistance(obj1) <
-                           max(obj0.width, obj1.width) * laparams.char_margin))
-
-                # valign: obj0 and obj1 is vertically aligned.
-                #
-                #   +------+
-                #   | obj0 |
-                #   |      |
-                #   +------+ - - -
-                #     |    |     | (char_margin)
-                #     +------+ - -
-                #     | obj1 |
-                #     |      |
-                #     +------+
-                #
-                #     |<-->|
-                #   (line_overlap)
-                valign = (laparams.detect_vertical and
-                          obj0.is_compatible(obj1) and
-                          obj0.is_hoverlap(obj1) and
-                          (min(obj0.width, obj1.width) * laparams.line_overlap <
-                           obj0.hoverlap(obj1)) and
-                          (obj0.vdistance(obj1) <
-                           max(obj0.height, obj1.height) * laparams.char_margin))
-
-                if ((halign and isinstance(line, LTTextLineHorizontalExtended)) or
-                        (valign and isinstance(line, LTTextLineVertical))):
-                    line.add(obj1)
-                elif line is not None:
-                    yield line
-                    line = None
-                else:
-                    if valign and not halign:
-                        line = LTTextLineVertical(laparams.word_margin)
-                        line.add(obj0)
-                        line.add(obj1)
-                    elif halign and not valign:
-                        line = LTTextLineHorizontalExtended(laparams.word_margin)
-                        line.add(obj0)
-                        line.add(obj1)
-                    else:
-                        line = LTTextLineHorizontalExtended(laparams.word_margin)
-                        line.add(obj0)
-                        yield line
-                        line = None
-            obj0 = obj1
-        if line is None:
-            line = LTTextLineHorizontalExtended(laparams.word_margin)
-            line.add(obj0)
-        yield line
-        return
-
-    # group_textlines: group neighboring lines to textboxes.
-    def group_textlines(self, laparams: LAParams, lines: List[LTTextContainer]) -> Generator:
-        plane = Plane(self.bbox)
-        plane.extend(lines)
-        boxes: Dict[LTText, LTTextBox] = {}
-        for line in lines:
-            if isinstance(line, LTTextLineHorizontalExtended):
-                box = LTTextBoxHorizontal()
-                if self.rsrcmgr:
-                    klass = line.maybe_classify(self.rsrcmgr)
-                    if klass == LTTitle:
-                        self.rsrcmgr.after_title = True
-                    elif not self.rsrcmgr.after_abstract and klass == LTSectionHeader:
-                        self.rsrcmgr.after_abstract = True
-                    elif klass == LTSectionHeader and 'references' in line.get_text().lower():
-                        self.rsrcmgr.after_ref = True
-                    box = klass()
-            else:
-                box = LTTextBoxVertical()
-            if not isinstance(box, LTTitle) and not isinstance(box, LTSectionHeader):
-                neighbors = line.find_neighbors_with_rsrcmgr(plane, laparams.line_margin, self.rsrcmgr)
-                if line not in neighbors:
-                    continue
-            else:
-                neighbors = [line]
-            members = []
-            for obj1 in neighbors:
-                members.append(obj1)
-                if obj1 in boxes:
-                    members.extend(boxes.pop(obj1))
-            for obj in uniq(members):
-                box.add(obj)
-                boxes[obj] = box
-        done: Set[LTTextBox] = set()
-        for line in lines:
-            if line not in boxes:
-                continue
-            box = boxes[line]
-            if box in done:
-                continue
-            done.add(box)
-            if not box.is_empty():
-                yield box
-        return
-
-
-class LTCharExtended(LTChar):
-    """Actual letter in the text as a Unicode string."""
-
-    def __init__(self,
-                 matrix: Tuple[int, int, int, int, int, int],
-                 font: PDFFont,
-                 fontsize: float,
-                 scaling: float,
-                 rise: float,
-                 text: str,
-                 textwidth: float,
-                 textdisp: float,
-                 ncs: PDFColorSpace,
-                 graphicstate: PDFGraphicState) -> None:
-        super().__init__(matrix, font, fontsize, scaling, rise, text, textwidth, textdisp, ncs, graphicstate)
-        self.font = font
-        self.fontsize = fontsize
-        self.textwidth = textwidth
-
-
-class LTPageExtended(LTLayoutContainerExtended):
-
-    def __init__(self,
-                 pageid: int,
-                 bbox: Tuple[int, int, int, int],
-                 rotate: int = 0,
-                 rsrcmgr: Optional[PDFResourceManager] = None) -> None:
-        LTLayoutContainerExtended.__init__(self, bbox, rsrcmgr)
-        self.pageid = pageid
-        self.rotate = rotate
-        return
-
-    def __repr__(self) -> str:
-        return ('<%s(%r) %s rotate=%r>' %
-                (self.__class__.__name__, self.pageid,
-                 bbox2str(self.bbox), self.rotate))
-
-
-class LTColumn(LTLayoutContainerExtended):
-    pass
-
-
-class LTTextLineHorizontalExtended(LTTextLineHorizontal):
-    def __init__(self,
-                 word_margin: float) -> None:
-        super().__init__(word_margin)
-
-    def add(self, obj: Union[LTItem, LTText]) -> None:
-        super().add(obj)
-
-    @property
-    def left_margin(self) -> float:
-        left_margin = 612
-        for item in self:
-            if isinstance(item, LTCharExtended) and item.x0 < left_margin:
-                left_margin = item.x0
-        return left_margin
-
-    @property
-    def right_margin(self) -> float:
-        right_margin = 0
-        for item in self:
-            if isinstance(item, LTCharExtended) and item.x1 > right_margin:
-                right_margin = item.x0
-        return right_margin
-
-    @property
-    def fontsize(self) -> float:
-        font_list = [(item.font, item.fontsize) for item in self if isinstance(item, LTCharExtended)]
-        _, fontsize = get_most_popular(font_list)
-        return fontsize
-
-    @property
-    def font(self) -> PDFFont:
-        font_list = [(item.font, item.fontsize) for item in self if isinstance(item, LTCharExtended)]
-        font, _ = get_most_popular(font_list)
-        return font
-
-    def is_font_similar(self, other_line: 'LTTextLineHorizontalExtended') -> bool:
-        font_list1 = [item.fontsize for item in self if isinstance(item, LTCharExtended)]
-        font_list2 = [item.fontsize for item in other_line if isinstance(item, LTCharExtended)]
-        for entry in font_list1:
-            if entry in font_list2:
-                return True
-        return False
-
-    def maybe_compare(self,
-                      other_line: LTText) -> bool:
-        if not isinstance(other_line, LTTextLineHorizontalExtended):
-            return False
-        if self.get_text().strip() != other_line.get_text().strip():
-            return False
-        if self.bbox != other_line.bbox:
-            return False
-        return True
-
-    def maybe_classify(self,
-                       rsrcmgr: PaperResourceManager) -> Type:
-        if not rsrcmgr:
-            return LTTextBoxHorizontal
-        if self._objs[0].y0 > cast(LTTextBox, rsrcmgr.top_margin_ref).y1:
-            return LTPageMargin
-        if self.maybe_compare(rsrcmgr.top_margin_ref):
-            return LTTitle
-        if rsrcmgr.after_title:
-            if rsrcmgr.section_header_font == self.font and rsrcmgr.section_header_font_size == self.fontsize:
-                return LTSectionHeader
-            if not rsrcmgr.after_abstract:
-                return LTAuthor
-            if self.font == rsrcmgr.body_font and self.fontsize == rsrcmgr.body_font_size:
-                return LTSectionBody
-            if self.fontsize == rsrcmgr.tiny_font_size:
-                if rsrcmgr.after_ref:
-                    return LTCitationBox
-                else:
-                    return LTFooter
-            # if rsrcmgr.after_ref and ref_pattern.match(self.get_text()):
-            #    return LTCitation
-
-        return LTTextBoxHorizontal
-
-    def find_neighbors_with_rsrcmgr(self,
-                                    plane: Plane,
-                                    ratio: float,
-                                    rsrcmgr: PaperResourceManager) -> List[Union[LTItem, LTText]]:
-        d = ratio*self.height
-        objs = plane.find((self.x0, self.y0-d, self.x1, self.y1+d))
-        classification = self.maybe_classify(rsrcmgr)
-        return [obj for obj in objs
-                if (isinstance(obj, LTTextLineHorizontalExtended) and
-                    classification == obj.maybe_classify(rsrcmgr) and
-                    (
-                        (
-                            abs(obj.height-self.height) < d and
-                            self.is_font_similar(obj) and
-                            self.is_x_similar(obj, d)
-                        ) or
-                        classification in [LTAuthor, LTPageMargin, LTCitationBox, LTFooter]
-                ))]
-
-    def is_x_similar(self, obj: LTTextBox, d: float) -> bool:
-        return abs(obj.x0 - self.x0) < d or abs(obj.x1 - self.x1) < d
-
-
-class LTPageMargin(LTTextBoxHorizontal):
-    pass
-
-
-class LTTitle(LTTextBoxHorizontal):
-    pass
-
-
-class LTAuthor(LTTextBoxHorizontal):
-    pass
-
-
-class LTSectionHeader(LTTextBoxHorizontal):
-    pass
-
-
-class LTSectionBody(LTTextBoxHorizontal):
-    pass
-
-
-class LTFooter(LTTextBoxHorizontal):
-    pass
-
-
-class LTCitationBox(LTTextBoxHorizontal):
-    pass
-
-
-class LTCitation(LTTextBox):
-    def __init__(self) -> None:
-        super().__init__()
-        self.ref = 0
-        self.author: List[str] = []
-        self.title = None
-        self.venue = None
-        self.date = '0000'
-        self.link = ''
-        return
-    pass
-
-
-class LTEquation(LTTextContainer):
-    pass
-
-
-class LTCaption(LTTextContainer):
-    pass
+import bisect
+from typing import Tuple, Optional, Union, List, Type, Generator, Dict, Set, Iterator, cast
+
+from pdfminer.layout import LTTextLineHorizontal, LTTextLineVertical, LTTextContainer, LTChar, LTLayoutContainer, \
+    LTTextBoxVertical, LTTextBoxHorizontal, LAParams, LTItem, LTText, LTTextBox, IndexAssigner
+from pdfminer.pdfcolor import PDFColorSpace
+from pdfminer.pdffont import PDFFont
+from pdfminer.pdfinterp import PDFResourceManager, PDFGraphicState
+from pdfminer.utils import bbox2str, Plane, uniq, fsplit, apply_matrix_pt
+
+from paperminer import PaperResourceManager, get_most_frequent
+from paperminer.stats import PageStats, timed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+
+class LTLayoutContainerExtended(LTLayoutContainer):
+    def __init__(self, bbox: Tuple[int, int, int, int], rsrcmgr: Optional[PaperResourceManager] = None) -> None:
+        super().__init__(bbox)
+        self.rsrcmgr = rsrcmgr
+        self.record: Optional[LTPageRecord] = None
+        self.stats: Optional[PageStats] = None
+        return
+
+    def analyze(self, laparams: LAParams) -> None:
+        (textobjs, otherobjs) = fsplit(lambda obj: isinstance(obj, LTChar), self)
+        for obj in otherobjs:
+            obj.analyze(laparams)
+        textlines: List[LTTextContainer] = []
+        empties: List[LTTextContainer] = []
+        if textobjs:
+            with timed(self.stats, 'group_objects'):
+                textlines = list(self.group_objects(laparams, textobjs))
+            (empties, textlines) = fsplit(lambda obj: obj.is_empty(), textlines)
+            for obj in empties:
+                obj.analyze(laparams)
+        self.record = LTPageRecord(self.bbox, textlines, otherobjs, empties)
+        if self.stats is not None:
+            self.stats.count('chars', len(textobjs))
+        if textobjs:
+            self.analyze_textlines(laparams, textlines, otherobjs, empties)
+        return
+
+    def analyze_record(self, laparams: LAParams, record: 'LTPageRecord') -> None:
+        self.record = record
+        self.analyze_textlines(laparams, record.restore_textlines(), record.otherobjs, record.empties)
+        return
+
+    # analyze_textlines: the part of analyze() that runs after chars are grouped into textlines.
+    def analyze_textlines(self,
+                          laparams: LAParams,
+                          textlines: List[LTTextContainer],
+                          otherobjs: List[LTItem],
+                          empties: List[LTTextContainer]) -> None:
+        if not textlines:
+            self._objs = otherobjs + empties
+            return
+        with timed(self.stats, 'group_textlines'):
+            textboxes = list(self.group_textlines(laparams, textlines))
+        if self.stats is not None:
+            self.stats.count('lines', len(textlines))
+            self.stats.count('boxes', len(textboxes))
+            self.stats.start('group_textboxes')
+        if laparams.boxes_flow is None:
+            for textbox in textboxes:
+                textbox.analyze(laparams)
+
+            def getkey(box: LTTextBox) -> Tuple[int, float, float]:
+                if isinstance(box, LTTextBoxVertical):
+                    return (0, -box.x1, -box.y0)
+                else:
+                    return (1, -box.y0, box.x0)
+            textboxes.sort(key=getkey)
+        else:
+            self.groups = self.group_textboxes(laparams, textboxes)
+            assigner = IndexAssigner()
+            for group in self.groups:
+                group.analyze(laparams)
+                assigner.run(group)
+            textboxes.sort(key=lambda box: box.index)
+        if self.stats is not None:
+            self.stats.stop()
+        self._objs = textboxes + otherobjs + empties
+        return
+
+    # group_objects: group text object to textlines.
+    def group_objects(self, laparams: LAParams, objs: List[Union[LTItem, LTText]]) -> Generator:
+        obj0 = None
+        line = None
+        alignments = self.align_objects(laparams, objs)
+        for obj1 in objs:
+            if obj0 is not None:
+                (halign, valign) = next(alignments)
+                if ((halign and isinstance(line, LTTextLineHorizontalExtended)) or
+                        (valign and isinstance(line, LTTextLineVertical))):
+                    line.add(obj1)
+                elif line is not None:
+                    yield line
+                    line = None
+                else:
+                    if valign and not halign:
+                        line = LTTextLineVertical(laparams.word_margin)
+                        line.add(obj0)
+                        line.add(obj1)
+                    elif halign and not valign:
+                        line = LTTextLineHorizontalExtended(laparams.word_margin)
+                        line.add(obj0)
+                        line.add(obj1)
+                    else:
+                        line = LTTextLineHorizontalExtended(laparams.word_margin)
+                        line.add(obj0)
+                        yield line
+                        line = None
+            obj0 = obj1
+        if line is None:
+            line = LTTextLineHorizontalExtended(laparams.word_margin)
+            line.add(obj0)
+        yield line
+        return
+
+    # align_objects: (halign, valign) of every pair of adjacent text objects.
+    def align_objects(self, laparams: LAParams, objs: List[Union[LTItem, LTText]]) -> Iterator[Tuple[bool, bool]]:
+        if np is not None and len(objs) > 1 and all(isinstance(obj, LTChar) for obj in objs):
+            return self.align_chars_vectorized(laparams, objs)
+        return self.align_objects_python(laparams, objs)
+
+    @staticmethod
+    def align_objects_python(laparams: LAParams, objs: List[Union[LTItem, LTText]]) -> Iterator[Tuple[bool, bool]]:
+        for (obj0, obj1) in zip(objs, objs[1:]):
+            # halign: obj0 and obj1 is horizontally aligned.
+            #
+            #   +------+ - - -
+            #   | obj0 | - - +------+   -
+            #   |      |     | obj1 |   | (line_overlap)
+            #   +------+ - - |      |   -
+            #          - - - +------+
+            #
+            #          |<--->|
+            #        (char_margin)
+            halign = (obj0.is_compatible(obj1) and
+                      obj0.is_voverlap(obj1) and
+                      (min(obj0.height, obj1.height) * laparams.line_overlap <
+                       obj0.voverlap(obj1)) and
+                      (obj0.hdistance(obj1) <
+                       max(obj0.width, obj1.width) * laparams.char_margin))
+
+            # valign: obj0 and obj1 is vertically aligned.
+            #
+            #   +------+
+            #   | obj0 |
+            #   |      |
+            #   +------+ - - -
+            #     |    |     | (char_margin)
+            #     +------+ - -
+            #     | obj1 |
+            #     |      |
+            #     +------+
+            #
+            #     |<-->|
+            #   (line_overlap)
+            valign = (laparams.detect_vertical and
+                      obj0.is_compatible(obj1) and
+                      obj0.is_hoverlap(obj1) and
+                      (min(obj0.width, obj1.width) * laparams.line_overlap <
+                       obj0.hoverlap(obj1)) and
+                      (obj0.vdistance(obj1) <
+                       max(obj0.height, obj1.height) * laparams.char_margin))
+            yield (halign, valign)
+        return
+
+    # same tests as align_objects_python over whole arrays of char bboxes; LTChar.is_compatible is always True
+    @staticmethod
+    def align_chars_vectorized(laparams: LAParams, objs: List[LTChar]) -> Iterator[Tuple[bool, bool]]:
+        (x0, y0, x1, y1) = np.array([obj.bbox for obj in objs], dtype=np.float64).T
+        width = x1 - x0
+        height = y1 - y0
+        (ax0, ay0, ax1, ay1, awidth, aheight) = (x0[:-1], y0[:-1], x1[:-1], y1[:-1], width[:-1], height[:-1])
+        (bx0, by0, bx1, by1, bwidth, bheight) = (x0[1:], y0[1:], x1[1:], y1[1:], width[1:], height[1:])
+        is_voverlap = (by0 <= ay1) & (ay0 <= by1)
+        is_hoverlap = (bx0 <= ax1) & (ax0 <= bx1)
+        ydistance = np.minimum(np.abs(ay0 - by1), np.abs(ay1 - by0))
+        xdistance = np.minimum(np.abs(ax0 - bx1), np.abs(ax1 - bx0))
+        voverlap = np.where(is_voverlap, ydistance, 0)
+        hoverlap = np.where(is_hoverlap, xdistance, 0)
+        vdistance = np.where(is_voverlap, 0, ydistance)
+        hdistance = np.where(is_hoverlap, 0, xdistance)
+        halign = (is_voverlap &
+                  (np.minimum(aheight, bheight) * laparams.line_overlap < voverlap) &
+                  (hdistance < np.maximum(awidth, bwidth) * laparams.char_margin))
+        valign = (is_hoverlap &
+                  (np.minimum(awidth, bwidth) * laparams.line_overlap < hoverlap) &
+                  (vdistance < np.maximum(aheight, bheight) * laparams.char_margin))
+        if not laparams.detect_vertical:
+            valign[:] = False
+        return zip(halign.tolist(), valign.tolist())
+
+    # group_textlines: group neighboring lines to textboxes.
+    def group_textlines(self, laparams: LAParams, lines: List[LTTextContainer]) -> Generator:
+        index = LTLineIndex(self.bbox, lines, self.stats)
+        boxes: Dict[LTText, LTTextBox] = {}
+        for line in lines:
+            if isinstance(line, LTTextLineHorizontalExtended):
+                box = LTTextBoxHorizontal()
+                if self.rsrcmgr:
+                    with timed(self.stats, 'classify'):
+                        klass = line.maybe_classify(self.rsrcmgr)
+                    if self.stats is not None:
+                        self.stats.count('maybe_classify')
+                    if klass == LTTitle:
+                        self.rsrcmgr.after_title = True
+                    elif not self.rsrcmgr.after_abstract and klass == LTSectionHeader:
+                        self.rsrcmgr.after_abstract = True
+                    elif klass == LTSectionHeader and 'references' in line.get_text().lower():
+                        self.rsrcmgr.after_ref = True
+                    box = klass()
+            else:
+                box = LTTextBoxVertical()
+            if not isinstance(box, LTTitle) and not isinstance(box, LTSectionHeader):
+                with timed(self.stats, 'find_neighbors'):
+                    neighbors = index.find_neighbors(line, laparams.line_margin, self.rsrcmgr)
+                if line not in neighbors:
+                    continue
+            else:
+                neighbors = [line]
+            members = []
+            for obj1 in neighbors:
+                members.append(obj1)
+                if obj1 in boxes:
+                    members.extend(boxes.pop(obj1))
+            for obj in uniq(members):
+                box.add(obj)
+                boxes[obj] = box
+        done: Set[LTTextBox] = set()
+        for line in lines:
+            if line not in boxes:
+                continue
+            box = boxes[line]
+            if box in done:
+                continue
+            done.add(box)
+            if not box.is_empty():
+                yield box
+        return
+
+
+class LTLineBucket:
+    """Lines sorted by their bottom edge, for finding the ones that vertically overlap a range."""
+
+    def __init__(self) -> None:
+        self.lines: List['LTTextLineHorizontalExtended'] = []
+        self.y0s: List[float] = []
+        self.max_height: float = 0
+        return
+
+    def add(self, line: 'LTTextLineHorizontalExtended') -> None:
+        self.lines.append(line)
+        self.max_height = max(self.max_height, line.height)
+        return
+
+    def sort(self) -> None:
+        self.lines.sort(key=lambda line: line.y0)
+        self.y0s = [line.y0 for line in self.lines]
+        return
+
+    def find(self, bbox: Tuple[float, float, float, float]) -> Generator:
+        (x0, y0, x1, y1) = bbox
+        # nothing starting below y0 - max_height can reach above y0
+        start = bisect.bisect_right(self.y0s, y0 - self.max_height)
+        stop = bisect.bisect_left(self.y0s, y1)
+        for line in self.lines[start:stop]:
+            if line.x1 <= x0 or x1 <= line.x0 or line.y1 <= y0 or y1 <= line.y0:
+                continue
+            yield line
+        return
+
+
+class LTLineIndex:
+    """Answers find_neighbors_with_rsrcmgr() for all lines of a page without a Plane.
+
+    Lines are bucketed by classification, and for the classifications that need a shared font size also by
+    font size, so a query only looks at plausible candidates. Results are ordered the way Plane.find() would
+    return them: by the first grid cell shared with the query, then by insertion order.
+    """
+
+    gridsize = 50
+
+    def __init__(self,
+                 bbox: Tuple[float, float, float, float],
+                 lines: List[LTTextContainer],
+                 stats: Optional[PageStats] = None) -> None:
+        self.bbox = bbox
+        self.stats = stats
+        self.lines = [line for line in lines if isinstance(line, LTTextLineHorizontalExtended)]
+        self.order = {line: i for i, line in enumerate(self.lines)}
+        self.cells = {line: self.first_cell(line.bbox) for line in self.lines}
+        self.generation: Optional[int] = None
+        self.buckets: Dict[Tuple[Type, Optional[float]], LTLineBucket] = {}
+        return
+
+    # first cell (x, y) a Plane over bbox would file an object with this bbox under, or None if it is not filed
+    def first_cell(self, bbox: Tuple[float, float, float, float]) -> Optional[Tuple[int, int]]:
+        (x0, y0, x1, y1) = bbox
+        (px0, py0, px1, py1) = self.bbox
+        if x1 <= px0 or px1 <= x0 or y1 <= py0 or py1 <= y0:
+            return None
+        return (int(max(px0, x0)) // self.gridsize, int(max(py0, y0)) // self.gridsize)
+
+    def update_buckets(self, rsrcmgr: Optional[PaperResourceManager]) -> None:
+        generation = rsrcmgr.generation if rsrcmgr else None
+        if self.buckets and generation == self.generation:
+            return
+        self.generation = generation
+        self.buckets = {}
+        for line in self.lines:
+            if self.cells[line] is None:
+                continue
+            with timed(self.stats, 'classify'):
+                klass = line.maybe_classify(cast(PaperResourceManager, rsrcmgr))
+            if self.stats is not None:
+                self.stats.count('maybe_classify')
+            for fontsize in [None, *sorted(line._fontsizes)]:
+                if (klass, fontsize) not in self.buckets:
+                    self.buckets[(klass, fontsize)] = LTLineBucket()
+                self.buckets[(klass, fontsize)].add(line)
+        for bucket in self.buckets.values():
+            bucket.sort()
+        return
+
+    def find_neighbors(self,
+                       line: 'LTTextLineHorizontalExtended',
+                       ratio: float,
+                       rsrcmgr: Optional[PaperResourceManager]) -> List['LTTextLineHorizontalExtended']:
+        d = ratio*line.height
+        query = (line.x0, line.y0-d, line.x1, line.y1+d)
+        query_cell = self.first_cell(query)
+        if query_cell is None:
+            return []
+        self.update_buckets(rsrcmgr)
+        classification = line.maybe_classify(cast(PaperResourceManager, rsrcmgr))
+        if classification in LOOSE_CLASSIFICATIONS:
+            fontsizes: List[Optional[float]] = [None]
+        else:
+            fontsizes = list(sorted(line._fontsizes))
+        candidates: Set['LTTextLineHorizontalExtended'] = set()
+        for fontsize in fontsizes:
+            bucket = self.buckets.get((classification, fontsize))
+            if bucket is not None:
+                candidates.update(bucket.find(query))
+        neighbors = [obj for obj in candidates
+                     if line.is_neighbor(obj, classification, d, cast(PaperResourceManager, rsrcmgr))]
+        if self.stats is not None:
+            self.stats.count('maybe_classify', 1 + len(candidates))
+
+        def plane_order(obj: 'LTTextLineHorizontalExtended') -> Tuple[int, int, int]:
+            (cell_x, cell_y) = cast(Tuple[int, int], self.cells[obj])
+            return (max(cell_y, query_cell[1]), max(cell_x, query_cell[0]), self.order[obj])
+        neighbors.sort(key=plane_order)
+        return neighbors
+
+
+class LTPageRecord:
+    """Compact record of a laid out page: its chars grouped into textlines, but not yet into boxes."""
+
+    def __init__(self,
+                 bbox: Tuple[int, int, int, int],
+                 textlines: List[LTTextContainer],
+                 otherobjs: List[LTItem],
+                 empties: List[LTTextContainer]) -> None:
+        self.bbox = bbox
+        # analyze() appends a trailing LTAnno to every line it boxes, so remember where each line ended
+        self.textlines = [(line, len(line)) for line in textlines]
+        self.otherobjs = otherobjs
+        self.empties = empties
+        # set by the analyzer that keeps the record
+        self.pageid = 0
+        return
+
+    def restore_textlines(self) -> List[LTTextContainer]:
+        textlines = []
+        for line, size in self.textlines:
+            del line._objs[size:]
+            textlines.append(line)
+        return textlines
+
+
+class LTCharExtended(LTChar):
+    """Actual letter in the text as a Unicode string.
+
+    One of these is made per glyph, so unlike LTChar it keeps its state in slots, and bbox, width, height,
+    size and fontname are derived on access. The text matrix and width are only used to place the glyph
+    and are not kept. The pdfminer base classes have no __slots__, so instances still support a __dict__,
+    but CPython only allocates one once an attribute outside __slots__ is set.
+    """
+
+    __slots__ = ('_text', 'font', 'fontsize', 'ncs', 'graphicstate', 'adv', 'upright', 'x0', 'y0', 'x1', 'y1')
+
+    def __init__(self,
+                 matrix: Tuple[int, int, int, int, int, int],
+                 font: PDFFont,
+                 fontsize: float,
+                 scaling: float,
+                 rise: float,
+                 text: str,
+                 textwidth: float,
+                 textdisp: Union[float, Tuple[Optional[float], float]],
+                 ncs: PDFColorSpace,
+                 graphicstate: PDFGraphicState) -> None:
+        # same geometry as LTChar.__init__
+        self._text = text
+        self.font = font
+        self.fontsize = fontsize
+        self.ncs = ncs
+        self.graphicstate = graphicstate
+        self.adv = textwidth * fontsize * scaling
+        if font.is_vertical():
+            (vx, vy) = cast(Tuple[Optional[float], float], textdisp)
+            if vx is None:
+                vx = fontsize * 0.5
+            else:
+                vx = vx * fontsize * .001
+            vy = (1000 - vy) * fontsize * .001
+            bbox_lower_left = (-vx, vy + rise + self.adv)
+            bbox_upper_right = (-vx + fontsize, vy + rise)
+        else:
+            descent = font.get_descent() * fontsize
+            bbox_lower_left = (0, descent + rise)
+            bbox_upper_right = (self.adv, descent + rise + fontsize)
+        (a, b, c, d, e, f) = matrix
+        self.upright = (0 < a*d*scaling and b*c <= 0)
+        (x0, y0) = apply_matrix_pt(matrix, bbox_lower_left)
+        (x1, y1) = apply_matrix_pt(matrix, bbox_upper_right)
+        if x1 < x0:
+            (x0, x1) = (x1, x0)
+        if y1 < y0:
+            (y0, y1) = (y1, y0)
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        return
+
+    def __repr__(self) -> str:
+        return ('<%s %s font=%r adv=%s text=%r>' %
+                (self.__class__.__name__, bbox2str(self.bbox), self.fontname, self.adv, self.get_text()))
+
+    def set_bbox(self, bbox: Tuple[float, float, float, float]) -> None:
+        (self.x0, self.y0, self.x1, self.y1) = bbox
+        return
+
+    @property
+    def bbox(self) -> Tuple[float, float, float, float]:
+        return (self.x0, self.y0, self.x1, self.y1)
+
+    @property
+    def width(self) -> float:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> float:
+        return self.y1 - self.y0
+
+    @property
+    def size(self) -> float:
+        return self.width if self.font.is_vertical() else self.height
+
+    @property
+    def fontname(self) -> str:
+        return cast(str, self.font.fontname)
+
+
+class LTPageExtended(LTLayoutContainerExtended):
+
+    def __init__(self,
+                 pageid: int,
+                 bbox: Tuple[int, int, int, int],
+                 rotate: int = 0,
+                 rsrcmgr: Optional[PDFResourceManager] = None) -> None:
+        LTLayoutContainerExtended.__init__(self, bbox, rsrcmgr)
+        self.pageid = pageid
+        self.rotate = rotate
+        return
+
+    def __repr__(self) -> str:
+        return ('<%s(%r) %s rotate=%r>' %
+                (self.__class__.__name__, self.pageid,
+                 bbox2str(self.bbox), self.rotate))
+
+
+class LTColumn(LTLayoutContainerExtended):
+    pass
+
+
+class LTTextLineHorizontalExtended(LTTextLineHorizontal):
+    def __init__(self,
+                 word_margin: float) -> None:
+        super().__init__(word_margin)
+        # line statistics are kept up to date in add() so the properties below are cheap
+        self._left_margin: float = 612
+        self._right_margin: float = 0
+        self._font_freq: Dict[Tuple[PDFFont, float], int] = {}
+        self._last_font: Optional[Tuple[PDFFont, float]] = None
+        self._popular_font: Optional[Tuple[PDFFont, float]] = None
+        self._fontsizes: Set[float] = set()
+        self._classification: Optional[Tuple[PaperResourceManager, int, Type]] = None
+        # lines only ever grow (add(), analyze()) or get cut back (LTPageRecord), so the
+        # number of objects tells whether the cached text is still current
+        self._cached_text: Optional[Tuple[int, str]] = None
+
+    def add(self, obj: Union[LTItem, LTText]) -> None:
+        super().add(obj)
+        if isinstance(obj, LTCharExtended):
+            if obj.x0 < self._left_margin:
+                self._left_margin = obj.x0
+            if obj.x1 > self._right_margin:
+                self._right_margin = obj.x0
+            key = (obj.font, obj.fontsize)
+            self._font_freq[key] = self._font_freq.get(key, 0) + 1
+            self._last_font = key
+            self._popular_font = None
+            self._fontsizes.add(obj.fontsize)
+        self._classification = None
+
+    def get_text(self) -> str:
+        if self._cached_text is None or self._cached_text[0] != len(self._objs):
+            self._cached_text = (len(self._objs), super().get_text())
+        return self._cached_text[1]
+
+    @property
+    def left_margin(self) -> float:
+        return self._left_margin
+
+    @property
+    def right_margin(self) -> float:
+        return self._right_margin
+
+    def get_popular_font(self) -> Tuple[PDFFont, float]:
+        if self._popular_font is None:
+            self._popular_font = get_most_frequent(self._font_freq, self._last_font)
+        return cast(Tuple[PDFFont, float], self._popular_font)
+
+    @property
+    def fontsize(self) -> float:
+        _, fontsize = self.get_popular_font()
+        return fontsize
+
+    @property
+    def font(self) -> PDFFont:
+        font, _ = self.get_popular_font()
+        return font
+
+    def is_font_similar(self, other_line: 'LTTextLineHorizontalExtended') -> bool:
+        return not self._fontsizes.isdisjoint(other_line._fontsizes)
+
+    def maybe_compare(self,
+                      other_line: LTText) -> bool:
+        if not isinstance(other_line, LTTextLineHorizontalExtended):
+            return False
+        if self.bbox != other_line.bbox:
+            return False
+        if self.get_text().strip() != other_line.get_text().strip():
+            return False
+        return True
+
+    def maybe_classify(self,
+                       rsrcmgr: PaperResourceManager) -> Type:
+        if not rsrcmgr:
+            return LTTextBoxHorizontal
+        if (self._classification is None or self._classification[0] is not rsrcmgr or
+                self._classification[1] != rsrcmgr.generation):
+            self._classification = (rsrcmgr, rsrcmgr.generation, self.classify(rsrcmgr))
+        return self._classification[2]
+
+    def classify(self,
+                 rsrcmgr: PaperResourceManager) -> Type:
+        if self._objs[0].y0 > cast(LTTextBox, rsrcmgr.top_margin_ref).y1:
+            return LTPageMargin
+        if self.maybe_compare(rsrcmgr.top_margin_ref):
+            return LTTitle
+        if rsrcmgr.after_title:
+            if rsrcmgr.section_header_font == self.font and rsrcmgr.section_header_font_size == self.fontsize:
+                return LTSectionHeader
+            if not rsrcmgr.after_abstract:
+                return LTAuthor
+            if self.font == rsrcmgr.body_font and self.fontsize == rsrcmgr.body_font_size:
+                return LTSectionBody
+            if self.fontsize == rsrcmgr.tiny_font_size:
+                if rsrcmgr.after_ref:
+                    return LTCitationBox
+                else:
+                    return LTFooter
+            # if rsrcmgr.after_ref and ref_pattern.match(self.get_text()):
+            #    return LTCitation
+
+        return LTTextBoxHorizontal
+
+    def find_neighbors_with_rsrcmgr(self,
+                                    plane: Plane,
+                                    ratio: float,
+                                    rsrcmgr: PaperResourceManager) -> List[Union[LTItem, LTText]]:
+        d = ratio*self.height
+        objs = plane.find((self.x0, self.y0-d, self.x1, self.y1+d))
+        classification = self.maybe_classify(rsrcmgr)
+        return [obj for obj in objs if self.is_neighbor(obj, classification, d, rsrcmgr)]
+
+    def is_neighbor(self, obj: LTItem, classification: Type, d: float, rsrcmgr: PaperResourceManager) -> bool:
+        if not isinstance(obj, LTTextLineHorizontalExtended) or classification != obj.maybe_classify(rsrcmgr):
+            return False
+        return ((abs(obj.height-self.height) < d and self.is_font_similar(obj) and self.is_x_similar(obj, d)) or
+                classification in LOOSE_CLASSIFICATIONS)
+
+    def is_x_similar(self, obj: LTTextBox, d: float) -> bool:
+        return abs(obj.x0 - self.x0) < d or abs(obj.x1 - self.x1) < d
+
+
+class LTTextLineStub(LTTextLineHorizontalExtended):
+    """Stand-in for a textline laid out elsewhere, keeping only its text, bbox and font."""
+
+    def __init__(self, text: str, bbox: Tuple[float, float, float, float], font: PDFFont, fontsize: float) -> None:
+        super().__init__(0)
+        self.set_bbox(bbox)
+        self._text = text
+        self._font = font
+        self._fontsize = fontsize
+        return
+
+    def get_text(self) -> str:
+        return self._text
+
+    @property
+    def font(self) -> PDFFont:
+        return self._font
+
+    @property
+    def fontsize(self) -> float:
+        return self._fontsize
+
+
+class LTPageMargin(LTTextBoxHorizontal):
+    pass
+
+
+class LTTitle(LTTextBoxHorizontal):
+    pass
+
+
+class LTAuthor(LTTextBoxHorizontal):
+    pass
+
+
+class LTSectionHeader(LTTextBoxHorizontal):
+    pass
+
+
+class LTSectionBody(LTTextBoxHorizontal):
+    pass
+
+
+class LTFooter(LTTextBoxHorizontal):
+    pass
+
+
+class LTCitationBox(LTTextBoxHorizontal):
+    pass
+
+
+# classifications whose lines group with any overlapping line of the same classification
+LOOSE_CLASSIFICATIONS = (LTAuthor, LTPageMargin, LTCitationBox, LTFooter)
+
+
+class LTCitation(LTTextBox):
+    def __init__(self, text: str = '', pageid: int = 0) -> None:
+        super().__init__()
+        self.text = text
+        self.pageid = pageid
+        self.ref = 0
+        self.author: List[str] = []
+        self.title: Optional[str] = None
+        self.venue: Optional[str] = None
+        self.date = '0000'
+        self.link = ''
+        return
+
+    def get_text(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return '<%s [%d] %r>' % (self.__class__.__name__, self.ref, self.title)
+
+
+class LTEquation(LTTextContainer):
+    pass
+
+
+class LTCaption(LTTextContainer):
+    pass
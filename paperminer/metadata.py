@@ -0,0 +1,114 @@
+import itertools
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+
+from paperminer import match_line_kind
+from paperminer.converter import ExtendedPaperAnalyzer, PaperToTextConverter
+from paperminer.document import open_document
+from paperminer.layout import LTTitle, LTAuthor, LTSectionHeader, LTPageMargin, LTFooter
+
+abstract_prefix_pattern = re.compile('[\\d.]* ?abstract[\\s.:—-]*', re.IGNORECASE)
+
+
+class PaperMetadata:
+    def __init__(self, pages: int = 0) -> None:
+        self.title: Optional[str] = None
+        self.authors: List[str] = []
+        self.abstract: Optional[str] = None
+        # number of pages that had to be interpreted
+        self.pages = pages
+        return
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'title': self.title, 'authors': self.authors, 'abstract': self.abstract, 'pages': self.pages}
+
+    def __repr__(self) -> str:
+        return ('<%s title=%r authors=%d pages=%d>' %
+                (self.__class__.__name__, self.title, len(self.authors), self.pages))
+
+
+def closes_abstract(header_bbox: Tuple[float, float, float, float], bbox: Tuple[float, float, float, float]) -> bool:
+    # a section header further down the column of the abstract header; one beside it starts another column
+    return bbox[3] <= header_bbox[1] and bbox[0] < header_bbox[2]
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.split())
+
+
+class MetadataConverter(PaperToTextConverter):
+    """Classifies only as many leading pages as it takes to get past the abstract, at most max_pages.
+
+    Body and header fonts are decided from those pages alone, so blocks are not always classified the
+    way a full PaperToTextConverter would, but title, authors and abstract come out the same for the
+    usual first-page layouts.
+    """
+
+    def __init__(self, document: PDFDocument, max_pages: int = 3) -> None:
+        self.npages = 0
+        self.abstract_pageid: Optional[int] = None
+        super().__init__(document, max_pages=max_pages, text_only=True)
+        return
+
+    def first_pass(self, analyzer: ExtendedPaperAnalyzer) -> None:
+        interpreter = analyzer.create_interpreter()
+        headers = self.rsrcmgr.section_header_ref
+        # section headers found up to the end of the page with the abstract header
+        page_end = 0
+        for page in itertools.islice(PDFPage.create_pages(self.document), self.max_pages):
+            interpreter.process_page(page)
+            self.npages += 1
+            abstract = self.rsrcmgr.abstract_ref
+            if abstract is None:
+                continue
+            if self.abstract_pageid is None:
+                self.abstract_pageid = self.npages
+                page_end = len(headers)
+            start = next(i for i, line in enumerate(headers) if line is abstract) + 1
+            if len(headers) > page_end or any(closes_abstract(abstract.bbox, line.bbox)
+                                              for line in headers[start:page_end]):
+                break
+        return
+
+    def create_pages(self, pagenos: Optional[List[int]] = None) -> Iterator[Tuple[int, PDFPage]]:
+        return itertools.islice(enumerate(PDFPage.create_pages(self.document)), self.npages)
+
+    def get_metadata(self) -> PaperMetadata:
+        metadata = PaperMetadata(self.npages)
+        titles: List[str] = []
+        abstract: Optional[List[str]] = None
+        header_bbox = (0.0, 0.0, 0.0, 0.0)
+        abstract_ref = self.rsrcmgr.abstract_ref
+        blocks = ((page.pageid, block) for page in self.iter_pages() for block in page)
+        for (pageid, block) in blocks:
+            (x0, y0, x1, y1) = block.bbox
+            if abstract is None:
+                if (abstract_ref is not None and pageid == self.abstract_pageid and
+                        x0 <= abstract_ref.x0 and y0 <= abstract_ref.y0 and
+                        x1 >= abstract_ref.x1 and y1 >= abstract_ref.y1):
+                    header_bbox = block.bbox
+                    abstract = [abstract_prefix_pattern.sub('', block.text, count=1)]
+                elif issubclass(block.klass, LTTitle):
+                    titles.append(block.text)
+                elif issubclass(block.klass, LTAuthor):
+                    metadata.authors.extend(line.strip() for line in block.text.splitlines() if line.strip())
+                continue
+            same_page = pageid == self.abstract_pageid
+            if (issubclass(block.klass, LTSectionHeader) or
+                    match_line_kind(block.text) in ('introduction', 'background', 'reference')):
+                if not same_page or closes_abstract(header_bbox, block.bbox):
+                    break
+            elif (not same_page or y1 <= header_bbox[1]) and not issubclass(block.klass, (LTPageMargin, LTFooter)):
+                abstract.append(block.text)
+        metadata.title = normalize(' '.join(titles)) or None
+        if abstract is not None:
+            metadata.abstract = normalize(' '.join(abstract))
+        return metadata
+
+
+def extract_metadata(path: str, max_pages: int = 3) -> PaperMetadata:
+    with open_document(path) as document:
+        return MetadataConverter(document, max_pages=max_pages).get_metadata()
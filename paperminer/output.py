@@ -0,0 +1,104 @@
+import io
+import sys
+from typing import Callable, List, Optional, Tuple, Type, TextIO, Iterator, Union, cast
+
+from pdfminer.layout import LTTextBox, LTTextBoxVertical
+
+from paperminer import get_most_popular
+from paperminer.layout import (LTPageMargin, LTFooter, LTCitationBox, LTTitle, LTAuthor,
+                               LTTextLineHorizontalExtended)
+
+
+class PaperBlock:
+    """A classified text box of a page, or a text line left outside of the boxes, detached from the layout tree."""
+
+    def __init__(self, pageid: int, box: Union[LTTextBox, LTTextLineHorizontalExtended]) -> None:
+        self.pageid = pageid
+        self.klass: Type = box.__class__
+        self.bbox: Tuple[float, float, float, float] = box.bbox
+        self.text: str = box.get_text()
+        # the font of most of its lines, by name so that blocks can be pickled and written out
+        lines = [box] if isinstance(box, LTTextLineHorizontalExtended) else box
+        fonts = [(line.font.fontname, line.fontsize) for line in lines
+                 if isinstance(line, LTTextLineHorizontalExtended)]
+        (self.font, self.fontsize) = cast(Tuple[Optional[str], float], get_most_popular(fonts) if fonts else (None, 0))
+        return
+
+    @property
+    def kind(self) -> str:
+        return self.klass.__name__
+
+    def __repr__(self) -> str:
+        return '<%s page=%d %s %r>' % (self.__class__.__name__, self.pageid, self.kind, self.text)
+
+
+class PaperPage:
+    def __init__(self, pageid: int, bbox: Tuple[float, float, float, float], blocks: List[PaperBlock]) -> None:
+        self.pageid = pageid
+        self.bbox = bbox
+        self.blocks = blocks
+        return
+
+    def __iter__(self) -> Iterator[PaperBlock]:
+        return iter(self.blocks)
+
+    def __repr__(self) -> str:
+        return '<%s(%d) blocks=%d>' % (self.__class__.__name__, self.pageid, len(self.blocks))
+
+
+class PaperSink:
+    """Receives the pages of a document as PaperToTextConverter finishes them."""
+
+    def write_page(self, page: PaperPage) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        return
+
+
+class TextSink(PaperSink):
+    """Writes the running text of each page, leaving out margins, title, authors, footers and citations."""
+
+    skipped: Tuple[Type, ...] = (LTPageMargin, LTFooter, LTCitationBox, LTTitle, LTAuthor, LTTextBoxVertical)
+
+    def __init__(self, outfp: Optional[TextIO] = None) -> None:
+        self.outfp = outfp if outfp is not None else sys.stdout
+        return
+
+    def write_page(self, page: PaperPage) -> None:
+        self.outfp.write(''.join(block.text for block in page if not issubclass(block.klass, self.skipped)))
+        return
+
+    def close(self) -> None:
+        self.outfp.flush()
+        return
+
+
+class FileSink(TextSink):
+    def __init__(self, path: str, buffering: int = 1 << 20) -> None:
+        super().__init__(open(path, 'w', encoding='utf-8', buffering=buffering))
+        return
+
+    def close(self) -> None:
+        self.outfp.close()
+        return
+
+
+class MemorySink(TextSink):
+    def __init__(self) -> None:
+        self.buffer = io.StringIO()
+        super().__init__(self.buffer)
+        return
+
+    def getvalue(self) -> str:
+        return self.buffer.getvalue()
+
+
+class CallbackSink(PaperSink):
+    def __init__(self, callback: Callable[[PaperPage], None]) -> None:
+        self.callback = callback
+        return
+
+    def write_page(self, page: PaperPage) -> None:
+        self.callback(page)
+        return
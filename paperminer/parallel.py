@@ -0,0 +1,149 @@
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Dict, Tuple
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFFont
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import dict_value
+
+from paperminer import PaperResourceManager
+from paperminer.converter import ExtendedPaperAnalyzer
+from paperminer.layout import LTTextLineHorizontalExtended, LTTextLineStub
+
+log = logging.getLogger(__name__)
+
+
+class LineSummary:
+    def __init__(self, text: str, bbox: Tuple[float, float, float, float], font_id: int, fontsize: float) -> None:
+        self.text = text
+        self.bbox = bbox
+        self.font_id = font_id
+        self.fontsize = fontsize
+        return
+
+
+class ResourceSummary:
+    """Picklable first-pass statistics of a run of pages, with fonts replaced by their PDF object ids."""
+
+    def __init__(self, rsrcmgr: PaperResourceManager) -> None:
+        self.font_map: Dict[Tuple[int, float], int] = {}
+        for (font, fontsize), count in rsrcmgr.font_map.items():
+            self.font_map[(self.font_id(rsrcmgr, font), fontsize)] = count
+        self.left_margin = rsrcmgr.left_margin
+        self.right_margin = rsrcmgr.right_margin
+        self.top_margin_ref = self.summarize(rsrcmgr, rsrcmgr.top_margin_ref)
+        self.abstract_ref = self.summarize(rsrcmgr, rsrcmgr.abstract_ref)
+        self.ref_ref = self.summarize(rsrcmgr, rsrcmgr.ref_ref)
+        self.section_header_ref = [self.summarize(rsrcmgr, line) for line in rsrcmgr.section_header_ref]
+        self.figure_ref = [self.summarize(rsrcmgr, line) for line in rsrcmgr.figure_ref]
+        self.table_ref = [self.summarize(rsrcmgr, line) for line in rsrcmgr.table_ref]
+        # only the first abstract header of the whole document counts as a section header,
+        # so remember which entry it was in case an earlier run of pages already had one
+        self.abstract_index: Optional[int] = None
+        for i, line in enumerate(rsrcmgr.section_header_ref):
+            if line is rsrcmgr.abstract_ref:
+                self.abstract_index = i
+                break
+        return
+
+    @staticmethod
+    def font_id(rsrcmgr: PaperResourceManager, font: PDFFont) -> int:
+        objid = rsrcmgr.font_objids.get(font)
+        if objid is None:
+            raise ValueError(f'font {font!r} is not an indirect object and cannot be shared between processes')
+        return objid
+
+    @classmethod
+    def summarize(cls, rsrcmgr: PaperResourceManager, line: Optional[LTTextLineHorizontalExtended]) \
+            -> Optional[LineSummary]:
+        if line is None:
+            return None
+        return LineSummary(line.get_text(), line.bbox, cls.font_id(rsrcmgr, line.font), line.fontsize)
+
+
+def merge_summaries(document: PDFDocument, summaries: List[ResourceSummary],
+                    rsrcmgr: Optional[PaperResourceManager] = None) -> PaperResourceManager:
+    """Combine summaries of consecutive runs of pages, in page order, as if one pass had seen every page.
+
+    Fonts are resolved through the returned resource manager, a new one unless rsrcmgr is given, so a converter
+    using it for the second pass sees the very same font objects.
+    """
+    rsrcmgr = rsrcmgr or PaperResourceManager()
+    fonts: Dict[int, PDFFont] = {}
+
+    def get_font(font_id: int) -> PDFFont:
+        if font_id not in fonts:
+            fonts[font_id] = rsrcmgr.get_font(font_id, dict_value(document.getobj(font_id)))
+        return fonts[font_id]
+
+    def line_stub(summary: Optional[LineSummary]) -> Optional[LTTextLineStub]:
+        if summary is None:
+            return None
+        return LTTextLineStub(summary.text, summary.bbox, get_font(summary.font_id), summary.fontsize)
+
+    for summary in summaries:
+        rsrcmgr.add_font_counts({(get_font(font_id), fontsize): count
+                                 for (font_id, fontsize), count in summary.font_map.items()})
+        rsrcmgr.left_margin = min(rsrcmgr.left_margin, summary.left_margin)
+        rsrcmgr.right_margin = max(rsrcmgr.right_margin, summary.right_margin)
+        if rsrcmgr.top_margin_ref is None:
+            rsrcmgr.top_margin_ref = line_stub(summary.top_margin_ref)
+        for i, line in enumerate(summary.section_header_ref):
+            if i == summary.abstract_index and rsrcmgr.abstract_ref is not None:
+                continue
+            rsrcmgr.add_section_header(line_stub(line))
+        if rsrcmgr.abstract_ref is None:
+            rsrcmgr.abstract_ref = line_stub(summary.abstract_ref)
+        if summary.ref_ref is not None:
+            rsrcmgr.ref_ref = line_stub(summary.ref_ref)
+        rsrcmgr.figure_ref.extend(line_stub(line) for line in summary.figure_ref)
+        rsrcmgr.table_ref.extend(line_stub(line) for line in summary.table_ref)
+    return rsrcmgr
+
+
+def analyze_document(document: PDFDocument, start: int = 0, stop: Optional[int] = None) -> PaperResourceManager:
+    """Run the first pass over pages [start, stop) of document in this process."""
+    rsrcmgr = PaperResourceManager()
+    # only statistics of the text are kept, so paths and images need not be laid out
+    analyzer = ExtendedPaperAnalyzer(rsrcmgr, pageno=start + 1, text_only=True)
+    interpreter = analyzer.create_interpreter()
+    for page in itertools.islice(PDFPage.create_pages(document), start, stop):
+        interpreter.process_page(page)
+    return rsrcmgr
+
+
+def analyze_pages(path: str, start: int, stop: int) -> ResourceSummary:
+    """Run the first pass over pages [start, stop) of the PDF at path."""
+    with open(path, 'rb') as fp:
+        return ResourceSummary(analyze_document(PDFDocument(PDFParser(fp)), start, stop))
+
+
+def analyze_parallel(path: str,
+                     document: PDFDocument,
+                     workers: Optional[int] = None,
+                     pages_per_shard: Optional[int] = None) -> PaperResourceManager:
+    """Run the first pass over the PDF at path with its pages sharded across worker processes.
+
+    document must be the already opened PDF at path. The result can be given to PaperToTextConverter as
+    rsrcmgr and yields exactly the same output as a serial first pass. Documents with fonts that are not
+    indirect objects cannot be summarized in another process, and get a serial first pass in this one.
+    """
+    workers = workers or os.cpu_count() or 1
+    npages = sum(1 for _ in PDFPage.create_pages(document))
+    if not pages_per_shard:
+        pages_per_shard = max(1, -(-npages // workers))
+    starts = list(range(0, npages, pages_per_shard))
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(starts)) or 1) as executor:
+            summaries = list(executor.map(analyze_pages,
+                                          itertools.repeat(path),
+                                          starts,
+                                          [start + pages_per_shard for start in starts]))
+    except ValueError as e:
+        log.info('%s: %s, running the first pass serially', path, e)
+        return analyze_document(document)
+    return merge_summaries(document, summaries)
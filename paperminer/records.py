@@ -0,0 +1,257 @@
+"""One record per classified block (document, page, bbox, kind, font, font size and text), written in batches.
+
+JSONLWriter writes one JSON object per line. ColumnarWriter writes the same records column by column, in row
+groups of batch_size blocks, to a file that ColumnarReader memory-maps and scans without parsing the rows:
+
+    MAGIC
+    row group: one array per column of COLUMNS, then the text of its blocks as UTF-8, each aligned to 8 bytes
+    ...
+    footer: JSON with the offset of every column of every row group and the document, kind and font names
+    footer length (uint64), MAGIC
+
+Numbers are little-endian; bbox and fontsize are float32, documents, kinds and fonts are indices into the names
+kept in the footer, with 0 for a block without a font.
+"""
+import array
+import json
+import mmap
+import sys
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from paperminer.output import PaperBlock, PaperPage, PaperSink
+
+MAGIC = b'PMBLOCK1'
+COLUMNS = (('doc', 'I'), ('page', 'I'), ('x0', 'f'), ('y0', 'f'), ('x1', 'f'), ('y1', 'f'), ('kind', 'H'),
+           ('font', 'I'), ('fontsize', 'f'), ('text', 'Q'))
+
+
+def block_record(doc: str, block: PaperBlock) -> Dict[str, Any]:
+    return {'doc': doc, 'page': block.pageid, 'bbox': list(block.bbox), 'kind': block.kind, 'font': block.font,
+            'fontsize': block.fontsize, 'text': block.text}
+
+
+class RecordWriter:
+    def write_page(self, doc: str, page: PaperPage) -> None:
+        for block in page:
+            self.write_block(doc, block)
+        return
+
+    def write_block(self, doc: str, block: PaperBlock) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        return
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+        return
+
+
+class JSONLWriter(RecordWriter):
+    def __init__(self, out: Union[str, TextIO], batch_size: int = 4096) -> None:
+        self.outfp = open(out, 'w', encoding='utf-8') if isinstance(out, str) else out
+        self.owned = isinstance(out, str)
+        self.batch_size = batch_size
+        self.lines: List[str] = []
+        return
+
+    def write_block(self, doc: str, block: PaperBlock) -> None:
+        self.lines.append(json.dumps(block_record(doc, block), ensure_ascii=False))
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+        return
+
+    def flush(self) -> None:
+        if self.lines:
+            self.outfp.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+        return
+
+    def close(self) -> None:
+        self.flush()
+        if self.owned:
+            self.outfp.close()
+        else:
+            self.outfp.flush()
+        return
+
+
+class ColumnarWriter(RecordWriter):
+    def __init__(self, out: Union[str, BinaryIO], batch_size: int = 65536) -> None:
+        self.outfp = open(out, 'wb') if isinstance(out, str) else out
+        self.owned = isinstance(out, str)
+        self.batch_size = batch_size
+        self.names: Dict[str, Dict[str, int]] = {'doc': {}, 'kind': {}, 'font': {'': 0}}
+        self.row_groups: List[Dict[str, Any]] = []
+        self.offset = 0
+        self.new_batch()
+        self.write(MAGIC)
+        return
+
+    def new_batch(self) -> None:
+        self.columns: Dict[str, 'array.array[Any]'] = {name: array.array(typecode) for (name, typecode) in COLUMNS}
+        self.columns['text'].append(0)
+        self.texts: List[bytes] = []
+        return
+
+    def name_index(self, kind: str, name: str) -> int:
+        names = self.names[kind]
+        if name not in names:
+            names[name] = len(names)
+        return names[name]
+
+    def write_block(self, doc: str, block: PaperBlock) -> None:
+        columns = self.columns
+        columns['doc'].append(self.name_index('doc', doc))
+        columns['page'].append(block.pageid)
+        for name, value in zip(('x0', 'y0', 'x1', 'y1'), block.bbox):
+            columns[name].append(value)
+        columns['kind'].append(self.name_index('kind', block.kind))
+        columns['font'].append(self.name_index('font', block.font or ''))
+        columns['fontsize'].append(block.fontsize)
+        text = block.text.encode('utf-8')
+        self.texts.append(text)
+        columns['text'].append(columns['text'][-1] + len(text))
+        if len(self.texts) >= self.batch_size:
+            self.flush()
+        return
+
+    def write(self, data: bytes) -> int:
+        offset = self.offset
+        self.outfp.write(data)
+        self.offset += len(data)
+        padding = -self.offset % 8
+        if padding:
+            self.outfp.write(b'\0' * padding)
+            self.offset += padding
+        return offset
+
+    def flush(self) -> None:
+        if not self.texts:
+            return
+        offsets = {}
+        for name, column in self.columns.items():
+            if sys.byteorder != 'little':
+                column.byteswap()
+            offsets[name] = self.write(column.tobytes())
+        offsets['blob'] = self.write(b''.join(self.texts))
+        self.row_groups.append({'rows': len(self.texts), 'offsets': offsets})
+        self.new_batch()
+        return
+
+    def close(self) -> None:
+        self.flush()
+        footer = {'columns': COLUMNS, 'row_groups': self.row_groups,
+                  'names': {kind: list(names) for kind, names in self.names.items()}}
+        data = json.dumps(footer).encode('utf-8')
+        self.outfp.write(data + len(data).to_bytes(8, 'little') + MAGIC)
+        if self.owned:
+            self.outfp.close()
+        else:
+            self.outfp.flush()
+        return
+
+
+class RowGroup:
+    def __init__(self, buffer: memoryview, rows: int, offsets: Dict[str, int]) -> None:
+        self.rows = rows
+        self.columns: Dict[str, memoryview] = {}
+        for name, typecode in COLUMNS:
+            size = array.array(typecode).itemsize
+            length = rows + 1 if name == 'text' else rows
+            column = buffer[offsets[name]:offsets[name] + length * size]
+            if sys.byteorder != 'little':
+                swapped = array.array(typecode, column.tobytes())
+                swapped.byteswap()
+                column = memoryview(swapped)
+            self.columns[name] = column.cast(typecode)  # type: ignore
+        self.blob = buffer[offsets['blob']:offsets['blob'] + self.columns['text'][rows]]
+        return
+
+    def text(self, row: int) -> str:
+        offsets = self.columns['text']
+        return str(self.blob[offsets[row]:offsets[row + 1]], 'utf-8')
+
+
+class ColumnarReader:
+    """Memory-maps a file written by ColumnarWriter.
+
+    column() gives the values of one column of a row group as a typed memoryview (numpy.frombuffer takes it
+    as is), and scan() decodes the text of just the blocks it is asked for.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.fp = open(path, 'rb')
+        self.mmap = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+        if self.buffer[:len(MAGIC)] != MAGIC or self.buffer[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a paperminer block file')
+        end = len(self.buffer) - len(MAGIC) - 8
+        size = int.from_bytes(self.buffer[end:end + 8], 'little')
+        footer = json.loads(str(self.buffer[end - size:end], 'utf-8'))
+        self.names: Dict[str, List[str]] = footer['names']
+        self.row_groups = [RowGroup(self.buffer, group['rows'], group['offsets']) for group in footer['row_groups']]
+        return
+
+    def __len__(self) -> int:
+        return sum(group.rows for group in self.row_groups)
+
+    def column(self, group: int, name: str) -> memoryview:
+        return self.row_groups[group].columns[name]
+
+    def scan(self, kinds: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, int, str]]:
+        """(document, page, text) of every block, or of the blocks of the given kinds, e.g. 'LTSectionBody'."""
+        wanted = None if kinds is None else {self.names['kind'].index(kind) for kind in kinds
+                                             if kind in self.names['kind']}
+        docs = self.names['doc']
+        for group in self.row_groups:
+            (doc, page, kind) = (group.columns['doc'], group.columns['page'], group.columns['kind'])
+            for row in range(group.rows):
+                if wanted is None or kind[row] in wanted:
+                    yield (docs[doc[row]], page[row], group.text(row))
+        return
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Every block as the record JSONLWriter writes, with bbox and fontsize at float32 precision."""
+        (docs, kinds, fonts) = (self.names['doc'], self.names['kind'], self.names['font'])
+        for group in self.row_groups:
+            c = group.columns
+            for row in range(group.rows):
+                yield {'doc': docs[c['doc'][row]], 'page': c['page'][row],
+                       'bbox': [c['x0'][row], c['y0'][row], c['x1'][row], c['y1'][row]],
+                       'kind': kinds[c['kind'][row]], 'font': fonts[c['font'][row]] or None,
+                       'fontsize': c['fontsize'][row], 'text': group.text(row)}
+        return
+
+    def close(self) -> None:
+        for group in getattr(self, 'row_groups', []):
+            group.columns.clear()
+            group.blob.release()
+        self.buffer.release()
+        self.mmap.close()
+        self.fp.close()
+        return
+
+    def __enter__(self) -> 'ColumnarReader':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+        return
+
+
+class RecordSink(PaperSink):
+    """Writes the pages of one document to a RecordWriter shared by the documents of a corpus."""
+
+    def __init__(self, writer: RecordWriter, doc: str) -> None:
+        self.writer = writer
+        self.doc = doc
+        return
+
+    def write_page(self, page: PaperPage) -> None:
+        self.writer.write_page(self.doc, page)
+        return
@@ -0,0 +1,384 @@
+"""asyncio front end to extraction, for services: a managed pool of worker processes behind a bounded queue.
+
+    async with ExtractionService(workers=4, timeout=60) as service:
+        async for page in service.pages('paper.pdf'):
+            ...
+        text = await service.extract_text(pdf_bytes)
+
+Each worker process parses one document at a time and sends its pages back as they are classified. A request
+that runs past its timeout, or is cancelled by its caller (including by leaving the async for early), gets its
+worker process killed and replaced, so a runaway parse never keeps a worker busy.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, List, Optional, Set, TextIO, Tuple, Union
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from paperminer import PaperResourceManager
+from paperminer.batch import ExtractionTimeout, pages_text
+from paperminer.converter import PaperToTextConverter
+from paperminer.document import open_document
+from paperminer.fonts import FontCache
+from paperminer.output import PaperPage
+from paperminer.records import block_record
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore
+
+log = logging.getLogger(__name__)
+
+Source = Union[str, bytes]
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def _serve_worker(conn: Connection, font_cache_size: int, max_memory: Optional[int]) -> None:
+    PaperResourceManager.font_cache = FontCache(font_cache_size) if font_cache_size > 0 else None
+    if max_memory and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+    while True:
+        try:
+            (source, single_pass, max_pages) = conn.recv()
+        except EOFError:
+            return
+        try:
+            # a path is memory-mapped by open_document, bytes are parsed as they are
+            opened: ContextManager[PDFDocument] = contextlib.nullcontext(PDFDocument(PDFParser(io.BytesIO(source)))) \
+                if isinstance(source, bytes) else open_document(source)
+            with opened as document:
+                converter = PaperToTextConverter(document, single_pass=single_pass, max_pages=max_pages,
+                                                 text_only=True)
+                for page in converter.iter_pages():
+                    conn.send(('page', page))
+            conn.send(('done', None))
+        except Exception as e:
+            conn.send(('error', f'{e.__class__.__name__}: {e}'))
+
+
+class Worker:
+    def __init__(self, context: Any, font_cache_size: int, max_memory: Optional[int]) -> None:
+        (self.conn, child) = context.Pipe()
+        self.process = context.Process(target=_serve_worker, args=(child, font_cache_size, max_memory), daemon=True)
+        self.process.start()
+        child.close()
+        return
+
+    def kill(self) -> None:
+        # the connection is left to be closed once no thread is reading from it any more
+        self.process.kill()
+        self.process.join()
+        return
+
+    def close(self) -> None:
+        self.conn.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        return
+
+
+class ExtractionRequest:
+    """One document submitted to an ExtractionService; iterate over it for its pages."""
+
+    def __init__(self, source: Source, timeout: Optional[float], single_pass: bool, max_pages: Optional[int],
+                 page_buffer: int) -> None:
+        self.source = source
+        self.timeout = timeout
+        self.single_pass = single_pass
+        self.max_pages = max_pages
+        # pages, then None when done or the exception the request failed with
+        self.results: 'asyncio.Queue[Union[PaperPage, BaseException, None]]' = asyncio.Queue(page_buffer)
+        # that last result while results had no room for it
+        self.unqueued: Optional[Tuple[Optional[BaseException]]] = None
+        self.task: Optional[asyncio.Future] = None
+        self.cancelled = False
+        return
+
+    async def __aiter__(self) -> AsyncIterator[PaperPage]:
+        try:
+            while True:
+                if self.unqueued is not None and self.results.empty():
+                    result: Union[PaperPage, BaseException, None] = self.unqueued[0]
+                else:
+                    result = await self.results.get()
+                if result is None:
+                    return
+                if isinstance(result, BaseException):
+                    raise result
+                yield result
+        finally:
+            self.cancel()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """End this request after the pages already passed on, with error if it failed, without waiting for its
+        caller to take any of them."""
+        try:
+            self.results.put_nowait(error)
+        except asyncio.QueueFull:
+            self.unqueued = (error,)
+        return
+
+    def cancel(self) -> None:
+        """Stop this request, killing the worker process that is parsing it if there is one."""
+        self.cancelled = True
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        return
+
+
+class ExtractionService:
+    """Extracts documents in worker processes, at most queue_size of them waiting for a worker.
+
+    timeout is the default number of seconds a worker may spend on a document, not counting the time its pages wait
+    for the caller to take them, max_memory limits the address space of each worker in bytes (where the resource
+    module is available), and page_buffer is how many classified pages a request holds before its worker waits for
+    them to be consumed.
+    """
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 queue_size: int = 64,
+                 timeout: Optional[float] = None,
+                 single_pass: bool = False,
+                 font_cache_size: int = 256,
+                 max_memory: Optional[int] = None,
+                 page_buffer: int = 8) -> None:
+        self.nworkers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.single_pass = single_pass
+        self.font_cache_size = font_cache_size
+        self.max_memory = max_memory
+        self.page_buffer = page_buffer
+        self.context = multiprocessing.get_context()
+        self.workers: List[Worker] = []
+        self.slots: List[asyncio.Future] = []
+        self.queue: Optional['asyncio.Queue[ExtractionRequest]'] = None
+        self.threads: Optional[ThreadPoolExecutor] = None
+        self.closing = False
+        return
+
+    async def start(self) -> None:
+        self.closing = False
+        self.queue = asyncio.Queue(self.queue_size)
+        # every worker has at most one send or receive in flight, and one more left behind by a killed worker
+        self.threads = ThreadPoolExecutor(max_workers=2 * self.nworkers)
+        self.workers = [self.start_worker() for _ in range(self.nworkers)]
+        self.slots = [asyncio.ensure_future(self.run_slot(slot)) for slot in range(self.nworkers)]
+        return
+
+    async def close(self) -> None:
+        """Stop the workers, failing the requests they are running and those still queued."""
+        self.closing = True
+        self.fail_queued()
+        for task in self.slots:
+            task.cancel()
+        await asyncio.gather(*self.slots, return_exceptions=True)
+        self.slots = []
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+        if self.threads is not None:
+            self.threads.shutdown(wait=False)
+            self.threads = None
+        return
+
+    def fail_queued(self) -> None:
+        while self.queue is not None and not self.queue.empty():
+            request = self.queue.get_nowait()
+            if not request.cancelled:
+                request.finish(ExtractionError('service closed'))
+        return
+
+    async def __aenter__(self) -> 'ExtractionService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+        return
+
+    def start_worker(self) -> Worker:
+        return Worker(self.context, self.font_cache_size, self.max_memory)
+
+    def restart_worker(self, slot: int) -> None:
+        self.workers[slot].kill()
+        if not self.closing:
+            self.workers[slot] = self.start_worker()
+        return
+
+    async def submit(self,
+                     source: Source,
+                     timeout: Optional[float] = None,
+                     max_pages: Optional[int] = None,
+                     block: bool = True) -> ExtractionRequest:
+        """Queue source, a path or the bytes of a PDF, waiting for room in the queue unless block is False,
+        in which case a full queue raises ServiceBusy."""
+        if self.queue is None:
+            raise RuntimeError('service is not started')
+        request = ExtractionRequest(source, timeout if timeout is not None else self.timeout, self.single_pass,
+                                    max_pages, self.page_buffer)
+        if block:
+            await self.queue.put(request)
+            if self.closing:
+                # the service closed while this waited for room
+                self.fail_queued()
+        elif self.queue.full():
+            raise ServiceBusy(f'{self.queue.qsize()} documents are already waiting')
+        else:
+            self.queue.put_nowait(request)
+        return request
+
+    async def pages(self,
+                    source: Source,
+                    timeout: Optional[float] = None,
+                    max_pages: Optional[int] = None) -> AsyncIterator[PaperPage]:
+        request = await self.submit(source, timeout=timeout, max_pages=max_pages)
+        try:
+            async for page in request:
+                yield page
+        finally:
+            request.cancel()
+
+    async def extract(self,
+                      source: Source,
+                      timeout: Optional[float] = None,
+                      max_pages: Optional[int] = None) -> List[PaperPage]:
+        return [page async for page in self.pages(source, timeout=timeout, max_pages=max_pages)]
+
+    async def extract_text(self,
+                           source: Source,
+                           timeout: Optional[float] = None,
+                           max_pages: Optional[int] = None) -> str:
+        return pages_text(await self.extract(source, timeout=timeout, max_pages=max_pages))
+
+    async def run_slot(self, slot: int) -> None:
+        queue = self.queue
+        assert queue is not None
+        while True:
+            request = await queue.get()
+            if request.cancelled:
+                continue
+            request.task = asyncio.ensure_future(self.run_request(slot, request))
+            try:
+                await asyncio.wait({request.task})
+            except asyncio.CancelledError:
+                # the service is closing
+                request.task.cancel()
+                await asyncio.wait({request.task})
+                raise
+
+    async def run_request(self, slot: int, request: ExtractionRequest) -> None:
+        try:
+            await self.stream(self.workers[slot], request)
+        except asyncio.TimeoutError:
+            self.restart_worker(slot)
+            request.finish(ExtractionTimeout(f'timed out after {request.timeout}s'))
+        except asyncio.CancelledError:
+            log.info('killing worker of cancelled request')
+            self.restart_worker(slot)
+            if not request.cancelled:
+                request.finish(ExtractionError('service closed'))
+        except (EOFError, OSError):
+            self.restart_worker(slot)
+            request.finish(ExtractionError('worker process died'))
+        return
+
+    async def stream(self, worker: Worker, request: ExtractionRequest) -> None:
+        """Pass the pages of request on as worker sends them. Only the time spent waiting for the worker counts
+        towards the timeout of request, not the time spent waiting for its caller to take pages."""
+        loop = asyncio.get_event_loop()
+        remaining = request.timeout
+
+        async def call(func: Callable[..., Any], *args: Any) -> Any:
+            nonlocal remaining
+            start = loop.time()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(self.threads, func, *args), remaining)
+            finally:
+                if remaining is not None:
+                    remaining -= loop.time() - start
+
+        await call(worker.conn.send, (request.source, request.single_pass, request.max_pages))
+        while True:
+            (kind, value) = await call(worker.conn.recv)
+            if kind == 'page':
+                await request.results.put(value)
+            elif kind == 'error':
+                request.finish(ExtractionError(value))
+                return
+            else:
+                request.finish()
+                return
+
+
+async def serve_stdio(service: ExtractionService, infp: TextIO = sys.stdin, outfp: TextIO = sys.stdout) -> None:
+    """Serve JSON requests, one per line of infp, and write JSON responses to outfp, one per line.
+
+    A request is {"id": ..., "path": ...} with optional "timeout" and "max_pages". Every page is answered as
+    {"id", "page", "blocks"}, with blocks as paperminer.records writes them, and the request ends with
+    {"id", "done": true, "pages", "elapsed"} or {"id", "error"}. Requests run concurrently, and reading stops
+    while the service queue is full.
+    """
+    loop = asyncio.get_event_loop()
+    handlers: Set[asyncio.Future] = set()
+
+    def respond(response: Dict[str, Any]) -> None:
+        outfp.write(json.dumps(response, ensure_ascii=False) + '\n')
+        outfp.flush()
+        return
+
+    async def handle(rid: Any, request: ExtractionRequest) -> None:
+        start = time.time()
+        npages = 0
+        try:
+            async for page in request:
+                npages += 1
+                respond({'id': rid, 'page': page.pageid,
+                         'blocks': [block_record(str(rid), block) for block in page]})
+        except (Exception, ExtractionTimeout) as e:
+            respond({'id': rid, 'error': f'{e.__class__.__name__}: {e}'})
+            return
+        respond({'id': rid, 'done': True, 'pages': npages, 'elapsed': time.time() - start})
+        return
+
+    while True:
+        line = await loop.run_in_executor(None, infp.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+        rid: Any = None
+        try:
+            message = json.loads(line)
+            rid = message.get('id')
+            request = await service.submit(message['path'], timeout=message.get('timeout'),
+                                           max_pages=message.get('max_pages'))
+        except Exception as e:
+            respond({'id': rid, 'error': f'{e.__class__.__name__}: {e}'})
+            continue
+        handler = asyncio.ensure_future(handle(rid, request))
+        handlers.add(handler)
+        handler.add_done_callback(handlers.discard)
+    if handlers:
+        await asyncio.wait(handlers)
+    return
@@ -0,0 +1,102 @@
+import contextlib
+import time
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+
+class PageStats:
+    """Time spent in each stage of laying out one page in one pass, and counts of what it produced.
+
+    Stages nest, and each one is charged only the time not spent in the stages started inside it, so the
+    timings of a page add up to the time it took.
+    """
+
+    def __init__(self, pass_name: str, pageid: int) -> None:
+        self.pass_name = pass_name
+        self.pageid = pageid
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        # (stage, start, time spent in stages started inside it)
+        self.running: List[Tuple[str, float, float]] = []
+        return
+
+    def start(self, stage: str) -> None:
+        self.running.append((stage, time.perf_counter(), 0.0))
+        return
+
+    def stop(self) -> None:
+        (stage, start, nested) = self.running.pop()
+        elapsed = time.perf_counter() - start
+        self.timings[stage] = self.timings.get(stage, 0.0) + elapsed - nested
+        if self.running:
+            (parent, parent_start, parent_nested) = self.running[-1]
+            self.running[-1] = (parent, parent_start, parent_nested + elapsed)
+        return
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        self.start(stage)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def count(self, counter: str, n: int = 1) -> None:
+        self.counts[counter] = self.counts.get(counter, 0) + n
+        return
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'pass': self.pass_name, 'page': self.pageid, 'timings': self.timings, 'counts': self.counts}
+
+    def __repr__(self) -> str:
+        return '<%s %s page=%d %.3fs>' % (self.__class__.__name__, self.pass_name, self.pageid,
+                                          sum(self.timings.values()))
+
+
+null_context = contextlib.nullcontext()
+
+
+def timed(stats: Optional[PageStats], stage: str) -> ContextManager:
+    return stats.time(stage) if stats is not None else null_context
+
+
+class ExtractionStats:
+    """Per-page stage timings and counters of a document, collected when a converter is given one.
+
+    hook is called with the PageStats of every page as soon as the page is done, e.g. to forward them to
+    a metrics system while a long document is still being converted.
+    """
+
+    def __init__(self, hook: Optional[Callable[[PageStats], None]] = None) -> None:
+        self.hook = hook
+        self.pages: List[PageStats] = []
+        return
+
+    def begin_page(self, pass_name: str, pageid: int) -> PageStats:
+        return PageStats(pass_name, pageid)
+
+    def end_page(self, page: PageStats) -> None:
+        self.pages.append(page)
+        if self.hook is not None:
+            self.hook(page)
+        return
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Seconds spent in each stage, by pass."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for page in self.pages:
+            stages = totals.setdefault(page.pass_name, {})
+            for stage, seconds in page.timings.items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+        return totals
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        totals: Dict[str, Dict[str, int]] = {}
+        for page in self.pages:
+            counters = totals.setdefault(page.pass_name, {'pages': 0})
+            counters['pages'] += 1
+            for counter, n in page.counts.items():
+                counters[counter] = counters.get(counter, 0) + n
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'timings': self.timings(), 'counts': self.counts()}
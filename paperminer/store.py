@@ -0,0 +1,105 @@
+"""Directories of files that are written atomically and evicted least recently used first."""
+import os
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+
+class EntryStore:
+    """Files kept in a directory and its subdirectories, evicted least recently used first once there are more than
+    max_entries of them, once together they take more than max_bytes, or once they have not been used for max_age
+    seconds.
+
+    Files are written to a temporary file and renamed into place, so concurrent writers (e.g. pool workers sharing
+    a directory) never expose a partial file; readers refresh a file's mtime when they use it. Writes keep a
+    running count and size of the files, so the directory is only scanned when a write takes those past a limit,
+    and otherwise once every rescan_interval writes, which catches up with other processes writing to it and with
+    files going stale. Between scans the store can grow past its limits by what other processes wrote.
+    """
+
+    def __init__(self, directory: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 max_age: Optional[float] = None, rescan_interval: int = 256) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.rescan_interval = rescan_interval
+        # running totals as of the last scan, unknown until there has been one
+        self.count: Optional[int] = None
+        self.size: Optional[int] = None
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+        return
+
+    def write(self, path: str, data: bytes, evict: bool = True) -> None:
+        """Replace the file at path with data; unless evict is False, evict files if that is due."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            try:
+                replaced: Optional[int] = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = None
+            os.replace(tmp_path, path)
+        except BaseException:
+            self.remove(tmp_path)
+            raise
+        if self.count is not None and self.size is not None:
+            self.count += replaced is None
+            self.size += len(data) - (replaced or 0)
+        self.writes += 1
+        if evict:
+            self.maybe_evict()
+        return
+
+    def maybe_evict(self) -> None:
+        if (self.count is None or self.size is None or self.writes >= self.rescan_interval or
+                (self.max_entries is not None and self.count > self.max_entries) or
+                (self.max_bytes is not None and self.size > self.max_bytes)):
+            self.evict()
+        return
+
+    @staticmethod
+    def remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every file, leaving out temporary files and others whose names start with a dot."""
+        entries = []
+        directories = [self.directory]
+        while directories:
+            for entry in os.scandir(directories.pop()):
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir():
+                        directories.append(entry.path)
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> None:
+        entries = sorted(self.entries())
+        count = len(entries)
+        size = sum(entry_size for _, entry_size, _ in entries)
+        stale = time.time() - self.max_age if self.max_age is not None else None
+        for mtime, entry_size, path in entries:
+            if ((self.max_entries is None or count <= self.max_entries) and
+                    (self.max_bytes is None or size <= self.max_bytes) and
+                    (stale is None or mtime >= stale)):
+                break
+            self.remove(path)
+            count -= 1
+            size -= entry_size
+        (self.count, self.size, self.writes) = (count, size, 0)
+        return
@@ -0,0 +1,216 @@
+"""Layout templates: the statistics the second pass classifies with, remembered per venue template.
+
+Papers set in the same conference template end up with the same body, section header and footer fonts. A
+document is fingerprinted by the size of its first page and the fonts most of that page is set in, and once
+the full first pass has found the same statistics for a fingerprint often enough, later documents with that
+fingerprint are classified with them after a first pass over their first page alone.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pdfminer.layout import LTTextBox
+from pdfminer.pdffont import PDFFont
+
+from paperminer import PaperResourceManager, __version__, match_line_kind
+from paperminer.layout import LTPageExtended, LTTextLineHorizontalExtended
+from paperminer.store import EntryStore
+
+log = logging.getLogger(__name__)
+
+# subset fonts are named with a tag of six capital letters that differs between documents
+subset_tag_pattern = re.compile('^[A-Z]{6}\\+')
+
+
+def font_name(font: PDFFont) -> str:
+    return subset_tag_pattern.sub('', str(font.fontname))
+
+
+class LayoutTemplate:
+    """Fonts by name and font sizes, as PaperResourceManager.post_process decides them."""
+
+    def __init__(self,
+                 section_header_font: str,
+                 section_header_font_size: float,
+                 body_font: str,
+                 body_font_size: float,
+                 tiny_font: str,
+                 tiny_font_size: float,
+                 confirmations: int = 1) -> None:
+        self.section_header_font = section_header_font
+        self.section_header_font_size = section_header_font_size
+        self.body_font = body_font
+        self.body_font_size = body_font_size
+        self.tiny_font = tiny_font
+        self.tiny_font_size = tiny_font_size
+        # how many full first passes found these statistics
+        self.confirmations = confirmations
+        return
+
+    @classmethod
+    def from_resources(cls, rsrcmgr: PaperResourceManager) -> 'LayoutTemplate':
+        return cls(font_name(rsrcmgr.section_header_font), rsrcmgr.section_header_font_size,
+                   font_name(rsrcmgr.body_font), rsrcmgr.body_font_size,
+                   font_name(rsrcmgr.tiny_font), rsrcmgr.tiny_font_size)
+
+    def statistics(self) -> Tuple[Any, ...]:
+        return (self.section_header_font, self.section_header_font_size, self.body_font, self.body_font_size,
+                self.tiny_font, self.tiny_font_size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def apply(self, rsrcmgr: PaperResourceManager) -> bool:
+        """Set the statistics of rsrcmgr, whose first pass has seen the first page, from this template.
+
+        Fonts are looked up among those counted so far, and False is returned, leaving rsrcmgr as it was,
+        unless the body and section header fonts are each found in exactly one font at their size and the body
+        font is one of the two most common on the page.
+        """
+        fonts: Dict[Tuple[str, float], List[PDFFont]] = {}
+        for (font, fontsize) in rsrcmgr.font_map:
+            fonts.setdefault((font_name(font), fontsize), []).append(font)
+        body = fonts.get((self.body_font, self.body_font_size), [])
+        header = fonts.get((self.section_header_font, self.section_header_font_size), [])
+        if len(body) != 1 or len(header) != 1:
+            return False
+        if (body[0], self.body_font_size) not in rsrcmgr.top_fonts:
+            return False
+        tiny = fonts.get((self.tiny_font, self.tiny_font_size), [])
+        rsrcmgr.section_header_font = header[0]
+        rsrcmgr.section_header_font_size = self.section_header_font_size
+        rsrcmgr.body_font = body[0]
+        rsrcmgr.body_font_size = self.body_font_size
+        # only the size of the tiny font is classified by, and its font need not be on the first page
+        rsrcmgr.tiny_font = tiny[0] if len(tiny) == 1 else None
+        rsrcmgr.tiny_font_size = self.tiny_font_size
+        return True
+
+
+class TemplateCheck:
+    """Whether the statistics a template set agree with those a full first pass would find, gathered from the
+    pages as the second pass lays them out.
+
+    A first pass breaks ties between equally common fonts in the order it sees them in, which the boxes of the
+    second pass need not keep, so a tie among the fonts that decide a statistic counts as a disagreement.
+    """
+
+    def __init__(self, rsrcmgr: PaperResourceManager) -> None:
+        self.rsrcmgr = rsrcmgr
+        self.font_map: Dict[Tuple[PDFFont, float], int] = {}
+        self.section_header_fonts: Dict[Tuple[PDFFont, float], int] = {}
+        # (font, fontsize) of the lines that may be the abstract header, from the first page that has any
+        self.abstract_fonts: Optional[Set[Tuple[PDFFont, float]]] = None
+        return
+
+    def add_page(self, ltpage: LTPageExtended, font_counts: Dict[Tuple[PDFFont, float], int]) -> None:
+        for key, count in font_counts.items():
+            self.font_map[key] = self.font_map.get(key, 0) + count
+        abstract_fonts = set()
+        for item in ltpage:
+            lines = item if isinstance(item, LTTextBox) else [item]
+            for line in lines:
+                if not isinstance(line, LTTextLineHorizontalExtended):
+                    continue
+                text = line.get_text()
+                kind = match_line_kind(text)
+                key = (line.font, line.fontsize)
+                if kind in ('introduction', 'background', 'reference'):
+                    self.section_header_fonts[key] = self.section_header_fonts.get(key, 0) + 1
+                elif kind == 'abstract' and self.abstract_fonts is None and 'extended' not in text.lower():
+                    abstract_fonts.add(key)
+        if abstract_fonts:
+            self.abstract_fonts = abstract_fonts
+            if len(abstract_fonts) == 1:
+                (key,) = abstract_fonts
+                self.section_header_fonts[key] = self.section_header_fonts.get(key, 0) + 1
+        return
+
+    def agrees(self) -> bool:
+        rsrcmgr = self.rsrcmgr
+        if self.abstract_fonts is not None and len(self.abstract_fonts) > 1:
+            return False
+        counts = sorted(self.font_map.values(), reverse=True) + [0, 0, 0]
+        if counts[1] == 0 or counts[0] == counts[1]:
+            return False
+        body = [key for key, count in self.font_map.items() if count == counts[0]]
+        tiny_sizes = {fontsize for (_, fontsize), count in self.font_map.items() if count == counts[1]}
+        if body != [(rsrcmgr.body_font, rsrcmgr.body_font_size)] or tiny_sizes != {rsrcmgr.tiny_font_size}:
+            return False
+        if not self.section_header_fonts:
+            return False
+        top = max(self.section_header_fonts.values())
+        headers = [key for key, count in self.section_header_fonts.items() if count == top]
+        return headers == [(rsrcmgr.section_header_font, rsrcmgr.section_header_font_size)]
+
+
+class TemplateStore(EntryStore):
+    """Layout templates kept in a directory, one JSON file per fingerprint.
+
+    A template is only used once confirmations full first passes have found it. Using a template refreshes its
+    mtime, and the least recently used ones are evicted beyond max_templates, as are those not used for max_age
+    seconds (see EntryStore). A first pass that finds other statistics for a fingerprint replaces its template.
+    """
+
+    def __init__(self, directory: str, max_templates: int = 4096, confirmations: int = 2,
+                 max_age: float = 90 * 24 * 3600) -> None:
+        super().__init__(directory, max_entries=max_templates, max_age=max_age)
+        self.max_templates = max_templates
+        self.confirmations = confirmations
+        return
+
+    @staticmethod
+    def fingerprint(bbox: Tuple[float, float, float, float], font_map: Dict[Tuple[PDFFont, float], int]) -> str:
+        """Fingerprint of a document from its first page: its size, and the fonts at the sizes that set at least
+        2% of its chars, by name."""
+        total = sum(font_map.values())
+        fonts = sorted({(font_name(font), round(fontsize, 2)) for (font, fontsize), count in font_map.items()
+                        if count * 50 >= total})
+        (x0, y0, x1, y1) = bbox
+        data = json.dumps([__version__, round(x1 - x0), round(y1 - y0), fonts])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def entry_path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f'{fingerprint}.json')
+
+    def get(self, fingerprint: str) -> Optional[LayoutTemplate]:
+        path = self.entry_path(fingerprint)
+        try:
+            with open(path, 'r', encoding='utf-8') as fp:
+                template = LayoutTemplate(**json.load(fp))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning('dropping unreadable template %s: %s', path, e)
+            self.remove(path)
+            return None
+        return template
+
+    def lookup(self, fingerprint: str) -> Optional[LayoutTemplate]:
+        """The template of fingerprint, if it has been confirmed often enough to be used."""
+        template = self.get(fingerprint)
+        if template is None or template.confirmations < self.confirmations:
+            return None
+        try:
+            os.utime(self.entry_path(fingerprint))
+        except FileNotFoundError:
+            pass
+        return template
+
+    def learn(self, fingerprint: str, rsrcmgr: PaperResourceManager) -> None:
+        """Record the statistics a full first pass found for a document with fingerprint."""
+        template = LayoutTemplate.from_resources(rsrcmgr)
+        known = self.get(fingerprint)
+        if known is not None and known.statistics() == template.statistics():
+            template.confirmations = known.confirmations + 1
+        elif known is not None:
+            log.info('template %s changed from %r to %r', fingerprint, known.statistics(), template.statistics())
+        self.put(fingerprint, template)
+        return
+
+    def put(self, fingerprint: str, template: LayoutTemplate) -> None:
+        self.write(self.entry_path(fingerprint), json.dumps(template.to_dict()).encode('utf-8'))
+        return
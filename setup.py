@@ -1,18 +1,29 @@
-from setuptools import setup, find_packages
-
-with open('requirements.txt') as f:
-    install_requires = f.read().strip().split('\n')
-
-setup(
-    name="paperminer",
-    version="0.1.1",
-    packages=find_packages(),
-    install_requires=install_requires,
-
-    # metadata to display on PyPI
-    author="Sarah Harvey",
-    author_email="s@shh.sh",
-    description="customized pdfminer that can parse research papers",
-    keywords="pdfminer pdf paper miner",
-    url="https://github.com/worldwise001/paperminer",
-)
+import re
+
+from setuptools import setup, find_packages
+
+with open('requirements.txt') as f:
+    install_requires = f.read().strip().split('\n')
+
+with open('paperminer/__init__.py') as f:
+    version = re.search("__version__ = '(.*)'", f.read()).group(1)
+
+setup(
+    name="paperminer",
+    version=version,
+    packages=find_packages(exclude=['benchmarks', 'test']),
+    install_requires=install_requires,
+    extras_require={
+        'numpy': ['numpy'],
+    },
+    entry_points={
+        'console_scripts': ['paperminer=paperminer.cli:main'],
+    },
+
+    # metadata to display on PyPI
+    author="Sarah Harvey",
+    author_email="s@shh.sh",
+    description="customized pdfminer that can parse research papers",
+    keywords="pdfminer pdf paper miner",
+    url="https://github.com/worldwise001/paperminer",
+)
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from typing import Any, Iterator, List, Optional
+from unittest import mock
+
+from benchmarks.synthetic import build_pdf
+from paperminer import batch
+from paperminer.batch import BatchResult, count_pages, extract_batch, find_papers, schedule
+from paperminer.cache import PaperCache
+from paperminer.templates import TemplateStore
+
+
+def _die_on_crash(path: str, single_pass: bool = False, cache: Optional[PaperCache] = None,
+                  max_pages: Optional[int] = None, pagenos: Optional[List[int]] = None,
+                  templates: Optional[TemplateStore] = None) -> str:
+    if path.endswith('crash.pdf'):
+        os._exit(1)
+    return path
+
+
+def _swallow_exceptions(path: str, single_pass: bool = False, cache: Optional[PaperCache] = None,
+                        max_pages: Optional[int] = None, pagenos: Optional[List[int]] = None,
+                        templates: Optional[TemplateStore] = None) -> str:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            time.sleep(0.01)
+        except Exception:
+            pass
+    return path
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths: List[str] = []
+        for name in ('a.pdf', 'crash.pdf', 'b.pdf'):
+            path = os.path.join(self.tmpdir.name, name)
+            with open(path, 'wb') as fp:
+                fp.write(b'not a pdf')
+            self.paths.append(path)
+        with open(os.path.join(self.tmpdir.name, 'notes.txt'), 'w') as fp:
+            fp.write('ignored')
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_find_papers(self) -> None:
+        self.assertEqual(find_papers([self.tmpdir.name]), sorted(self.paths))
+
+    def test_bad_documents_do_not_stop_batch(self) -> None:
+        results = list(extract_batch([self.tmpdir.name], workers=2))
+        self.assertEqual(sorted(result.path for result in results), sorted(self.paths))
+        for result in results:
+            self.assertFalse(result.ok)
+            self.assertIn('PDFSyntaxError', result.error)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'needs fork to patch workers')
+    def test_dead_worker_is_isolated(self) -> None:
+        with mock.patch.object(batch, 'extract_text', _die_on_crash):
+            results = {result.path: result for result in extract_batch(self.paths, workers=2)}
+        self.assertEqual(set(results), set(self.paths))
+        for path, result in results.items():
+            if path.endswith('crash.pdf'):
+                self.assertEqual(result.error, 'worker process died')
+            else:
+                self.assertTrue(result.ok)
+                self.assertEqual(result.text, path)
+        return
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'needs fork to patch workers')
+    def test_only_documents_killing_a_worker_twice_are_isolated(self) -> None:
+        paths = [os.path.join(self.tmpdir.name, f'{n}.pdf') for n in range(6)] + self.paths
+        pools: List[int] = []
+
+        def run_pool(*args: Any) -> Iterator[BatchResult]:
+            pools.append(args[1])
+            return run_pool_(*args)
+
+        run_pool_ = batch._run_pool
+        with mock.patch.object(batch, 'extract_text', _die_on_crash), mock.patch.object(batch, '_run_pool', run_pool):
+            results = {result.path: result for result in extract_batch(paths, workers=3, longest_first=False)}
+        self.assertEqual(set(results), set(paths))
+        self.assertEqual([path for path, result in results.items() if not result.ok], [self.paths[1]])
+        # crash.pdf kills the first pool and then the pool it is retried in, and only then runs alone
+        self.assertEqual(pools[:3], [3, 3, 1])
+        self.assertEqual(pools.count(1), 1)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'needs fork to patch workers')
+    def test_timeout_is_not_swallowed(self) -> None:
+        with mock.patch.object(batch, 'extract_text', _swallow_exceptions):
+            start = time.time()
+            results = list(extract_batch(self.paths[:1], workers=1, timeout=0.2))
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(results[0].error, 'timed out after 0.2s')
+
+
+class ScheduleTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = {}
+        for name, pages in (('short', 1), ('long', 9), ('medium', 4)):
+            self.paths[name] = os.path.join(self.tmpdir.name, name + '.pdf')
+            with open(self.paths[name], 'wb') as fp:
+                fp.write(build_pdf(pages=pages, refs=0))
+        self.paths['broken'] = os.path.join(self.tmpdir.name, 'broken.pdf')
+        with open(self.paths['broken'], 'wb') as fp:
+            fp.write(b'not a pdf')
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_count_pages(self) -> None:
+        self.assertEqual(count_pages(self.paths['long']), 9)
+        self.assertIsNone(count_pages(self.paths['broken']))
+
+    def test_longest_first(self) -> None:
+        paths = [self.paths[name] for name in ('short', 'broken', 'long', 'medium')]
+        self.assertEqual(schedule(paths), [self.paths[name] for name in ('long', 'medium', 'short', 'broken')])
+        # capped documents are as long as each other, and then the larger file goes first
+        self.assertEqual(schedule(paths, max_pages=1)[:3], [self.paths[name] for name in ('long', 'medium', 'short')])
+
+    def test_max_pages(self) -> None:
+        results = list(extract_batch([self.paths['long']], workers=1, max_pages=2, keep_pages=True))
+        self.assertEqual([page.pageid for page in results[0].pages or []], [1, 2])
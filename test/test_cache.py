@@ -0,0 +1,136 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple
+from unittest import mock
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer.cache import PaperCache
+from paperminer.converter import PaperToTextConverter
+from paperminer.output import PaperPage
+from paperminer.store import EntryStore
+
+
+def blocks(pages: List[PaperPage]) -> List[Tuple[Any, ...]]:
+    return [(block.pageid, block.kind, block.bbox, block.text, block.font, block.fontsize)
+            for page in pages for block in page]
+
+
+def _extract_blocks(directory: str, path: str) -> List[Tuple[Any, ...]]:
+    return blocks(PaperCache(directory).extract_pages(path))
+
+
+class PaperCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = PaperCache(os.path.join(self.tmpdir.name, 'cache'), max_bytes=1 << 20)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_content(self) -> None:
+        paths = []
+        for name, data in (('a.pdf', b'one'), ('b.pdf', b'one'), ('c.pdf', b'two')):
+            paths.append(os.path.join(self.tmpdir.name, name))
+            with open(paths[-1], 'wb') as fp:
+                fp.write(data)
+        self.assertEqual(PaperCache.key(paths[0]), PaperCache.key(paths[1]))
+        self.assertNotEqual(PaperCache.key(paths[0]), PaperCache.key(paths[2]))
+
+    def test_get_put(self) -> None:
+        self.assertIsNone(self.cache.get('abcd', 'stats'))
+        self.cache.put('abcd', 'stats', {'font_map': {(1, 10.0): 3}})
+        self.assertEqual(self.cache.get('abcd', 'stats'), {'font_map': {(1, 10.0): 3}})
+        self.assertIsNone(self.cache.get('abcd', 'pages'))
+
+    def test_unreadable_entry_is_dropped(self) -> None:
+        self.cache.put('abcd', 'stats', 1)
+        with open(self.cache.entry_path('abcd', 'stats'), 'wb') as fp:
+            fp.write(b'garbage')
+        self.assertIsNone(self.cache.get('abcd', 'stats'))
+        self.assertFalse(os.path.exists(self.cache.entry_path('abcd', 'stats')))
+
+    def test_evicts_least_recently_used(self) -> None:
+        self.cache.max_bytes = 3500
+        for key in ('aa01', 'aa02', 'aa03'):
+            self.cache.put(key, 'pages', b'x' * 1000)
+            age = 300 - 100 * int(key[-1])
+            os.utime(self.cache.entry_path(key, 'pages'), (time.time() - age, time.time() - age))
+        self.assertIsNotNone(self.cache.get('aa01', 'pages'))
+        self.cache.put('aa04', 'pages', b'x' * 1000)
+        self.assertIsNotNone(self.cache.get('aa01', 'pages'))
+        self.assertIsNone(self.cache.get('aa02', 'pages'))
+        self.assertIsNotNone(self.cache.get('aa03', 'pages'))
+        self.assertIsNotNone(self.cache.get('aa04', 'pages'))
+
+    def test_scans_only_past_the_limit(self) -> None:
+        self.cache.max_bytes = 10500
+        with mock.patch.object(EntryStore, 'entries', autospec=True, side_effect=EntryStore.entries) as entries:
+            for i in range(10):
+                self.cache.put(f'aa{i:02d}', 'pages', b'x' * 1000)
+            self.assertEqual(entries.call_count, 1)
+            self.cache.put('aa10', 'pages', b'x' * 1000)
+            self.assertEqual(entries.call_count, 2)
+        self.assertEqual((self.cache.count, len(self.cache.entries())), (10, 10))
+        self.assertIsNone(self.cache.get('aa00', 'pages'))
+
+    def test_rescans_every_interval(self) -> None:
+        self.cache.rescan_interval = 4
+        other = PaperCache(self.cache.directory)
+        other.put('bb00', 'pages', b'x' * 1000)
+        with mock.patch.object(EntryStore, 'entries', autospec=True, side_effect=EntryStore.entries) as entries:
+            for i in range(8):
+                self.cache.put(f'aa{i:02d}', 'pages', b'x')
+            self.assertEqual(entries.call_count, 2)
+        # the scans count what the other cache wrote
+        self.assertEqual(self.cache.count, 9)
+
+
+class PaperCacheExtractTest(unittest.TestCase):
+    data = build_pdf(**SPECS['two-column'])
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = PaperCache(os.path.join(self.tmpdir.name, 'cache'))
+        self.path = os.path.join(self.tmpdir.name, 'paper.pdf')
+        with open(self.path, 'wb') as fp:
+            fp.write(self.data)
+        self.expected = blocks(list(PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(self.data))),
+                                                         text_only=True).iter_pages()))
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_result_hit(self) -> None:
+        self.assertEqual(blocks(self.cache.extract_pages(self.path)), self.expected)
+        with mock.patch('paperminer.cache.open_document', side_effect=AssertionError('document opened')):
+            self.assertEqual(blocks(self.cache.extract_pages(self.path)), self.expected)
+
+    def test_statistics_hit(self) -> None:
+        self.assertEqual(blocks(self.cache.extract_pages(self.path, classified=False)), self.expected)
+        key = PaperCache.key(self.path)
+        self.assertIsNone(self.cache.get(key, 'pages'))
+        self.assertIsNotNone(self.cache.get(key, 'stats'))
+        with mock.patch.object(PaperCache, 'convert', side_effect=AssertionError('first pass run')):
+            self.assertEqual(blocks(self.cache.extract_pages(self.path, classified=False)), self.expected)
+
+    def test_concurrent_writers(self) -> None:
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(_extract_blocks, [self.cache.directory] * 4, [self.path] * 4))
+        self.assertEqual(results, [self.expected] * 4)
+        self.assertEqual(sorted(os.path.basename(path) for _, _, path in self.cache.entries()),
+                         [f'{PaperCache.key(self.path)}-{kind}.pickle' for kind in ('pages', 'stats')])
+        self.assertEqual([name for _, _, names in os.walk(self.cache.directory) for name in names
+                          if name.startswith('.')], [])
+        with mock.patch('paperminer.cache.open_document', side_effect=AssertionError('document opened')):
+            self.assertEqual(blocks(self.cache.extract_pages(self.path)), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from typing import Tuple, Type
+
+from paperminer.citation import CitationParser, parse_citation, split_authors
+from paperminer.layout import LTCitation, LTCitationBox, LTSectionHeader, LTSectionBody, LTFooter
+from paperminer.output import PaperBlock
+
+
+def block(klass: Type, text: str, pageid: int = 1, bbox: Tuple[float, float, float, float] = (72, 100, 300, 700)) \
+        -> PaperBlock:
+    paper_block = PaperBlock.__new__(PaperBlock)
+    (paper_block.pageid, paper_block.klass, paper_block.bbox, paper_block.text) = (pageid, klass, bbox, text)
+    return paper_block
+
+
+class ParseCitationTest(unittest.TestCase):
+    def parse(self, text: str) -> LTCitation:
+        citation = LTCitation(text)
+        parse_citation(citation)
+        return citation
+
+    def test_numbered(self) -> None:
+        citation = self.parse('[3] J. Doe, K. Roe, and A. B. Smith. Deep learning: a survey. '
+                              'In Proc. NeurIPS, 2019. https://doi.org/10.1/abc.')
+        self.assertEqual(citation.ref, 3)
+        self.assertEqual(citation.author, ['J. Doe', 'K. Roe', 'A. B. Smith'])
+        self.assertEqual(citation.title, 'Deep learning: a survey')
+        self.assertEqual(citation.venue, 'Proc. NeurIPS')
+        self.assertEqual(citation.date, '2019')
+        self.assertEqual(citation.link, 'https://doi.org/10.1/abc')
+
+    def test_quoted_title(self) -> None:
+        citation = self.parse('[12] A. Doe and B. Roe, “Fast layout analysis,” in Proc. ICDAR, 2017, pp. 1–5.')
+        self.assertEqual(citation.author, ['A. Doe', 'B. Roe'])
+        self.assertEqual(citation.title, 'Fast layout analysis')
+        self.assertEqual(citation.venue, 'Proc. ICDAR, pp. 1–5')
+
+    def test_author_year(self) -> None:
+        citation = self.parse('Smith, A. B., & Jones, C. (2010). Title of the work. Journal of Things, 4(2), 1-10.')
+        self.assertEqual(citation.ref, 0)
+        self.assertEqual(citation.title, 'Title of the work')
+        self.assertEqual(citation.date, '2010')
+
+    def test_split_authors(self) -> None:
+        self.assertEqual(split_authors('Doe, J., Roe, K.:'), ['Doe, J.', 'Roe, K.'])
+        self.assertEqual(split_authors('Doe J, Roe K, et al.'), ['Doe J', 'Roe K'])
+
+
+class CitationParserTest(unittest.TestCase):
+    def feed(self, *blocks: PaperBlock) -> list:
+        parser = CitationParser()
+        citations = []
+        for paper_block in blocks:
+            citations.extend(parser.feed(paper_block))
+        return citations + list(parser.close())
+
+    def test_splits_and_continues_across_pages(self) -> None:
+        citations = self.feed(block(LTSectionBody, 'Conclusion text.\n'),
+                              block(LTSectionHeader, 'References\n'),
+                              block(LTCitationBox, 'Supported by a grant.\n[1] Doe J. First title. In Proc. A, 2001.\n'
+                                                   '[2] Roe K. Second\n'),
+                              block(LTFooter, '3\n', bbox=(300, 40, 310, 50)),
+                              block(LTCitationBox, 'title. In Proc. B, 2002.\n', pageid=2))
+        self.assertEqual([(c.ref, c.title, c.pageid) for c in citations],
+                         [(1, 'First title', 1), (2, 'Second title', 1)])
+
+    def test_stream_emits_before_end(self) -> None:
+        parser = CitationParser()
+        self.assertEqual(list(parser.feed(block(LTSectionHeader, 'References\n'))), [])
+        citations = list(parser.feed(block(LTCitationBox, '[1] Doe J. One. X, 2001.\n[2] Roe K. Two. Y, 2002.\n')))
+        self.assertEqual([c.ref for c in citations], [1])
+
+    def test_ignores_text_outside_references(self) -> None:
+        self.assertEqual(self.feed(block(LTSectionBody, '[1] Not a citation.\n')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
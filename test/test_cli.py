@@ -0,0 +1,47 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from benchmarks.synthetic import build_pdf
+from paperminer.cli import main, output_names
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_output_names(self) -> None:
+        self.assertEqual(output_names(['x/a.pdf', 'y/b.pdf', 'x/a.pdf']), {'x/a.pdf': 'a.txt', 'y/b.pdf': 'b.txt'})
+        self.assertEqual(output_names(['p/x/a.pdf', 'p/y/z/a.pdf', 'c.pdf']),
+                         {'p/x/a.pdf': os.path.join('x', 'a.txt'), 'p/y/z/a.pdf': os.path.join('y', 'z', 'a.txt'),
+                          'c.pdf': 'c.txt'})
+        with self.assertRaises(ValueError):
+            output_names(['x/a.pdf', 'x/a.PDF'])
+
+    def test_papers_sharing_a_name(self) -> None:
+        for (name, seed) in (('a', 1), ('b', 2)):
+            os.makedirs(os.path.join(self.tmpdir.name, name))
+            with open(os.path.join(self.tmpdir.name, name, 'paper.pdf'), 'wb') as fp:
+                fp.write(build_pdf(pages=2, refs=5, seed=seed))
+        out = os.path.join(self.tmpdir.name, 'out')
+        self.assertEqual(main(['extract', os.path.join(self.tmpdir.name, 'a'), os.path.join(self.tmpdir.name, 'b'),
+                               '-o', out, '-j', '1']), 0)
+        texts = []
+        for name in ('a', 'b'):
+            with open(os.path.join(out, name, 'paper.txt'), encoding='utf-8') as fp:
+                texts.append(fp.read())
+        self.assertNotEqual(texts[0], texts[1])
+
+    def test_incremental_needs_cache_dir(self) -> None:
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            main(['extract', 'paper.pdf', '--incremental'])
+        self.assertIn('--incremental requires --cache-dir', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from typing import Any, List, Tuple
+
+from pdfminer.pdfpage import PDFPage
+
+from benchmarks.synthetic import build_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.document import open_document, parse_pages, sample_pages, select_pages
+from paperminer.output import PaperPage
+
+
+def blocks(pages: List[PaperPage]) -> List[Tuple[int, List[Tuple[str, str, Any]]]]:
+    return [(page.pageid, [(block.kind, block.text, block.bbox) for block in page]) for page in pages]
+
+
+class DocumentTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, 'paper.pdf')
+        with open(cls.path, 'wb') as fp:
+            fp.write(build_pdf(pages=6, refs=30, fanout=2))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmpdir.cleanup()
+
+    def test_parse_pages(self) -> None:
+        self.assertEqual(parse_pages('7, 1,3-5,4'), [0, 2, 3, 4, 6])
+        for spec in ('0', '5-3', 'x'):
+            with self.assertRaises(ValueError):
+                parse_pages(spec)
+
+    def test_sample_pages(self) -> None:
+        self.assertEqual(sample_pages([5, 6]), [0, 5, 6])
+        self.assertEqual(sample_pages([5, 6], npages=40, samples=4), [0, 5, 6, 10, 20, 30])
+
+    def test_select_pages(self) -> None:
+        with open_document(self.path) as document:
+            objids = [page.pageid for page in PDFPage.create_pages(document)]
+            self.assertEqual(len(objids), 6)
+            for pagenos in ([0], [3, 1], [3, 4, 5], list(range(6)), [5, 100]):
+                selected = [(pageno, page.pageid) for pageno, page in select_pages(document, pagenos)]
+                self.assertEqual(selected, [(pageno, objids[pageno]) for pageno in sorted(pagenos) if pageno < 6])
+
+    def test_pages_as_in_whole_document(self) -> None:
+        for single_pass in (False, True):
+            with open_document(self.path) as document:
+                whole = blocks(list(PaperToTextConverter(document, single_pass=single_pass).iter_pages()))
+                for pagenos in ([2, 3], [1, 5]):
+                    converter = PaperToTextConverter(document, single_pass=single_pass, pagenos=pagenos,
+                                                     stats_pages=range(6))
+                    self.assertEqual(blocks(list(converter.iter_pages())), [whole[pageno] for pageno in pagenos])
+                sampled = PaperToTextConverter(document, single_pass=single_pass, pagenos=[4])
+                self.assertEqual([page.pageid for page in sampled.iter_pages()], [5])
+
+    def test_pages_outside_stats_pages(self) -> None:
+        with open_document(self.path) as document:
+            pages = [blocks(list(PaperToTextConverter(document, single_pass=single_pass, pagenos=[3, 4],
+                                                      stats_pages=[0, 3]).iter_pages()))
+                     for single_pass in (False, True)]
+            self.assertEqual([pageid for (pageid, _) in pages[0]], [4, 5])
+            self.assertEqual(pages[1], pages[0])
+
+    def test_stats_pages_without_section_headers(self) -> None:
+        with open_document(self.path) as document:
+            with self.assertRaisesRegex(ValueError, 'no section header'):
+                PaperToTextConverter(document, pagenos=[3, 4], stats_pages=[3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import io
+import unittest
+from typing import List, Tuple
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.psparser import LIT
+
+from benchmarks.suite import page_digest
+from benchmarks.synthetic import build_pdf
+from paperminer import PaperResourceManager
+from paperminer.converter import PaperToTextConverter
+from paperminer.fonts import FontCache
+
+
+class FontCacheTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        PaperResourceManager.font_cache = None
+
+    def convert(self, seed: int) -> Tuple[List[dict], PaperResourceManager]:
+        document = PDFDocument(PDFParser(io.BytesIO(build_pdf(pages=1, refs=5, seed=seed, tounicode=True))))
+        converter = PaperToTextConverter(document)
+        return [page_digest(page) for page in converter.iter_pages()], converter.rsrcmgr
+
+    def test_fonts_are_shared_between_documents(self) -> None:
+        expected = [self.convert(seed)[0] for seed in range(3)]
+        cache = PaperResourceManager.font_cache = FontCache()
+        results = [self.convert(seed) for seed in range(3)]
+        self.assertEqual([pages for (pages, _) in results], expected)
+        self.assertEqual(cache.stats(), (3, 6, 3))
+        # every document still counts its own fonts
+        (first, second) = (results[0][1], results[1][1])
+        self.assertFalse(set(first.font_map) & set(second.font_map))
+        self.assertEqual(sum(first.font_map.values()), sum(self.convert(0)[1].font_map.values()))
+
+    def test_cached_fonts_do_not_refer_to_documents(self) -> None:
+        cache = PaperResourceManager.font_cache = FontCache()
+        self.convert(0)
+        for font in cache.fonts.values():
+            self.assertFalse(hasattr(font, 'fontfile'))
+            self.assertIsNotNone(font.unicode_map)
+
+    def test_bounded(self) -> None:
+        cache = PaperResourceManager.font_cache = FontCache(max_fonts=2)
+        self.convert(0)
+        self.assertEqual(cache.stats(), (2, 0, 3))
+
+    def test_type3_fonts_are_not_cached(self) -> None:
+        cache = FontCache()
+        spec = {'Type': LIT('Font'), 'Subtype': LIT('Type3'), 'FontMatrix': [0.001, 0, 0, 0.001, 0, 0]}
+        self.assertIsNone(cache.get_font(PaperResourceManager(), spec))
+        self.assertEqual(cache.stats(), (0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
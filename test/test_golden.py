@@ -0,0 +1,62 @@
+import io
+import unittest
+from typing import List
+from unittest import mock
+
+from pdfminer.layout import LTFigure
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.suite import check_golden
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer import layout
+from paperminer.converter import PaperToTextConverter
+from paperminer.layout import LTPageExtended
+from paperminer.output import PaperPage
+
+
+# the larger documents in SPECS are left to python -m benchmarks.suite
+class GoldenOutputTest(unittest.TestCase):
+    names = ('single-column', 'two-column')
+
+    def convert(self, name: str, **kwargs: bool) -> List[PaperPage]:
+        document = PDFDocument(PDFParser(io.BytesIO(build_pdf(**SPECS[name]))))
+        return list(PaperToTextConverter(document, **kwargs).iter_pages())
+
+    def test_two_passes(self) -> None:
+        for name in self.names:
+            self.assertEqual(check_golden(name, self.convert(name)), [])
+
+    def test_single_pass(self) -> None:
+        for name in self.names:
+            self.assertEqual(check_golden(name, self.convert(name, single_pass=True)), [])
+
+    def test_text_only(self) -> None:
+        for name in self.names:
+            self.assertEqual(check_golden(name, self.convert(name, text_only=True)), [])
+
+    def test_text_only_skips_figures(self) -> None:
+        blocks = []
+        figures: List[int] = []
+
+        class FigureConverter(PaperToTextConverter):
+            def receive_layout(self, ltpage: LTPageExtended) -> None:
+                figures.extend(len(item) for item in ltpage if isinstance(item, LTFigure))
+                super().receive_layout(ltpage)
+
+        for text_only in (False, True):
+            document = PDFDocument(PDFParser(io.BytesIO(build_pdf(pages=2, refs=5, paths=50, forms=True))))
+            converter = FigureConverter(document, text_only=text_only)
+            blocks.append([(block.kind, block.bbox, block.text) for block in converter.iter_blocks()])
+        self.assertEqual(blocks[0], blocks[1])
+        # each page's figure holds its 50 curves (pdfminer drops the diagonal lines), and nothing in text-only mode
+        self.assertEqual(figures, [50, 50, 0, 0])
+
+    def test_without_numpy(self) -> None:
+        with mock.patch.object(layout, 'np', None):
+            for name in self.names:
+                self.assertEqual(check_golden(name, self.convert(name)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import unittest
+from typing import Any, List, Tuple
+from unittest import mock
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import build_pdf, write_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.incremental import IncrementalCache
+from paperminer.output import PaperPage
+
+
+def blocks(pages: List[PaperPage]) -> List[Tuple[Any, ...]]:
+    return [(block.pageid, block.kind, block.bbox, block.text, block.font, block.fontsize)
+            for page in pages for block in page]
+
+
+def page_contents(data: bytes) -> List[str]:
+    document = PDFDocument(PDFParser(io.BytesIO(data)))
+    # pdfminer keeps the end of line before endstream
+    return [b''.join(stream.get_data() for stream in page.contents).decode('latin-1')[:-1]
+            for page in PDFPage.create_pages(document)]
+
+
+class IncrementalCacheTest(unittest.TestCase):
+    original = build_pdf(pages=5, seed=4)
+    npages = len(page_contents(original))
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = IncrementalCache(os.path.join(self.tmpdir.name, 'cache'))
+        self.assertEqual(blocks(self.extract(self.original)), blocks(self.convert(self.original)))
+        self.assertEqual((self.cache.reused_summaries, self.cache.reused_pages), (0, 0))
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def extract(self, data: bytes) -> List[PaperPage]:
+        path = os.path.join(self.tmpdir.name, 'paper.pdf')
+        with open(path, 'wb') as fp:
+            fp.write(data)
+        return self.cache.extract_pages(path)
+
+    @staticmethod
+    def convert(data: bytes) -> List[PaperPage]:
+        return list(PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data))), text_only=True).iter_pages())
+
+    def test_revised_page(self) -> None:
+        # the page number in the footer of the third page
+        revised = self.original.replace(b'(3) Tj', b'(x) Tj')
+        self.assertNotEqual(revised, self.original)
+        self.assertEqual(blocks(self.extract(revised)), blocks(self.convert(revised)))
+        self.assertEqual((self.cache.reused_summaries, self.cache.reused_pages), (self.npages - 1, self.npages - 1))
+
+    def test_revised_title(self) -> None:
+        # every page is measured against the top line, so all of them are classified again
+        revised = self.original.replace(b'Paper Layouts', b'Paper Designs')
+        self.assertEqual(blocks(self.extract(revised)), blocks(self.convert(revised)))
+        self.assertEqual((self.cache.reused_summaries, self.cache.reused_pages), (self.npages - 1, 0))
+
+    def test_inserted_page(self) -> None:
+        contents = page_contents(self.original)
+        revised = write_pdf(contents[:2] + ['BT /F3 10 72 700 Td (An inserted paragraph) Tj ET'] + contents[2:])
+        self.assertEqual(blocks(self.extract(revised)), blocks(self.convert(revised)))
+        self.assertEqual(self.cache.reused_summaries, self.npages)
+        self.assertGreater(self.cache.reused_pages, 0)
+
+    def test_page_entries_are_evicted_once_per_document(self) -> None:
+        self.cache = IncrementalCache(os.path.join(self.tmpdir.name, 'small'), max_bytes=1)
+        scans = []
+        evict = self.cache.evict
+        with mock.patch.object(self.cache, 'evict', lambda: scans.append(len(self.cache.entries())) or evict()):
+            self.extract(self.original)
+        # every write goes past max_bytes: once after the page entries, and after the statistics and the result
+        self.assertEqual(scans, [self.npages, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from typing import Dict, List, Set, Tuple
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf, write_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.index import IndexReader, IndexWriter, list_segments, segment_level, subsection_header_pattern, words
+from paperminer.output import PaperPage
+
+Block = Tuple[str, int, int, int, str, str]
+
+
+class IndexTest(unittest.TestCase):
+    documents: Dict[str, List[PaperPage]] = {}
+    # (document, page, section, block, kind, text) of every block
+    blocks: List[Block] = []
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        for name in ('single-column', 'two-column', 'long-references'):
+            document = PDFDocument(PDFParser(io.BytesIO(build_pdf(**SPECS[name]))))
+            cls.documents[name] = list(PaperToTextConverter(document, text_only=True).iter_pages())
+            (section, nblock) = (0, 0)
+            for page in cls.documents[name]:
+                for block in page:
+                    section += block.kind == 'LTSectionHeader' and not (
+                        section and subsection_header_pattern.match(block.text))
+                    cls.blocks.append((name, page.pageid, section, nblock, block.kind, block.text))
+                    nblock += 1
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def build(self, name: str, **kwargs: int) -> str:
+        directory = os.path.join(self.tmpdir.name, name)
+        with IndexWriter(directory, **kwargs) as writer:
+            for doc, pages in self.documents.items():
+                for page in pages:
+                    writer.write_page(doc, page)
+        return directory
+
+    def expected_search(self, query: str, kinds: Set[str]) -> List[Tuple[str, int, int, int]]:
+        return sorted((doc, page, section, nblock) for (doc, page, section, nblock, kind, text) in self.blocks
+                      if kind in kinds and words(query) <= words(text))
+
+    def test_search(self) -> None:
+        with IndexReader(self.build('index')) as reader:
+            hits = reader.search('icml', kinds=['LTCitationBox'])
+            self.assertGreater(len(hits), 0)
+            self.assertEqual(hits, self.expected_search('icml', {'LTCitationBox'}))
+            kinds = {block[4] for block in self.blocks}
+            self.assertEqual(reader.search('Synthetic Paper'), self.expected_search('synthetic paper', kinds))
+            self.assertEqual(reader.search('synthetic nonexistentword'), [])
+            self.assertEqual(reader.search(''), [])
+
+    def test_section_search(self) -> None:
+        with IndexReader(self.build('index')) as reader:
+            (doc, section) = next((block[0], block[2]) for block in self.blocks
+                                  if block[4] == 'LTSectionHeader' and 'background' in words(block[5]))
+            text = next(block[5] for block in self.blocks
+                        if block[4] == 'LTSectionBody' and (block[0], block[2]) == (doc, section))
+            word = sorted(words(text))[0]
+            sections = reader.section_search('background', word)
+            self.assertIn((doc, section), sections)
+            headers = {(block[0], block[2]) for block in self.blocks
+                       if block[4] == 'LTSectionHeader' and 'background' in words(block[5])}
+            bodies = {(block[0], block[2]) for block in self.blocks
+                      if block[4] == 'LTSectionBody' and word in words(block[5])}
+            self.assertEqual(sections, sorted(headers & bodies))
+
+    def test_merged_segments_answer_the_same(self) -> None:
+        merged = self.build('merged', segment_size=500, merge_factor=2)
+        segments = list_segments(merged)
+        self.assertGreater(max(map(segment_level, segments)), 0)
+        self.assertTrue(all(sum(segment_level(path) == level for path in segments) < 2
+                            for level in map(segment_level, segments)))
+        with IndexReader(self.build('single')) as single, IndexReader(merged) as reader:
+            self.assertEqual(len(single.segments), 1)
+            for query in ('icml', 'section', 'doe 2001', 'foundation examples'):
+                self.assertEqual(reader.search(query), single.search(query))
+                self.assertEqual(reader.search(query), self.expected_search(query, {block[4] for block in self.blocks}))
+
+    def test_indexing_twice_finds_documents_once(self) -> None:
+        directory = self.build('index')
+        with IndexReader(directory) as reader:
+            expected = reader.search('icml')
+        self.build('index')
+        with IndexReader(directory) as reader:
+            self.assertEqual(len(reader.segments), 2)
+            self.assertEqual(reader.search('icml'), expected)
+
+    def test_subsections_stay_in_their_section(self) -> None:
+        def section(y: int, header: str, word: str) -> str:
+            return f'BT /F2 12 Tf 72 {y} Td ({header}) Tj ET ' + ' '.join(
+                'BT /F3 10 Tf 72 %d Td (Body text line %d about %s in this paper) Tj ET' % (y - 20 - 12 * i, i, word)
+                for i in range(6))
+        data = write_pdf([' '.join([section(720, '1 Introduction', 'motivation'),
+                                    section(610, '2 Background', 'history'),
+                                    section(500, '2.1 Setup', 'calibration'),
+                                    section(390, '3 Results', 'accuracy')])])
+        directory = os.path.join(self.tmpdir.name, 'subsections')
+        with IndexWriter(directory) as writer:
+            for page in PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data))), text_only=True).iter_pages():
+                writer.write_page('paper', page)
+        with IndexReader(directory) as reader:
+            self.assertEqual(reader.section_search('background', 'calibration'), [('paper', 1)])
+            self.assertEqual(reader.section_search('background', 'accuracy'), [])
+            self.assertEqual(reader.section_search('results', 'accuracy'), [('paper', 2)])
+
+    def test_concurrent_writers(self) -> None:
+        directory = os.path.join(self.tmpdir.name, 'shared')
+        errors: List[BaseException] = []
+
+        def build() -> None:
+            try:
+                with IndexWriter(directory, segment_size=200, merge_factor=2) as writer:
+                    for doc, pages in self.documents.items():
+                        for page in pages:
+                            writer.write_page(doc, page)
+            except BaseException as e:
+                errors.append(e)
+            return
+
+        threads = [threading.Thread(target=build) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        kinds = {block[4] for block in self.blocks}
+        with IndexReader(directory) as reader:
+            for query in ('icml', 'section', 'doe 2001', 'foundation examples'):
+                self.assertEqual(reader.search(query), self.expected_search(query, kinds))
+
+
+if __name__ == '__main__':
+    unittest.main()
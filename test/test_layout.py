@@ -0,0 +1,96 @@
+import io
+import random
+import unittest
+from typing import Iterator, List
+
+from pdfminer.layout import LAParams, LTComponent, LTContainer
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer import PaperResourceManager, layout
+from paperminer.converter import ExtendedPaperAnalyzer
+from paperminer.layout import LTCharExtended, LTLayoutContainerExtended, LTPageExtended
+
+
+class Glyph(LTComponent):
+    def is_compatible(self, obj: LTComponent) -> bool:
+        return True
+
+
+class AlignObjectsTest(unittest.TestCase):
+    @staticmethod
+    def components(count: int) -> list:
+        rng = random.Random(count)
+        objs = []
+        x, y = 72.0, 700.0
+        for _ in range(count):
+            width, height = rng.choice((4.0, 5.5, 6.25)), rng.choice((9.0, 10.0, 12.0))
+            objs.append(Glyph((x, y, x + width, y + height)))
+            x += width + rng.choice((0.0, 0.5, 3.0, 40.0))
+            if rng.random() < 0.1:
+                x, y = rng.uniform(50, 500), y - rng.choice((0.0, 2.0, 6.0, 14.0))
+        return objs
+
+    @unittest.skipIf(layout.np is None, 'numpy is not installed')
+    def test_vectorized_matches_python(self) -> None:
+        objs = self.components(2000)
+        for laparams in (LAParams(), LAParams(detect_vertical=True), LAParams(char_margin=0.5, line_overlap=0.9)):
+            self.assertEqual(list(LTLayoutContainerExtended.align_chars_vectorized(laparams, objs)),
+                             list(LTLayoutContainerExtended.align_objects_python(laparams, objs)))
+
+    def test_align_objects_falls_back_for_non_chars(self) -> None:
+        objs = self.components(3)
+        self.assertEqual(len(list(LTLayoutContainerExtended((0, 0, 612, 792)).align_objects(LAParams(), objs))), 2)
+
+
+class FontCountsTest(unittest.TestCase):
+    def test_top_fonts_match_full_scan(self) -> None:
+        rng = random.Random(0)
+        rsrcmgr = PaperResourceManager()
+        fonts = [(name, size) for name in 'abcdef' for size in (9.0, 10.0)]
+        for _ in range(200):
+            rsrcmgr.add_font_counts({font: rng.randint(1, 3) for font in rng.sample(fonts, 3)})
+            # the most common font, then the most common other one, ties going to the one counted first
+            keys = list(rsrcmgr.font_map)
+            first = max(keys, key=lambda key: (rsrcmgr.font_map[key], -keys.index(key)))
+            keys.remove(first)
+            second = max(keys, key=lambda key: (rsrcmgr.font_map[key], -keys.index(key)))
+            self.assertEqual(rsrcmgr.top_fonts, [first, second])
+
+
+def iter_chars(item: LTContainer) -> Iterator[LTCharExtended]:
+    for child in item:
+        if isinstance(child, LTCharExtended):
+            yield child
+        elif isinstance(child, LTContainer):
+            yield from iter_chars(child)
+
+
+class PageCollector(ExtendedPaperAnalyzer):
+    def __init__(self, rsrcmgr: PaperResourceManager) -> None:
+        super().__init__(rsrcmgr)
+        self.pages: List[LTPageExtended] = []
+        return
+
+    def receive_layout(self, ltpage: LTPageExtended) -> None:
+        super().receive_layout(ltpage)
+        self.pages.append(ltpage)
+
+
+class CharTest(unittest.TestCase):
+    def test_chars_keep_nothing_in_a_dict(self) -> None:
+        # the bases of LTCharExtended have no __slots__, so its instances can still have a __dict__; the
+        # memory saving depends on nothing being stored there, which would make CPython allocate it
+        collector = PageCollector(PaperResourceManager())
+        interpreter = collector.create_interpreter()
+        for page in PDFPage.create_pages(PDFDocument(PDFParser(io.BytesIO(build_pdf(**SPECS['two-column']))))):
+            interpreter.process_page(page)
+        chars = [char for page in collector.pages for char in iter_chars(page)]
+        self.assertGreater(len(chars), 1000)
+        self.assertEqual([vars(char) for char in chars if vars(char)], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer.metadata import PaperMetadata, abstract_prefix_pattern, closes_abstract, extract_metadata
+
+
+class MetadataTest(unittest.TestCase):
+    def test_closes_abstract(self) -> None:
+        header = (72, 644, 121, 656)
+        self.assertTrue(closes_abstract(header, (72, 558, 152, 570)))
+        # header of the next column, level with the abstract header
+        self.assertFalse(closes_abstract(header, (312, 644, 392, 656)))
+        self.assertFalse(closes_abstract(header, (312, 558, 392, 570)))
+
+    def test_abstract_prefix(self) -> None:
+        for text in ('Abstract\nWe study', 'ABSTRACT: We study', 'Abstract—We study', '1. Abstract We study'):
+            self.assertEqual(abstract_prefix_pattern.sub('', text, count=1), 'We study')
+
+    def test_to_dict(self) -> None:
+        metadata = PaperMetadata(2)
+        metadata.title = 'A Title'
+        self.assertEqual(metadata.to_dict(), {'title': 'A Title', 'authors': [], 'abstract': None, 'pages': 2})
+
+    def test_extract_metadata(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ('single-column', 'two-column'):
+                data = build_pdf(**SPECS[name])
+                path = os.path.join(tmpdir, f'{name}.pdf')
+                with open(path, 'wb') as fp:
+                    fp.write(data)
+                # the five lines drawn after the abstract header
+                page = next(PDFPage.create_pages(PDFDocument(PDFParser(io.BytesIO(data)))))
+                lines = re.findall(r'\((.*?)\) Tj', b''.join(stream.get_data() for stream in page.contents).decode())
+                abstract = ' '.join(lines[lines.index('Abstract') + 1:][:5])
+                with self.subTest(name=name):
+                    self.assertEqual(extract_metadata(path).to_dict(), {
+                        'title': 'A Study of Synthetic Paper Layouts',
+                        'authors': ['Jane Doe, John Smith, Alex Roe', 'University of Examples'],
+                        'abstract': abstract,
+                        'pages': 1,
+                    })
+
+
+if __name__ == '__main__':
+    unittest.main()
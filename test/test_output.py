@@ -0,0 +1,26 @@
+import io
+import unittest
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import write_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.output import MemorySink
+
+
+class TextSinkTest(unittest.TestCase):
+    def test_lines_outside_boxes_are_written(self) -> None:
+        body = ' '.join('BT /F3 10 Tf 72 %d Td (Body text line %d of the paper) Tj ET' % (650 - 12 * i, i)
+                        for i in range(20))
+        # chars in a zero font size have no extent, so every one of them is an empty line of its own
+        data = write_pdf(['BT /F2 12 Tf 72 720 Td (1 Introduction) Tj ET ' + body +
+                          ' BT /F3 0 Tf 300 300 Td (hidden words) Tj ET'])
+        for single_pass in (False, True):
+            sink = MemorySink()
+            PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data))), single_pass=single_pass).get_result(sink)
+            self.assertTrue(sink.getvalue().endswith('h\ni\nd\nd\ne\nn\n \nw\no\nr\nd\ns\n'), sink.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+from typing import Any, Dict, Optional
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer import PaperResourceManager
+from paperminer.converter import ExtendedPaperAnalyzer, PaperToTextConverter
+from paperminer.layout import LTTextLineHorizontalExtended
+from paperminer.output import MemorySink
+from paperminer.parallel import analyze_pages, analyze_parallel, merge_summaries
+
+
+def statistics(rsrcmgr: PaperResourceManager) -> Dict[str, Any]:
+    """Everything the second pass uses from rsrcmgr, with fonts named by their object ids."""
+    rsrcmgr.post_process()
+
+    def key(font: Any, fontsize: float) -> Any:
+        return (rsrcmgr.font_objids[font], fontsize) if font is not None else None
+
+    def line(line: Optional[LTTextLineHorizontalExtended]) -> Any:
+        return (line.get_text(), line.bbox, key(line.font, line.fontsize)) if line is not None else None
+
+    return {
+        'font_map': [(key(*font), count) for font, count in rsrcmgr.font_map.items()],
+        'top_fonts': [key(*font) for font in rsrcmgr.top_fonts],
+        'section_header_fonts': {key(*font): count for font, count in rsrcmgr.section_header_fonts.items()},
+        'margins': (rsrcmgr.left_margin, rsrcmgr.right_margin),
+        'refs': [line(rsrcmgr.top_margin_ref), line(rsrcmgr.abstract_ref), line(rsrcmgr.ref_ref)],
+        'section_header_ref': list(map(line, rsrcmgr.section_header_ref)),
+        'figure_ref': list(map(line, rsrcmgr.figure_ref)),
+        'table_ref': list(map(line, rsrcmgr.table_ref)),
+        'fonts': [key(rsrcmgr.body_font, rsrcmgr.body_font_size), key(rsrcmgr.tiny_font, rsrcmgr.tiny_font_size),
+                  key(rsrcmgr.section_header_font, rsrcmgr.section_header_font_size)],
+    }
+
+
+def serial_statistics(document: PDFDocument) -> Dict[str, Any]:
+    rsrcmgr = PaperResourceManager()
+    interpreter = ExtendedPaperAnalyzer(rsrcmgr).create_interpreter()
+    for page in PDFPage.create_pages(document):
+        interpreter.process_page(page)
+    return statistics(rsrcmgr)
+
+
+def inline_fonts(data: bytes) -> bytes:
+    """data with the font dictionaries written into every page's resources instead of referenced."""
+    fonts = dict(re.findall(rb'(\d+) 0 obj\n(<< /Type /Font [^\n]*>>)', data))
+    data = re.sub(rb'(/F\d) (\d+) 0 R', lambda m: m.group(1) + b' ' + fonts[m.group(2)], data)
+    # without a cross-reference table pdfminer finds the objects, which have moved, by scanning the file
+    return data[:data.rindex(b'xref\n')] + b'trailer\n<< /Root 1 0 R >>\n%%EOF\n'
+
+
+class MergedSummaryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def write(self, data: bytes) -> str:
+        path = os.path.join(self.tmpdir.name, 'paper.pdf')
+        with open(path, 'wb') as fp:
+            fp.write(data)
+        return path
+
+    def test_merged_statistics_equal_serial(self) -> None:
+        for name, spec in SPECS.items():
+            path = self.write(build_pdf(**spec))
+            with open(path, 'rb') as fp:
+                document = PDFDocument(PDFParser(fp))
+                serial = serial_statistics(document)
+                npages = sum(1 for _ in PDFPage.create_pages(document))
+                for shard in ((1, 3) if npages < 10 else (npages // 3 + 1,)):
+                    with self.subTest(name=name, pages_per_shard=shard):
+                        summaries = [analyze_pages(path, start, start + shard) for start in range(0, npages, shard)]
+                        self.assertEqual(statistics(merge_summaries(document, summaries)), serial)
+
+    def test_analyze_parallel(self) -> None:
+        data = build_pdf(**SPECS['long-references'])
+        serial = MemorySink()
+        PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data)))).get_result(serial)
+        with open(self.write(data), 'rb') as fp:
+            document = PDFDocument(PDFParser(fp))
+            rsrcmgr = analyze_parallel(fp.name, document, workers=2, pages_per_shard=1)
+            merged = MemorySink()
+            PaperToTextConverter(document, rsrcmgr=rsrcmgr).get_result(merged)
+        self.assertEqual(merged.getvalue(), serial.getvalue())
+
+    def test_direct_fonts_fall_back_to_serial_first_pass(self) -> None:
+        data = inline_fonts(build_pdf(**SPECS['single-column']))
+        serial = MemorySink()
+        PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data)))).get_result(serial)
+        with open(self.write(data), 'rb') as fp:
+            document = PDFDocument(PDFParser(fp))
+            with self.assertRaises(ValueError):
+                analyze_pages(fp.name, 0, 1)
+            rsrcmgr = analyze_parallel(fp.name, document, workers=2)
+            merged = MemorySink()
+            PaperToTextConverter(document, rsrcmgr=rsrcmgr).get_result(merged)
+        self.assertEqual(merged.getvalue(), serial.getvalue())
+
+    def test_converts_with_merged_statistics(self) -> None:
+        data = build_pdf(**SPECS['two-column'])
+        path = os.path.join(self.tmpdir.name, 'paper.pdf')
+        with open(path, 'wb') as fp:
+            fp.write(data)
+        serial = MemorySink()
+        PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data)))).get_result(serial)
+        with open(path, 'rb') as fp:
+            document = PDFDocument(PDFParser(fp))
+            npages = sum(1 for _ in PDFPage.create_pages(document))
+            # the section headers of the merged statistics are stubs without chars
+            summaries = [analyze_pages(path, start, start + 2) for start in range(0, npages, 2)]
+            rsrcmgr = merge_summaries(document, summaries)
+            merged = MemorySink()
+            PaperToTextConverter(document, rsrcmgr=rsrcmgr).get_result(merged)
+        self.assertEqual(merged.getvalue(), serial.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.records import ColumnarReader, ColumnarWriter, JSONLWriter, RecordSink
+
+
+class RecordsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.jsonl = os.path.join(cls.tmpdir.name, 'blocks.jsonl')
+        cls.columnar = os.path.join(cls.tmpdir.name, 'blocks.col')
+        # small batches, so that both files hold several of them
+        with JSONLWriter(cls.jsonl, batch_size=7) as jsonl, ColumnarWriter(cls.columnar, batch_size=7) as columnar:
+            for name in ('single-column', 'two-column'):
+                document = PDFDocument(PDFParser(io.BytesIO(build_pdf(**SPECS[name]))))
+                for page in PaperToTextConverter(document).iter_pages():
+                    RecordSink(jsonl, name).write_page(page)
+                    RecordSink(columnar, name).write_page(page)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmpdir.cleanup()
+
+    def test_jsonl(self) -> None:
+        with open(self.jsonl, encoding='utf-8') as fp:
+            records = [json.loads(line) for line in fp]
+        records[0]['bbox'] = [round(v, 3) for v in records[0]['bbox']]
+        self.assertEqual(records[0], {'doc': 'single-column', 'page': 1, 'bbox': [150.0, 716.274, 455.064, 734.274],
+                                      'kind': 'LTTitle', 'font': 'Helvetica-Bold', 'fontsize': 18,
+                                      'text': 'A Study of Synthetic Paper Layouts\n'})
+        self.assertEqual({record['doc'] for record in records}, {'single-column', 'two-column'})
+
+    def test_columnar_matches_jsonl(self) -> None:
+        with open(self.jsonl, encoding='utf-8') as fp:
+            expected = [json.loads(line) for line in fp]
+        with ColumnarReader(self.columnar) as reader:
+            self.assertGreater(len(reader.row_groups), 1)
+            records = list(reader.records())
+        self.assertEqual(len(records), len(expected))
+        for record, want in zip(records, expected):
+            for (value, wanted) in zip(record.pop('bbox'), want.pop('bbox')):
+                self.assertAlmostEqual(value, wanted, places=3)
+            self.assertEqual(record, want)
+
+    def test_scan_kinds(self) -> None:
+        with open(self.jsonl, encoding='utf-8') as fp:
+            expected = [(record['doc'], record['page'], record['text']) for record in map(json.loads, fp)
+                        if record['kind'] == 'LTSectionBody']
+        with ColumnarReader(self.columnar) as reader:
+            self.assertEqual(list(reader.scan(['LTSectionBody'])), expected)
+            self.assertEqual(list(reader.scan(['LTEquation'])), [])
+            self.assertEqual(len(reader.column(0, 'page')), reader.row_groups[0].rows)
+
+    def test_not_a_block_file(self) -> None:
+        with self.assertRaises(ValueError):
+            ColumnarReader(self.jsonl)
+
+
+if __name__ == '__main__':
+    unittest.main()
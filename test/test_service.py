@@ -0,0 +1,148 @@
+import asyncio
+import io
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, List
+from unittest import mock
+
+from benchmarks.suite import check_golden
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer.batch import ExtractionTimeout
+from paperminer.service import ExtractionError, ExtractionRequest, ExtractionService, ServiceBusy, serve_stdio
+
+
+def run(coroutine: Coroutine) -> Any:
+    return asyncio.run(coroutine)
+
+
+class ExtractionServiceTest(unittest.TestCase):
+    data = build_pdf(**SPECS['single-column'])
+
+    def test_extract(self) -> None:
+        async def extract() -> List[Any]:
+            async with ExtractionService(workers=2) as service:
+                return await asyncio.gather(*[service.extract(self.data) for _ in range(3)])
+
+        for pages in run(extract()):
+            self.assertEqual(check_golden('single-column', pages), [])
+
+    def test_errors(self) -> None:
+        async def extract() -> None:
+            async with ExtractionService(workers=1) as service:
+                await service.extract(b'not a pdf')
+
+        with self.assertRaises(ExtractionError):
+            run(extract())
+
+    def test_timeout_kills_worker(self) -> None:
+        async def extract() -> List[int]:
+            async with ExtractionService(workers=1) as service:
+                pid = service.workers[0].process.pid
+                with self.assertRaises(ExtractionTimeout):
+                    await service.extract(build_pdf(**SPECS['two-column']), timeout=0.01)
+                self.assertNotEqual(service.workers[0].process.pid, pid)
+                # the replacement worker carries on with the next request
+                return [page.pageid for page in await service.extract(self.data)]
+
+        self.assertEqual(run(extract()), [1, 2, 3, 4])
+
+    def test_leaving_pages_early_kills_worker(self) -> None:
+        async def extract() -> None:
+            async with ExtractionService(workers=1) as service:
+                pid = service.workers[0].process.pid
+                pages = service.pages(self.data)
+                async for page in pages:
+                    self.assertEqual(page.pageid, 1)
+                    break
+                await pages.aclose()
+                # the worker is killed by the request's task once it sees the cancellation
+                for _ in range(100):
+                    if service.workers[0].process.pid != pid:
+                        break
+                    await asyncio.sleep(0.05)
+                self.assertNotEqual(service.workers[0].process.pid, pid)
+
+        run(extract())
+
+    def test_timeout_leaves_out_slow_reader(self) -> None:
+        async def extract() -> List[int]:
+            async with ExtractionService(workers=1, page_buffer=1) as service:
+                pageids = []
+                async for page in service.pages(self.data, timeout=1.5):
+                    pageids.append(page.pageid)
+                    await asyncio.sleep(0.8)
+                return pageids
+
+        self.assertEqual(run(extract()), [1, 2, 3, 4])
+
+    def test_finished_request_does_not_wait_for_reader(self) -> None:
+        async def extract() -> List[List[int]]:
+            async with ExtractionService(workers=1, page_buffer=1) as service:
+                # its only page fills the buffer of the request, which is not read until the next one is done
+                first = await service.submit(self.data, max_pages=1)
+                second = await asyncio.wait_for(service.extract(self.data), 30)
+                return [[page.pageid for page in second], [page.pageid async for page in first]]
+
+        self.assertEqual(run(extract()), [[1, 2, 3, 4], [1]])
+
+    def test_failure_does_not_wait_for_reader(self) -> None:
+        async def extract() -> List[Any]:
+            service = ExtractionService(workers=1)
+            service.threads = ThreadPoolExecutor(max_workers=1)
+            worker = mock.Mock()
+            worker.conn.recv.side_effect = [('page', 'first page'), EOFError()]
+            service.workers = [worker]
+            request = ExtractionRequest(self.data, timeout=None, single_pass=False, max_pages=None, page_buffer=1)
+            with mock.patch.object(service, 'restart_worker') as restart_worker:
+                await asyncio.wait_for(service.run_request(0, request), 5)
+            restart_worker.assert_called_once_with(0)
+            pages = []
+            with self.assertRaises(ExtractionError):
+                async for page in request:
+                    pages.append(page)
+            service.threads.shutdown()
+            return pages
+
+        self.assertEqual(run(extract()), ['first page'])
+
+    def test_close_fails_running_and_queued_requests(self) -> None:
+        async def extract() -> List[Any]:
+            service = ExtractionService(workers=1)
+            await service.start()
+            running = asyncio.ensure_future(service.extract(build_pdf(**SPECS['many-pages'])))
+            queued = asyncio.ensure_future(service.extract(self.data))
+            await asyncio.sleep(0.5)
+            await service.close()
+            return await asyncio.wait_for(asyncio.gather(running, queued, return_exceptions=True), 5)
+
+        self.assertEqual([error.__class__ for error in run(extract())], [ExtractionError, ExtractionError])
+
+    def test_busy(self) -> None:
+        async def submit() -> None:
+            async with ExtractionService(workers=1, queue_size=1) as service:
+                requests = [await service.submit(self.data, block=False)]
+                with self.assertRaises(ServiceBusy):
+                    for _ in range(3):
+                        requests.append(await service.submit(self.data, block=False))
+                for request in requests:
+                    request.cancel()
+
+        run(submit())
+
+    def test_serve_stdio(self) -> None:
+        requests = io.StringIO('{"id": "a", "path": "/nonexistent.pdf"}\n\nnot json\n')
+        responses = io.StringIO()
+
+        async def serve() -> None:
+            async with ExtractionService(workers=1) as service:
+                await serve_stdio(service, requests, responses)
+
+        run(serve())
+        lines = [json.loads(line) for line in responses.getvalue().splitlines()]
+        self.assertEqual(sorted(line['id'] or '' for line in lines), ['', 'a'])
+        self.assertTrue(all('error' in line for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import io
+import time
+import unittest
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.suite import check_golden
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.stats import ExtractionStats, PageStats
+
+
+class PageStatsTest(unittest.TestCase):
+    def test_nested_stages_are_exclusive(self) -> None:
+        stats = PageStats('pass one', 1)
+        with stats.time('outer'):
+            time.sleep(0.01)
+            with stats.time('inner'):
+                time.sleep(0.02)
+        self.assertGreaterEqual(stats.timings['inner'], 0.02)
+        self.assertLess(stats.timings['outer'], 0.02)
+
+    def test_count(self) -> None:
+        stats = PageStats('pass two', 3)
+        stats.count('lines', 4)
+        stats.count('lines')
+        self.assertEqual(stats.to_dict(), {'pass': 'pass two', 'page': 3, 'timings': {}, 'counts': {'lines': 5}})
+
+
+class ExtractionStatsTest(unittest.TestCase):
+    def test_converter_collects_both_passes(self) -> None:
+        pages = []
+        stats = ExtractionStats(hook=pages.append)
+        document = PDFDocument(PDFParser(io.BytesIO(build_pdf(**SPECS['single-column']))))
+        converter = PaperToTextConverter(document, stats=stats)
+        self.assertEqual(check_golden('single-column', list(converter.iter_pages())), [])
+        self.assertEqual([(page.pass_name, page.pageid) for page in pages],
+                         [('pass one', n) for n in range(1, 5)] + [('pass two', n) for n in range(1, 5)])
+        counts = stats.counts()
+        self.assertEqual(counts['pass one']['pages'], 4)
+        self.assertEqual(counts['pass one']['chars'], counts['pass two']['chars'])
+        self.assertGreater(counts['pass two']['maybe_classify'], counts['pass two']['lines'])
+        for stage in ('interpret', 'render_char', 'group_objects', 'group_textlines', 'classify'):
+            self.assertIn(stage, stats.timings()['pass two'])
+
+
+if __name__ == '__main__':
+    unittest.main()
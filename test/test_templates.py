@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from typing import Any, List, cast
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from benchmarks.synthetic import SPECS, build_pdf
+from paperminer.converter import PaperToTextConverter
+from paperminer.templates import LayoutTemplate, TemplateStore
+
+
+class TemplateStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = TemplateStore(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def convert(self, data: bytes, **kwargs: Any) -> PaperToTextConverter:
+        return PaperToTextConverter(PDFDocument(PDFParser(io.BytesIO(data))), text_only=True, **kwargs)
+
+    @staticmethod
+    def blocks(converter: PaperToTextConverter) -> List[Any]:
+        return [(block.pageid, block.kind, block.text) for block in converter.iter_blocks()]
+
+    def test_confirmed_template_skips_first_pass(self) -> None:
+        data = build_pdf(**SPECS['single-column'])
+        whole = self.blocks(self.convert(data))
+        for templated in (False, False, True, True):
+            converter = self.convert(data, templates=self.store)
+            self.assertEqual(converter.templated, templated)
+            self.assertEqual(self.blocks(converter), whole)
+        # templates are only used for whole documents
+        self.assertFalse(self.convert(data, templates=self.store, max_pages=2).templated)
+
+    def test_template_that_does_not_fit_is_replaced(self) -> None:
+        data = build_pdf(**SPECS['single-column'])
+        fingerprint = self.convert(data, templates=self.store).fingerprint
+        assert fingerprint is not None
+        self.store.put(fingerprint, LayoutTemplate('Helvetica-Bold', 12, 'Helvetica-Bold', 12, 'Times-Roman', 8,
+                                                   confirmations=5))
+        converter = self.convert(data, templates=self.store)
+        self.assertFalse(converter.templated)
+        self.assertEqual(self.blocks(converter), self.blocks(self.convert(data)))
+        template = self.store.get(fingerprint)
+        assert template is not None
+        self.assertEqual((template.body_font, template.confirmations), ('Times-Roman', 1))
+
+    def test_template_that_does_not_fit_later_pages_is_replaced(self) -> None:
+        data = build_pdf(**SPECS['single-column'])
+        for _ in range(2):
+            self.convert(data, templates=self.store)
+        # the same first page, with the body of every later page set in another font
+        first = data.index(b'endstream')
+        changed = data[:first] + data[first:].replace(b'/F3 10 Tf', b'/F1 10 Tf')
+        converter = self.convert(changed, templates=self.store)
+        self.assertEqual(self.blocks(converter), self.blocks(self.convert(changed)))
+        self.assertFalse(converter.templated)
+        template = self.store.get(cast(str, converter.fingerprint))
+        assert template is not None
+        self.assertEqual((template.body_font, template.confirmations), ('Helvetica', 1))
+
+    def test_template_that_does_not_fit_pages_past_the_check_is_dropped(self) -> None:
+        data = build_pdf(pages=8, columns=2, refs=80)
+        first = data.index(b'endstream')
+        changed = data[:first] + data[first:].replace(b'/F3 10 Tf', b'/F1 10 Tf')
+        fingerprint = self.convert(changed, templates=self.store).fingerprint
+        assert fingerprint is not None
+        # the statistics of the first page alone
+        self.store.put(fingerprint, LayoutTemplate('Helvetica-Bold', 12, 'Times-Roman', 10, 'Times-Roman', 9,
+                                                   confirmations=5))
+        converter = self.convert(changed, templates=self.store)
+        converter.template_check_pages = 1
+        pages = converter.iter_pages()
+        self.assertEqual(next(pages).pageid, 1)
+        # the first page fits the template, so the rest is passed on as it is laid out
+        self.assertEqual(converter.pageno, 2)
+        list(pages)
+        self.assertTrue(converter.templated)
+        self.assertIsNone(self.store.get(fingerprint))
+        converter = self.convert(changed, templates=self.store)
+        self.assertFalse(converter.templated)
+        self.assertEqual(self.blocks(converter), self.blocks(self.convert(changed)))
+
+    def test_eviction(self) -> None:
+        store = TemplateStore(self.tmpdir.name, max_templates=2, max_age=3600)
+        template = LayoutTemplate('Helvetica-Bold', 12, 'Helvetica', 10, 'Times-Roman', 8)
+        for i, fingerprint in enumerate(('a', 'b', 'c')):
+            store.put(fingerprint, template)
+            os.utime(store.entry_path(fingerprint), (time.time() + i, time.time() + i))
+        store.evict()
+        self.assertEqual([store.get(fingerprint) is not None for fingerprint in 'abc'], [False, True, True])
+        os.utime(store.entry_path('b'), (time.time() - 7200, time.time() - 7200))
+        store.evict()
+        self.assertEqual([store.get(fingerprint) is not None for fingerprint in 'abc'], [False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()